@@ -45,6 +45,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.perf.PerfMiddleware',
+    'core.throttles.InFlightMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,15 +86,53 @@ DATABASES = {
         # 'ENGINE': 'django.db.backends.sqlite3',
         # 'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
 
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # seconds a connection is reused across requests, 0 closes it at
+        # the end of every request. pooled connections go back to the
+        # pool when closed, so DB_POOL_SIZE is best used with 0 here
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.environ.get(
+            'DB_CONN_HEALTH_CHECKS', '1'
+        ) == '1',
+        'POOL_SIZE': int(os.environ.get('DB_POOL_SIZE', 0)),
+        'POOL_TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
     }
 }
 
 
+# shared backends (memcached) are needed with several worker processes,
+# otherwise cache invalidation only reaches the process that wrote
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
+    # buckets and counters of the throttles, kept apart so that culling a
+    # full default cache does not reset them
+    'throttle': {
+        'BACKEND': os.environ.get(
+            'THROTTLE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('THROTTLE_CACHE_LOCATION', 'throttle'),
+    },
+}
+# entries before locmem, file and database caches cull a third of them,
+# memcached takes no such option
+if 'memcached' not in CACHES['throttle']['BACKEND']:
+    CACHES['throttle']['OPTIONS'] = {
+        'MAX_ENTRIES': int(
+            os.environ.get('THROTTLE_CACHE_MAX_ENTRIES', 100000)
+        ),
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -110,6 +151,37 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# PASSWORD_HASHER hashes new passwords, argon2 needs argon2-cffi and bcrypt
+# needs bcrypt installed. hashes of the other hashers still verify, they and
+# hashes made with other costs are rehashed on the next login
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+_HASHERS = {
+    'pbkdf2': 'core.hashers.PBKDF2PasswordHasher',
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+    'bcrypt': 'core.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHERS = [_HASHERS.pop(PASSWORD_HASHER), *_HASHERS.values(),
+                    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+PASSWORD_PBKDF2_ITERATIONS = int(
+    os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 120000)
+)
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_ARGON2_MEMORY_COST = int(
+    os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 512)
+)
+PASSWORD_ARGON2_PARALLELISM = int(
+    os.environ.get('PASSWORD_ARGON2_PARALLELISM', 2)
+)
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12))
+
+# per process threads hashing passwords, 0 hashes in the request thread.
+# requests waiting longer than the timeout for a worker get a 503
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', 0))
+PASSWORD_HASHING_TIMEOUT = float(
+    os.environ.get('PASSWORD_HASHING_TIMEOUT', 5)
+)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
@@ -134,5 +206,128 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# how core.media.serve sends media files: 'app' from the worker,
+# 'x-accel-redirect' through an nginx internal location at
+# MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT, or 'x-sendfile' for apache
+# and lighttpd
+MEDIA_DELIVERY = os.environ.get('MEDIA_DELIVERY', 'app')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+
 # wrap standard django user model -> http://bit.ly/2PWX5eM
 AUTH_USER_MODEL = 'core.User'
+
+# recipe image renditions, name -> max width/height in pixels. they are
+# generated by a per process thread pool, or inline when EAGER is set
+RECIPE_IMAGE_RENDITIONS = {
+    'small': 160,
+    'medium': 640,
+    'large': 1280,
+}
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+RECIPE_IMAGE_PROCESSING_EAGER = False
+
+# image files are shared by content, see core.storage. files nothing
+# refers to anymore are deleted once they were not saved or reused for
+# this many seconds, the rest by the gc_recipe_images command
+RECIPE_IMAGE_DELETE_GRACE = int(
+    os.environ.get('RECIPE_IMAGE_DELETE_GRACE', 300)
+)
+
+# recipe image upload limits, checked while streaming and from the header
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.environ.get('RECIPE_IMAGE_MAX_BYTES', 20 * 2 ** 20)
+)
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 40 * 10 ** 6)
+)
+RECIPE_IMAGE_MAX_SIDE = int(os.environ.get('RECIPE_IMAGE_MAX_SIDE', 10000))
+
+# token -> user cache of user.authentication.CachedTokenAuthentication,
+# AUTH_TOKEN_SHARED_CACHE names an optional CACHES alias shared by workers
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 60))
+AUTH_TOKEN_SHARED_CACHE = os.environ.get('AUTH_TOKEN_SHARED_CACHE')
+AUTH_TOKEN_SHARED_CACHE_TTL = int(
+    os.environ.get('AUTH_TOKEN_SHARED_CACHE_TTL', 300)
+)
+
+# sliding window limits of token requests per client address and per
+# email, see user.throttles. counts are also kept in the LOGIN_THROTTLE_CACHE
+# alias, which should be shared by the workers, '' keeps them in process
+LOGIN_THROTTLE_WINDOW = 60
+LOGIN_THROTTLE_IP_LIMIT = int(os.environ.get('LOGIN_THROTTLE_IP_LIMIT', 100))
+LOGIN_THROTTLE_EMAIL_LIMIT = int(
+    os.environ.get('LOGIN_THROTTLE_EMAIL_LIMIT', 10)
+)
+LOGIN_THROTTLE_CACHE = os.environ.get('LOGIN_THROTTLE_CACHE', 'throttle')
+LOGIN_THROTTLE_CACHE_SIZE = 100000
+
+# emails without an account are remembered in the optional
+# AUTH_UNKNOWN_EMAIL_CACHE alias to skip their lookup and the password hash,
+# see user.backends. it has to be shared by the workers, a process local
+# cache is ignored
+AUTHENTICATION_BACKENDS = ['user.backends.EmailBackend']
+AUTH_UNKNOWN_EMAIL_CACHE = os.environ.get('AUTH_UNKNOWN_EMAIL_CACHE')
+AUTH_UNKNOWN_EMAIL_TTL = int(os.environ.get('AUTH_UNKNOWN_EMAIL_TTL', 300))
+
+# token buckets per client and throttle scope of the API views, see
+# core.throttles. scope -> (capacity, tokens refilled per second), scopes
+# without an entry use 'default'
+API_THROTTLE_BUCKETS = {
+    'default': (120, 10),
+    'upload_image': (10, 0.1),
+}
+API_THROTTLE_CACHE = os.environ.get('API_THROTTLE_CACHE', 'throttle')
+
+# requests of a client running at once, over every worker sharing the
+# throttle cache
+API_MAX_IN_FLIGHT = int(os.environ.get('API_MAX_IN_FLIGHT', 8))
+API_IN_FLIGHT_TTL = 300
+
+# per user versions of the tag, ingredient and recipe collections and cache
+# of tag and ingredient list responses, see recipe.cache. the optional
+# RECIPE_CACHE alias has to be shared by the workers, a process local cache
+# is ignored
+RECIPE_CACHE = os.environ.get('RECIPE_CACHE')
+RECIPE_CACHE_TTL = int(os.environ.get('RECIPE_CACHE_TTL', 300))
+
+# text search configuration of the recipe search documents, changing it
+# needs the vectors rebuilt with Recipe.objects.refresh_search_vectors()
+RECIPE_SEARCH_CONFIG = os.environ.get('RECIPE_SEARCH_CONFIG', 'english')
+
+# limits of the bulk endpoints, see recipe.bulk
+RECIPE_BULK_MAX_ITEMS = int(os.environ.get('RECIPE_BULK_MAX_ITEMS', 1000))
+RECIPE_BULK_BATCH_SIZE = 500
+
+# recipes per server side cursor fetch of the export, see recipe.export
+RECIPE_EXPORT_CHUNK_SIZE = 2000
+
+# directory shared by all worker processes for their metrics, see
+# core.metrics. prometheus_client reads it from the environment on import,
+# it has to be set for every worker and emptied before they start
+PROMETHEUS_MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+# share of requests measured by core.perf.PerfMiddleware, 0 disables it
+PERF_SAMPLE_RATE = float(os.environ.get('PERF_SAMPLE_RATE', 0))
+
+REST_FRAMEWORK = {
+    # proxies in front of the app appending to X-Forwarded-For. throttles
+    # identify anonymous clients by the address the last of them saw, with
+    # none by REMOTE_ADDR, as the header is set by the clients themselves
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'core.throttles.TokenBucketThrottle',
+        'core.throttles.InFlightThrottle',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': 100,
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
@@ -15,11 +15,17 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
 from django.conf import settings
 
+from core import media
+from core.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
-    path('api/recipe/', include('recipe.urls'))
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path('api/recipe/', include('recipe.urls')),
+    path('api/core/', include('core.urls')),
+    path('metrics', metrics_view, name='metrics'),
+    path(f'{settings.MEDIA_URL.lstrip("/")}<path:path>', media.serve,
+         name='media'),
+]
@@ -0,0 +1,97 @@
+import abc
+import io
+import statistics
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment,
+)
+
+
+def call_wsgi(path, method='GET', body=None, content_type='', **headers):
+    """run one request through the full WSGI stack, return the status
+
+    unlike the test client this fires the request signals which manage
+    persistent connections, and streams `body`, a binary file, as is
+    """
+    body = body or io.BytesIO()
+    start = body.tell()
+    length = body.seek(0, io.SEEK_END) - start
+    body.seek(start)
+
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'CONTENT_TYPE': content_type,
+        'CONTENT_LENGTH': str(length),
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': body,
+    }
+    environ.update(headers)
+
+    status = []
+    response = WSGIHandler()(
+        environ, lambda code, response_headers: status.append(code)
+    )
+    for _ in response:
+        pass
+    response.close()
+    return status[0]
+
+
+class BenchmarkCommand(BaseCommand, metaclass=abc.ABCMeta):
+    """base for benchmark commands
+
+    runs against a throwaway test database so benchmarks never touch
+    real data. subclasses implement benchmark()
+    """
+    repeat = 5
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=self.repeat,
+            help='number of timed runs per measurement'
+        )
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            self.benchmark(**options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+    @abc.abstractmethod
+    def benchmark(self, **options):
+        """run and report the measurements"""
+
+    def measure(self, label, func, repeat=None):
+        """run func several times, report and return the median seconds"""
+        timings = []
+        for _ in range(repeat or self.repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+
+        median = statistics.median(timings)
+        self.stdout.write(f'{label:<48} {median * 1000:>10.2f} ms')
+        return median
+
+    def rate(self, label, rows, func):
+        """run func once and report rows per second"""
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(
+            f'{label:<48} {rows / elapsed:>10.0f} rows/s '
+            f'({rows} rows in {elapsed:.2f} s)'
+        )
+        return rows / elapsed
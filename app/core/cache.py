@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+# django cache backends whose entries only the writing process sees
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+class LRUCache:
+    """thread safe in-process LRU cache with per entry expiry"""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """return a live entry and mark it as recently used"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """store an entry, evicting the least recently used when full"""
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+def incr_counter(cache, key, timeout):
+    """increment a counter of a django cache, creating it when missing"""
+    while True:
+        cache.add(key, 0, timeout)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # culled or expired since add()
+            pass
+
+
+def shared_cache(alias):
+    """return the cache of an alias if every worker process sees its
+    entries, None for no alias or a process local backend"""
+    if not alias:
+        return None
+
+    cache = caches[alias]
+    return None if isinstance(cache, PROCESS_LOCAL_CACHES) else cache
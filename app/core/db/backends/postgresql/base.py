@@ -0,0 +1,83 @@
+from django.db.backends.postgresql import base
+
+from core.db import pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """postgresql backend with connection health checks and pooling
+
+    extra settings of the database:
+        CONN_HEALTH_CHECKS  ping a reused connection before the first
+                            query of each request and reconnect if the
+                            server dropped it
+        POOL_SIZE           keep up to this many connections open per
+                            process and hand them out instead of
+                            connecting, 0 disables the pool
+        POOL_TIMEOUT        seconds to wait for a free pooled connection
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        self.connection_pool = None
+
+    def _ping(self, connection):
+        try:
+            connection.cursor().execute('SELECT 1')
+        except base.Database.Error:
+            return False
+
+        return True
+
+    def get_new_connection(self, conn_params):
+        size = self.settings_dict.get('POOL_SIZE', 0)
+        if not size:
+            self.connection_pool = None
+            return super().get_new_connection(conn_params)
+
+        # pools are per set of connection params, so switching to the
+        # test database never hands out connections to the real one
+        self.connection_pool = pool.get_pool(
+            (self.alias, repr(sorted(conn_params.items()))),
+            size,
+            self.settings_dict.get('POOL_TIMEOUT')
+        )
+        check = self._ping if self.health_checks_enabled else None
+        return self.connection_pool.getconn(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            ),
+            check
+        )
+
+    def _close(self):
+        if self.connection_pool is None:
+            return super()._close()
+
+        with self.wrap_database_errors:
+            self.connection_pool.putconn(self.connection)
+
+    @property
+    def health_checks_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    def connect(self):
+        # a fresh connection needs no check, and one must not run before
+        # connect() has set autocommit
+        self.health_check_done = True
+        super().connect()
+
+    def ensure_connection(self):
+        """check a persistent connection once before it is reused"""
+        if self.connection is not None and self.health_checks_enabled and \
+                not self.health_check_done and not self.in_atomic_block:
+            self.health_check_done = True
+            if not self._ping(self.connection):
+                self.close()
+
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        """called at request boundaries, the next request checks again"""
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
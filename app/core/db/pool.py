@@ -0,0 +1,98 @@
+import collections
+import os
+import threading
+
+from django.db.utils import OperationalError
+
+
+class ConnectionPool:
+    """bounded, thread safe pool of open DB-API connections
+
+    `size` caps the connections checked out at once, callers wait up to
+    `timeout` seconds for a free one. idle connections are kept until the
+    server or the health check drops them
+    """
+
+    def __init__(self, size, timeout=None):
+        self.size = size
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._idle = collections.deque()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def getconn(self, connect, check=None):
+        """return an idle connection passing `check`, or a new one"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise OperationalError(
+                f'no database connection available within {self.timeout}s'
+            )
+
+        try:
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+
+                if conn is None:
+                    return connect()
+
+                if not conn.closed and (check is None or check(conn)):
+                    return conn
+
+                conn.close()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        """take a connection back, dropping it if it is not reusable"""
+        try:
+            if not conn.closed:
+                conn.rollback()
+                with self._lock:
+                    self._idle.append(conn)
+                return
+
+        except Exception:
+            conn.close()
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
+
+    def __len__(self):
+        """number of idle connections"""
+        return len(self._idle)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, size, timeout):
+    """return the pool for a key in the current process
+
+    forked children never reuse a pool, or sockets, of their parent
+    """
+    pool = _pools.get(key)
+    if pool is None or pool.pid != os.getpid():
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None or pool.pid != os.getpid():
+                pool = _pools[key] = ConnectionPool(size, timeout)
+
+    return pool
+
+
+def discard_pools():
+    """close the idle connections of every pool and forget them"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+
+    for pool in pools:
+        if pool.pid == os.getpid():
+            pool.closeall()
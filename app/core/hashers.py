@@ -0,0 +1,127 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import exceptions, status
+
+
+_local = threading.local()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class HashingUnavailable(exceptions.APIException):
+    """every hashing worker stayed busy for PASSWORD_HASHING_TIMEOUT"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('too many concurrent logins, try again shortly')
+    default_code = 'hashing_unavailable'
+    # read by the rest framework exception handler as Retry-After
+    wait = 1
+
+
+class HashingPool:
+    """threads running the password hashes of a process
+
+    at most `workers` hashes run at once, callers wait for a free worker
+    up to PASSWORD_HASHING_TIMEOUT. the hash functions release the GIL
+    so the workers hash in parallel
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='password-hashing'
+        )
+        self.slots = threading.BoundedSemaphore(workers)
+
+    def run(self, func, *args):
+        if not self.slots.acquire(timeout=settings.PASSWORD_HASHING_TIMEOUT):
+            raise HashingUnavailable()
+        try:
+            return self.executor.submit(_run, func, args).result()
+        finally:
+            self.slots.release()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+def _run(func, args):
+    """run in a pool thread, where nested hashes run inline"""
+    _local.in_pool = True
+    return func(*args)
+
+
+def get_pool():
+    """return the hashing pool of the process, None to hash inline
+
+    the pool threads are started on the first hash, not at import, and
+    the pool is replaced when PASSWORD_HASHING_WORKERS changes
+    """
+    global _pool
+    workers = settings.PASSWORD_HASHING_WORKERS
+    if _pool is None or _pool.workers != workers:
+        with _pool_lock:
+            if _pool is None or _pool.workers != workers:
+                if _pool is not None:
+                    _pool.shutdown()
+                _pool = HashingPool(workers) if workers else None
+
+    return _pool
+
+
+def hash_in_pool(func, *args):
+    """call func in the hashing pool when one is configured"""
+    pool = get_pool()
+    if pool is None or getattr(_local, 'in_pool', False):
+        return func(*args)
+
+    return pool.run(func, *args)
+
+
+class PooledHasherMixin:
+    """encode and verify passwords in the hashing pool"""
+
+    def encode(self, password, salt, *args):
+        return hash_in_pool(super().encode, password, salt, *args)
+
+    def verify(self, password, encoded):
+        return hash_in_pool(super().verify, password, encoded)
+
+
+# the cost parameters are read from the settings on every use, so changing
+# them rehashes passwords on the next successful login, see must_update()
+
+class PBKDF2PasswordHasher(PooledHasherMixin, hashers.PBKDF2PasswordHasher):
+    """PBKDF2 with PASSWORD_PBKDF2_ITERATIONS"""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class Argon2PasswordHasher(PooledHasherMixin, hashers.Argon2PasswordHasher):
+    """argon2 with the PASSWORD_ARGON2_* costs, needs argon2-cffi"""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(PooledHasherMixin,
+                                 hashers.BCryptSHA256PasswordHasher):
+    """bcrypt with PASSWORD_BCRYPT_ROUNDS, needs bcrypt"""
+
+    @property
+    def rounds(self):
+        return settings.PASSWORD_BCRYPT_ROUNDS
@@ -0,0 +1,107 @@
+import io
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+
+from core.benchmark import BenchmarkCommand, call_wsgi
+
+
+HASHERS = {
+    'pbkdf2': 'core.hashers.PBKDF2PasswordHasher',
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+    'bcrypt': 'core.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD = 'benchpass'
+
+
+class Command(BenchmarkCommand):
+    """compare signup and token requests/sec per hasher and hashing mode
+
+    requests run concurrently through the full WSGI stack, one thread per
+    simulated worker thread, e.g.
+        python manage.py bench_auth_api --concurrency 1 8 --workers 0 4
+    """
+    help = 'benchmark CreateUserView and CreateTokenView under concurrency'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--requests', type=int, default=64)
+        parser.add_argument(
+            '--concurrency', type=int, nargs='+', default=[1, 4, 16]
+        )
+        parser.add_argument(
+            '--hashers', nargs='+', choices=HASHERS, default=list(HASHERS)
+        )
+        parser.add_argument(
+            '--workers', type=int, nargs='+', default=[0, os.cpu_count()],
+            help='PASSWORD_HASHING_WORKERS values, 0 hashes inline'
+        )
+
+    def benchmark(self, **options):
+        self.emails = (f'bench{n}@me.com' for n in itertools.count())
+        for name in options['hashers']:
+            hashers = [HASHERS[name]] + [
+                path for key, path in HASHERS.items() if key != name
+            ]
+            for workers, concurrency in itertools.product(
+                options['workers'], options['concurrency']
+            ):
+                with override_settings(PASSWORD_HASHERS=hashers,
+                                       PASSWORD_HASHING_WORKERS=workers,
+                                       LOGIN_THROTTLE_IP_LIMIT=10 ** 9,
+                                       LOGIN_THROTTLE_EMAIL_LIMIT=10 ** 9):
+                    label = f'{name}, {workers} workers, {concurrency} conc'
+                    self.run(label, options['requests'], concurrency)
+
+    def run(self, label, requests, concurrency):
+        signup = [
+            {'email': next(self.emails), 'password': PASSWORD, 'name': 'b'}
+            for _ in range(requests)
+        ]
+        signup_rate = self.rate_of(
+            reverse('user:create'), signup, concurrency
+        )
+
+        email = signup[0]['email']
+        token_rate = self.rate_of(
+            reverse('user:token'),
+            [{'email': email, 'password': PASSWORD}] * requests,
+            concurrency
+        )
+
+        self.stdout.write(
+            f'{label:<40} signup {signup_rate:>7.1f} req/s   '
+            f'token {token_rate:>7.1f} req/s'
+        )
+
+    def rate_of(self, url, payloads, concurrency):
+        def post(payloads):
+            try:
+                return [
+                    call_wsgi(
+                        url, method='POST', content_type='application/json',
+                        body=io.BytesIO(json.dumps(payload).encode())
+                    )
+                    for payload in payloads
+                ]
+            finally:
+                connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = executor.map(post, [
+                payloads[offset::concurrency] for offset in range(concurrency)
+            ])
+            results = list(itertools.chain.from_iterable(results))
+        elapsed = time.perf_counter() - start
+
+        failed = [code for code in results if not code.startswith('2')]
+        if failed:
+            self.stderr.write(f'{len(failed)} failed: {failed[0]}')
+        return len(payloads) / elapsed
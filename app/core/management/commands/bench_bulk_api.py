@@ -0,0 +1,89 @@
+import io
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.benchmark import BenchmarkCommand, call_wsgi
+from core.models import Ingredient, Tag
+
+
+class Command(BenchmarkCommand):
+    """compare rows/sec of the per object and the bulk endpoints
+
+    every request runs through the full WSGI stack, e.g.
+        python manage.py bench_bulk_api --rows 5000
+    """
+    help = 'benchmark bulk create endpoints against per object creates'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument(
+            '--batch', type=int, default=settings.RECIPE_BULK_MAX_ITEMS,
+            help='items per bulk request'
+        )
+
+    def post(self, url, data):
+        body = io.BytesIO(json.dumps(data).encode())
+        status = call_wsgi(
+            url,
+            method='POST',
+            body=body,
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Token {self.token}'
+        )
+        assert status.startswith('201'), status
+
+    def per_object(self, url, items):
+        for item in items:
+            self.post(url, item)
+
+    def bulk(self, url, items, batch):
+        for start in range(0, len(items), batch):
+            self.post(url, items[start:start + batch])
+
+    def benchmark(self, **options):
+        user = get_user_model().objects.create_user(
+            'bench@me.com', 'benchpass'
+        )
+        self.token = Token.objects.create(user=user).key
+        rows, batch = options['rows'], options['batch']
+
+        tags = Tag.objects.bulk_create(
+            Tag(user=user, name=f'tag {i}') for i in range(5)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=f'ingredient {i}') for i in range(10)
+        )
+        recipes = [
+            {
+                'title': f'recipe {i}',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [tag.id for tag in tags[:2]],
+                'ingredients': [obj.id for obj in ingredients[:5]],
+            }
+            for i in range(rows)
+        ]
+        names = [{'name': f'bench {i}'} for i in range(rows)]
+
+        cases = [
+            ('ingredients', reverse('recipe:ingredient-list'),
+             reverse('recipe:ingredient-bulk'), names),
+            ('recipes with 7 relations', reverse('recipe:recipe-list'),
+             reverse('recipe:recipe-bulk'), recipes),
+        ]
+        for label, list_url, bulk_url, items in cases:
+            self.rate(
+                f'{label}, per object',
+                rows,
+                lambda: self.per_object(list_url, items)
+            )
+            self.rate(
+                f'{label}, bulk of {batch}',
+                rows,
+                lambda: self.bulk(bulk_url, items, batch)
+            )
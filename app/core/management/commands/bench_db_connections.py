@@ -0,0 +1,70 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.benchmark import BenchmarkCommand, call_wsgi
+from core.db import pool
+from core.models import Tag
+
+
+MODES = {
+    'connect per request': {
+        'CONN_MAX_AGE': 0, 'POOL_SIZE': 0, 'CONN_HEALTH_CHECKS': False,
+    },
+    'persistent': {
+        'CONN_MAX_AGE': 60, 'POOL_SIZE': 0, 'CONN_HEALTH_CHECKS': False,
+    },
+    'persistent, health checks': {
+        'CONN_MAX_AGE': 60, 'POOL_SIZE': 0, 'CONN_HEALTH_CHECKS': True,
+    },
+    'pool': {
+        'CONN_MAX_AGE': 0, 'POOL_SIZE': 4, 'CONN_HEALTH_CHECKS': False,
+    },
+    'pool, health checks': {
+        'CONN_MAX_AGE': 0, 'POOL_SIZE': 4, 'CONN_HEALTH_CHECKS': True,
+    },
+}
+
+
+class Command(BenchmarkCommand):
+    """compare requests/sec with and without database connection reuse
+
+    requests go through the full WSGI stack so connections are opened
+    and closed exactly as in a worker, e.g.
+        python manage.py bench_db_connections --requests 2000
+    """
+    help = 'benchmark database connection reuse modes'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--requests', type=int, default=1000)
+
+    def benchmark(self, **options):
+        user = get_user_model().objects.create_user(
+            'bench@me.com', 'benchpass'
+        )
+        Tag.objects.create(user=user, name='bench')
+        token = Token.objects.create(user=user).key
+        url = reverse('recipe:tag-list')
+        original = dict(connection.settings_dict)
+
+        for label, mode in MODES.items():
+            connection.close()
+            pool.discard_pools()
+            connection.settings_dict.update(original, **mode)
+
+            start = time.perf_counter()
+            for _ in range(options['requests']):
+                call_wsgi(url, HTTP_AUTHORIZATION=f'Token {token}')
+            elapsed = time.perf_counter() - start
+
+            self.stdout.write(
+                f'{label:<32} {options["requests"] / elapsed:>8.0f} req/s'
+            )
+
+        connection.close()
+        pool.discard_pools()
+        connection.settings_dict.update(original)
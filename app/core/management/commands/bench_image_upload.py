@@ -0,0 +1,124 @@
+import io
+import math
+import multiprocessing
+import resource
+import shutil
+import tempfile
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.benchmark import BenchmarkCommand, call_wsgi
+from core.models import Recipe
+
+
+MB = 2 ** 20
+BOUNDARY = 'BenchmarkBoundary'
+
+
+def noise_jpeg(target_bytes):
+    """write a noise JPEG of roughly the target size to a temp file"""
+    sample = io.BytesIO()
+    Image.effect_noise((500, 500), 64).save(sample, 'JPEG', quality=95)
+    side = int(math.sqrt(target_bytes / sample.tell() * 500 * 500))
+
+    file = tempfile.NamedTemporaryFile(suffix='.jpg')
+    Image.effect_noise((side, side), 64).save(file, 'JPEG', quality=95)
+    file.flush()
+    return file, side
+
+
+def multipart_body(image):
+    """write a multipart/form-data body around the image to a temp file"""
+    body = tempfile.NamedTemporaryFile()
+    body.write(
+        f'--{BOUNDARY}\r\n'
+        f'Content-Disposition: form-data; name="image"; '
+        f'filename="bench.jpg"\r\n'
+        f'Content-Type: image/jpeg\r\n\r\n'.encode()
+    )
+    image.seek(0)
+    shutil.copyfileobj(image, body)
+    body.write(f'\r\n--{BOUNDARY}--\r\n'.encode())
+    body.flush()
+    return body
+
+
+def upload(recipe_id, token, body_path, eager, results):
+    """child process: stream one upload through the WSGI handler from disk
+    and report its peak RSS growth"""
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    with override_settings(RECIPE_IMAGE_PROCESSING_EAGER=eager), \
+            open(body_path, 'rb') as body:
+        status = call_wsgi(
+            reverse('recipe:recipe-upload-image', args=[recipe_id]),
+            method='POST',
+            body=body,
+            content_type=f'multipart/form-data; boundary={BOUNDARY}',
+            HTTP_AUTHORIZATION=f'Token {token}'
+        )
+
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((status, (after - before) / 1024))
+    connections.close_all()
+
+
+class Command(BenchmarkCommand):
+    """measure peak worker memory while uploading recipe images
+
+    request bodies are streamed from disk through the WSGI handler, and
+    every upload runs in a fresh forked process so peaks do not mask each
+    other, e.g.
+        python manage.py bench_image_upload --sizes 1 20 100 --eager
+    """
+    help = 'benchmark memory of recipe image uploads'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1, 20, 100],
+            help='upload sizes in MB'
+        )
+        parser.add_argument(
+            '--eager', action='store_true',
+            help='also generate renditions inside the measured process'
+        )
+
+    def benchmark(self, **options):
+        user = get_user_model().objects.create_user(
+            'bench@me.com', 'benchpass'
+        )
+        token = Token.objects.create(user=user).key
+        context = multiprocessing.get_context('fork')
+
+        for size in options['sizes']:
+            image, side = noise_jpeg(size * MB)
+            body = multipart_body(image)
+            recipe = Recipe.objects.create(
+                user=user, title='bench', time_minutes=1, price=1
+            )
+            connections.close_all()
+
+            results = context.Queue()
+            child = context.Process(
+                target=upload,
+                args=(recipe.id, token, body.name, options['eager'], results)
+            )
+            child.start()
+            status, peak = results.get()
+            child.join()
+
+            self.stdout.write(
+                f'{image.tell() / MB:>6.1f} MB {side}x{side} jpeg: '
+                f'{status}, peak rss +{peak:.1f} MB'
+            )
+            image.close()
+            body.close()
+            recipe.refresh_from_db()
+            recipe.image.delete()
@@ -0,0 +1,94 @@
+import csv
+import json
+import os
+import random
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from core.benchmark import BenchmarkCommand
+from recipe import imports
+
+
+WORDS = (
+    'tomato basil garlic onion lemon chicken beef pork tofu rice noodle '
+    'pasta soup salad curry stew roast grilled baked fried spicy sweet'
+).split()
+
+
+class Command(BenchmarkCommand):
+    """benchmark importing recipes with the import_recipes command
+
+    writes NDJSON and csv files of generated recipes with 3 tags and 5
+    ingredients each and reports the import throughput, e.g.
+        python manage.py bench_import_recipes --rows 1000000
+    """
+    help = 'benchmark the import_recipes command'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument(
+            '--batch-size', type=int, nargs='+', default=[1000, 5000]
+        )
+        parser.add_argument(
+            '--format', choices=imports.FORMATS, nargs='+',
+            default=list(imports.FORMATS)
+        )
+
+    def benchmark(self, **options):
+        self.rng = random.Random(0)
+        directory = tempfile.mkdtemp()
+        try:
+            for file_format in options['format']:
+                path = os.path.join(directory, f'recipes.{file_format}')
+                getattr(self, f'write_{file_format}')(path, options['rows'])
+                for batch_size in options['batch_size']:
+                    self.run_import(
+                        path, options['rows'], file_format, batch_size
+                    )
+        finally:
+            shutil.rmtree(directory)
+
+    def records(self, rows):
+        for i in range(rows):
+            yield {
+                'title': f'{" ".join(self.rng.sample(WORDS, 3))} {i}',
+                'time_minutes': self.rng.randrange(5, 120),
+                'price': f'{self.rng.randrange(100, 5000) / 100:.2f}',
+                'link': '',
+                'tags': self.rng.sample(WORDS, 3),
+                'ingredients': self.rng.sample(WORDS, 5),
+            }
+
+    def write_ndjson(self, path, rows):
+        with open(path, 'w') as output:
+            for record in self.records(rows):
+                output.write(json.dumps(record) + '\n')
+
+    def write_csv(self, path, rows):
+        with open(path, 'w', newline='') as output:
+            writer = csv.DictWriter(output, (
+                *imports.FIELDS, *imports.RELATIONS
+            ))
+            writer.writeheader()
+            for record in self.records(rows):
+                for relation in imports.RELATIONS:
+                    record[relation] = imports.CSV_NAME_SEPARATOR.join(
+                        record[relation]
+                    )
+                writer.writerow(record)
+
+    def run_import(self, path, rows, file_format, batch_size):
+        email = f'{file_format}-{batch_size}@me.com'
+        get_user_model().objects.create_user(email, 'benchpass')
+        self.rate(
+            f'{file_format}, batches of {batch_size}', rows,
+            lambda: call_command(
+                'import_recipes', email, path, batch_size=batch_size,
+                restart=True, stdout=StringIO()
+            )
+        )
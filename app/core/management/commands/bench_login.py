@@ -0,0 +1,85 @@
+import io
+import json
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import override_settings
+from django.urls import reverse
+
+from core.benchmark import BenchmarkCommand, call_wsgi
+from user.throttles import local_counts
+
+
+UNTHROTTLED = {
+    'LOGIN_THROTTLE_IP_LIMIT': 10 ** 9, 'LOGIN_THROTTLE_EMAIL_LIMIT': 10 ** 9,
+}
+MODES = {
+    'wrong password': ('bench@me.com', {**UNTHROTTLED}),
+    'unknown email, hashed': ('nobody@me.com', {
+        **UNTHROTTLED,
+        'AUTHENTICATION_BACKENDS': [
+            'django.contrib.auth.backends.ModelBackend'
+        ],
+    }),
+    'unknown email, remembered': ('nobody@me.com', {
+        **UNTHROTTLED,
+        'CACHES': {
+            **settings.CACHES,
+            'emails': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': os.path.join(
+                    tempfile.gettempdir(), 'bench-login-emails'
+                ),
+            },
+        },
+        'AUTH_UNKNOWN_EMAIL_CACHE': 'emails',
+    }),
+    'throttled': ('bench@me.com', {'LOGIN_THROTTLE_EMAIL_LIMIT': 0}),
+}
+
+
+class Command(BenchmarkCommand):
+    """compare the CPU and wall time of rejected token requests
+
+    e.g.
+        python manage.py bench_login --requests 200
+    """
+    help = 'benchmark rejected CreateTokenView requests'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--requests', type=int, default=100)
+
+    def benchmark(self, **options):
+        get_user_model().objects.create_user('bench@me.com', 'benchpass')
+        url = reverse('user:token')
+        requests = options['requests']
+
+        for label, (email, overrides) in MODES.items():
+            caches['throttle'].clear()
+            local_counts.clear()
+            body = json.dumps({'email': email, 'password': 'wrongpass'})
+            with override_settings(**overrides):
+                # warm up, the first unknown email measures a real hash
+                call_wsgi(url, method='POST', content_type='application/json',
+                          body=io.BytesIO(body.encode()))
+
+                cpu, wall = time.process_time(), time.perf_counter()
+                for _ in range(requests):
+                    status = call_wsgi(
+                        url, method='POST', content_type='application/json',
+                        body=io.BytesIO(body.encode())
+                    )
+                cpu = time.process_time() - cpu
+                wall = time.perf_counter() - wall
+
+            self.stdout.write(
+                f'{label:<28} {status:<24} '
+                f'cpu {cpu / requests * 1000:>7.2f} ms   '
+                f'wall {wall / requests * 1000:>7.2f} ms'
+            )
@@ -0,0 +1,110 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from core.benchmark import BenchmarkCommand
+from core.models import Recipe, Tag, Ingredient
+from recipe import filters
+
+
+BATCH_SIZE = 10000
+
+
+class Command(BenchmarkCommand):
+    """benchmark tag/ingredient filtering of recipes at growing scale
+
+    compares the old join based filter with the EXISTS (any) and
+    aggregated subquery (all) filters, e.g.
+        python manage.py bench_recipe_filters --scale 10000 100000 1000000
+    """
+    help = 'benchmark recipe tag/ingredient filtering'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--scale', type=int, nargs='+',
+            default=[10000, 100000, 1000000],
+            help='recipe counts to benchmark at'
+        )
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--ingredients', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=100)
+
+    def benchmark(self, **options):
+        self.rng = random.Random(0)
+        self.user = get_user_model().objects.create_user(
+            'bench@me.com', 'benchpass'
+        )
+        self.tags = Tag.objects.bulk_create(
+            Tag(user=self.user, name=f'tag {i}')
+            for i in range(options['tags'])
+        )
+        self.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=self.user, name=f'ingredient {i}')
+            for i in range(options['ingredients'])
+        )
+
+        created = 0
+        for scale in sorted(options['scale']):
+            self.seed(scale - created)
+            created = scale
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{scale} recipes'
+            ))
+            self.run_filters(options['page_size'])
+
+    def seed(self, count):
+        """bulk insert recipes linked to random tags and ingredients"""
+        while count > 0:
+            batch = min(count, BATCH_SIZE)
+            recipes = Recipe.objects.bulk_create(
+                Recipe(user=self.user, title='recipe', time_minutes=10,
+                       price=5)
+                for _ in range(batch)
+            )
+            self.link(recipes, Recipe.tags.through, 'tag_id', self.tags, 3)
+            self.link(
+                recipes, Recipe.ingredients.through, 'ingredient_id',
+                self.ingredients, 8
+            )
+            count -= batch
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def link(self, recipes, through, column, related, per_recipe):
+        through.objects.bulk_create(
+            through(recipe_id=recipe.id, **{column: obj.id})
+            for recipe in recipes
+            for obj in self.rng.sample(related, per_recipe)
+        )
+
+    def run_filters(self, page_size):
+        base = Recipe.objects.filter(user=self.user).order_by('-id')
+        tag_ids = [tag.id for tag in self.tags[:2]]
+        ingredient_ids = [ingredient.id for ingredient in self.ingredients[:2]]
+
+        cases = [
+            ('tags join (old, duplicates)',
+             base.filter(tags__id__in=tag_ids)),
+            ('tags any (exists)', filters.filter_by_related(
+                base, 'tags', tag_ids, filters.MATCH_ANY)),
+            ('tags all (aggregate)', filters.filter_by_related(
+                base, 'tags', tag_ids, filters.MATCH_ALL)),
+            ('ingredients join (old, duplicates)',
+             base.filter(ingredients__id__in=ingredient_ids)),
+            ('ingredients any (exists)', filters.filter_by_related(
+                base, 'ingredients', ingredient_ids, filters.MATCH_ANY)),
+            ('ingredients all (aggregate)', filters.filter_by_related(
+                base, 'ingredients', ingredient_ids, filters.MATCH_ALL)),
+        ]
+
+        for label, queryset in cases:
+            self.measure(
+                f'{label}, first page',
+                lambda: list(queryset.values_list('id', flat=True)[
+                    :page_size])
+            )
+            self.measure(f'{label}, count', queryset.count)
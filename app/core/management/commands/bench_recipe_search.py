@@ -0,0 +1,117 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from core.benchmark import BenchmarkCommand
+from core.models import Recipe, Tag, Ingredient
+from recipe import filters
+
+
+BATCH_SIZE = 10000
+WORDS = (
+    'tomato basil garlic onion lemon chicken beef pork tofu rice noodle '
+    'pasta soup salad curry stew roast grilled baked fried spicy sweet '
+    'sour creamy crispy smoky fresh quick easy classic summer winter '
+    'herb mushroom pepper ginger honey chocolate vanilla almond coconut'
+).split()
+
+
+class Command(BenchmarkCommand):
+    """benchmark recipe search latency at growing scale
+
+    compares the ranked full text search over the GIN indexed
+    search_vector with the LIKE fallback used on other databases, e.g.
+        python manage.py bench_recipe_search --scale 10000 100000 1000000
+    """
+    help = 'benchmark recipe full text search'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--scale', type=int, nargs='+',
+            default=[10000, 100000, 1000000],
+            help='recipe counts to benchmark at'
+        )
+        parser.add_argument('--page-size', type=int, default=100)
+
+    def benchmark(self, **options):
+        self.rng = random.Random(0)
+        self.user = get_user_model().objects.create_user(
+            'bench@me.com', 'benchpass'
+        )
+        self.tags = Tag.objects.bulk_create(
+            Tag(user=self.user, name=word) for word in WORDS[:20]
+        )
+        self.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=self.user, name=word) for word in WORDS[10:]
+        )
+
+        created = 0
+        for scale in sorted(options['scale']):
+            self.seed(scale - created)
+            created = scale
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{scale} recipes'
+            ))
+            self.run_searches(options['page_size'])
+
+    def seed(self, count):
+        """bulk insert recipes with random titles and relations, then
+        build their search documents in one statement"""
+        first_new = Recipe.objects.order_by('-id').values_list(
+            'id', flat=True
+        ).first() or 0
+
+        while count > 0:
+            batch = min(count, BATCH_SIZE)
+            recipes = Recipe.objects.bulk_create(
+                Recipe(user=self.user, title=self.title(), time_minutes=10,
+                       price=5)
+                for _ in range(batch)
+            )
+            self.link(recipes, Recipe.tags.through, 'tag_id', self.tags, 2)
+            self.link(
+                recipes, Recipe.ingredients.through, 'ingredient_id',
+                self.ingredients, 5
+            )
+            count -= batch
+
+        Recipe.objects.filter(id__gt=first_new).refresh_search_vectors()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def title(self):
+        return ' '.join(self.rng.sample(WORDS, 3)).capitalize()
+
+    def link(self, recipes, through, column, related, per_recipe):
+        through.objects.bulk_create(
+            through(recipe_id=recipe.id, **{column: obj.id})
+            for recipe in recipes
+            for obj in self.rng.sample(related, per_recipe)
+        )
+
+    def run_searches(self, page_size):
+        base = Recipe.objects.filter(user=self.user)
+        cases = [
+            ('common word', 'tomato'),
+            ('two words', 'spicy chicken'),
+            ('no match', 'marzipan'),
+        ]
+
+        for label, term in cases:
+            ranked = filters.search(base, term).order_by(
+                *filters.SEARCH_ORDERING
+            )
+            like = base.filter(title__icontains=term).order_by('-id')
+            self.measure(
+                f'{label}, ranked first page',
+                lambda: list(ranked.values_list('id', flat=True)[
+                    :page_size])
+            )
+            self.measure(f'{label}, ranked count', ranked.count)
+            self.measure(
+                f'{label}, title LIKE first page',
+                lambda: list(like.values_list('id', flat=True)[:page_size])
+            )
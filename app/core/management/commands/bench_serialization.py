@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from rest_framework.renderers import JSONRenderer
+
+from core.benchmark import BenchmarkCommand
+from core.models import Recipe, Tag, Ingredient
+from core.renderers import FastJSONRenderer, orjson
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BenchmarkCommand):
+    """benchmark the per row cost of serializing and rendering recipes
+
+    compares ModelSerializer.to_representation on prefetched objects with
+    represent_rows() on values() rows, both including their queries, and
+    the stdlib renderer with the orjson one, e.g.
+        python manage.py bench_serialization --rows 1000
+    """
+    help = 'benchmark recipe serialization and JSON rendering per row'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--rows', type=int, default=1000)
+
+    def benchmark(self, **options):
+        rows = options['rows']
+        self.seed(rows)
+        recipes = Recipe.objects.order_by('-id')
+
+        cases = (
+            ('ids', (), recipes.with_related_ids()),
+            ('expanded tags', ('tags',), recipes.with_related_ids(
+                'ingredients'
+            ).with_related('tags')),
+        )
+        for label, expand, prefetched in cases:
+            serializer = RecipeSerializer(expand=expand)
+            self.per_row(
+                rows, f'ModelSerializer, {label}',
+                lambda: RecipeSerializer(
+                    prefetched.all(), many=True, expand=expand
+                ).data
+            )
+            self.per_row(
+                rows, f'represent_rows, {label}',
+                lambda: serializer.represent_rows(
+                    recipes.values(*serializer.value_columns())
+                )
+            )
+
+        serializer = RecipeSerializer()
+        data = serializer.represent_rows(
+            recipes.values(*serializer.value_columns())
+        )
+        self.per_row(rows, 'JSONRenderer', lambda: JSONRenderer().render(
+            data
+        ))
+        if orjson is None:
+            self.stdout.write('orjson is not installed')
+        else:
+            self.per_row(
+                rows, 'FastJSONRenderer',
+                lambda: FastJSONRenderer().render(data)
+            )
+
+    def seed(self, count):
+        user = get_user_model().objects.create_user(
+            'bench@me.com', 'benchpass'
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(user=user, name=f'tag {i}') for i in range(3)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=f'ingredient {i}') for i in range(5)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(user=user, title=f'recipe {i}', time_minutes=i,
+                   price='4.50', link='https://example.com/recipe')
+            for i in range(count)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            for recipe in recipes for tag in tags
+        )
+        Recipe.ingredients.through.objects.bulk_create(
+            Recipe.ingredients.through(
+                recipe_id=recipe.id, ingredient_id=ingredient.id
+            )
+            for recipe in recipes for ingredient in ingredients
+        )
+
+    def per_row(self, rows, label, func):
+        median = self.measure(label, func)
+        self.stdout.write(f'{"":<48} {median / rows * 1e6:>10.2f} us/row')
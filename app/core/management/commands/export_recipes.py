@@ -0,0 +1,46 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe import export
+
+
+class Command(BaseCommand):
+    """django command to export the recipes of a user as NDJSON"""
+    help = 'stream the recipes of a user with tags and ingredients as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='email of the user to export')
+        parser.add_argument(
+            '--output', '-o', default='-',
+            help='file to write to, - for stdout'
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', help='gzip the output'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='recipes per database fetch'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'no user with email {options["email"]}')
+
+        chunks = export.export_recipes(user, options['chunk_size'])
+        if options['gzip']:
+            chunks = export.gzipped(chunks)
+
+        if options['output'] == '-':
+            self.write(chunks, sys.stdout.buffer)
+        else:
+            with open(options['output'], 'wb') as output:
+                self.write(chunks, output)
+
+    def write(self, chunks, output):
+        for chunk in chunks:
+            output.write(chunk)
+        output.flush()
@@ -0,0 +1,67 @@
+import itertools
+import posixpath
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.storage import image_storage
+from recipe import images
+
+
+ROOT = 'uploads/recipe/'
+
+
+def stored_names(directory):
+    """every file name below a directory of the image storage"""
+    if not image_storage.exists(directory):
+        return
+
+    directories, files = image_storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for name in directories:
+        yield from stored_names(posixpath.join(directory, name))
+
+
+class Command(BaseCommand):
+    """delete stored recipe images and renditions nothing refers to
+
+    files are shared by every recipe with the same content and outlive
+    the rows that referred to them when those are deleted. files saved
+    or reused within --grace seconds are kept, e.g.
+        python manage.py gc_recipe_images --grace 3600 --dry-run
+    """
+    help = 'delete unreferenced recipe image files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=settings.RECIPE_IMAGE_DELETE_GRACE,
+            help='keep files saved within this many seconds'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='only list the files that would be deleted'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        names = stored_names(ROOT)
+        count = size = 0
+
+        while True:
+            batch = list(itertools.islice(names, options['batch_size']))
+            if not batch:
+                break
+
+            for name in images.unreferenced(batch, options['grace']):
+                count += 1
+                size += image_storage.size(name)
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    image_storage.delete(name)
+
+        verb = 'would free' if options['dry_run'] else 'freed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{count} unreferenced files, {verb} {size} bytes'
+        ))
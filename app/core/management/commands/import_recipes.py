@@ -0,0 +1,120 @@
+import gzip
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe import imports
+
+
+class Command(BaseCommand):
+    """django command to import the recipes of a user from NDJSON or csv
+
+    records are committed in batches and the number of imported records
+    is written to a progress file after every batch, so an interrupted
+    import resumes after the last committed batch when run again
+    """
+    help = 'import recipes with tag and ingredient names from NDJSON or csv'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='email of the importing user')
+        parser.add_argument(
+            'path', help='NDJSON or csv file to import, may be gzipped'
+        )
+        parser.add_argument(
+            '--format', choices=imports.FORMATS, default=None,
+            help='file format, guessed from the file name by default'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='recipes per transaction'
+        )
+        parser.add_argument(
+            '--progress', default=None,
+            help='progress file, <path>.progress by default'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='ignore the progress of earlier runs'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'no user with email {options["email"]}')
+
+        path = options['path']
+        file_format = options['format'] or self.guess_format(path)
+        self.progress_path = options['progress'] or f'{path}.progress'
+        done = 0 if options['restart'] else self.read_progress()
+        if done:
+            self.stdout.write(f'resuming after {done} records')
+
+        importer = imports.RecipeImporter(user)
+        opener = gzip.open if path.endswith('.gz') else open
+        self.imported = 0
+        self.start = time.perf_counter()
+        with opener(path, 'rt', encoding='utf-8', newline='') as lines:
+            records = islice(imports.READERS[file_format](lines), done, None)
+            position = done
+            batch = []
+            try:
+                for record in records:
+                    batch.append(importer.prepare(record))
+                    position += 1
+                    if len(batch) == options['batch_size']:
+                        self.import_batch(importer, batch, position)
+                        batch = []
+            except imports.InvalidRecord as exc:
+                raise CommandError(f'record {position + 1}: {exc}')
+
+            if batch:
+                self.import_batch(importer, batch, position)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'imported {self.imported} recipes ({self.rate():.0f} rows/s)'
+        ))
+
+    def guess_format(self, path):
+        name = path[:-len('.gz')] if path.endswith('.gz') else path
+        extension = os.path.splitext(name)[1].lstrip('.').lower()
+        if extension in ('ndjson', 'jsonl'):
+            return 'ndjson'
+        if extension in imports.FORMATS:
+            return extension
+
+        raise CommandError(f'unknown format of {path}, pass --format')
+
+    def import_batch(self, importer, batch, position):
+        self.imported += importer.import_batch(batch)
+        self.write_progress(position)
+        self.stdout.write(
+            f'{position} records done, {self.imported} recipes imported '
+            f'({self.rate():.0f} rows/s)'
+        )
+
+    def rate(self):
+        return self.imported / max(time.perf_counter() - self.start, 1e-9)
+
+    def read_progress(self):
+        try:
+            with open(self.progress_path) as progress:
+                return int(json.load(progress)['done'])
+        except FileNotFoundError:
+            return 0
+        except (ValueError, KeyError, TypeError):
+            raise CommandError(
+                f'invalid progress file {self.progress_path}, '
+                f'pass --restart to start over'
+            )
+
+    def write_progress(self, done):
+        """replace the progress file atomically"""
+        partial = f'{self.progress_path}.partial'
+        with open(partial, 'w') as progress:
+            json.dump({'done': done}, progress)
+        os.replace(partial, self.progress_path)
@@ -1,20 +1,62 @@
+import random
 import time
-from django.db import connections
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """django command to pause execution until database is available"""
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='alias of the database to wait for'
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='seconds to wait before failing, 0 waits forever'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0.1,
+            help='seconds before the first retry, doubled on every attempt'
+        )
+        parser.add_argument(
+            '--max-interval', type=float, default=5,
+            help='upper bound of the retry interval'
+        )
+
+    def check_database(self, alias):
+        """open a connection and run a trivial query"""
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+
     def handle(self, *args, **options):
         self.stdout.write('waiting for database..')
-        db_conn = None
-        while not db_conn:
+        timeout = options['timeout']
+        deadline = time.monotonic() + timeout
+        interval = options['interval']
+
+        while True:
             try:
-                db_conn = connections['default']
+                self.check_database(options['database'])
+                break
             except OperationalError:
-                self.stdout.write('database unavailable. waiting 1 second..')
-                time.sleep(1)
+                remaining = deadline - time.monotonic()
+                if timeout and remaining <= 0:
+                    raise CommandError(
+                        f'database unavailable after {timeout} seconds'
+                    )
+
+                # equal jitter keeps containers started together from
+                # retrying in lockstep
+                delay = interval / 2 + random.uniform(0, interval / 2)
+                if timeout:
+                    delay = min(delay, remaining)
+                self.stdout.write(
+                    f'database unavailable. waiting {delay:.2f} seconds..'
+                )
+                time.sleep(delay)
+                interval = min(interval * 2, options['max_interval'])
 
         self.stdout.write(self.style.SUCCESS('database is available.'))
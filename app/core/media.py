@@ -0,0 +1,181 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+
+# images are named by the sha256 of their content (core.storage), older
+# uploads by uuids, renditions of those add _<size>. such a name is never
+# reused for other content
+IMMUTABLE_NAME = re.compile(
+    r'^([0-9a-f]{64}|'
+    r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(_\w+)?)'
+    r'\.\w+$'
+)
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# precompressed siblings of a file, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class MediaResponse(FileResponse):
+    """file response reading bigger blocks when the server has no
+    wsgi.file_wrapper"""
+    block_size = 64 * 1024
+
+
+class RangeFile:
+    """the bytes start..end of an open file. unlike the file it has no
+    fileno(), so servers stream it instead of sending the whole file"""
+
+    def __init__(self, file, start, end):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = end - start + 1
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """return the (first, last) byte of a single range Range header,
+    None to send the whole file and ValueError when unsatisfiable"""
+    match = RANGE.match(header.replace(' ', ''))
+    if match is None:
+        return None
+
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        first, last = max(size - int(last), 0), size - 1
+    else:
+        first = int(first)
+        last = min(int(last), size - 1) if last else size - 1
+
+    if first > last or first >= size:
+        raise ValueError('unsatisfiable range')
+
+    return first, last
+
+
+def _precompressed(request, full_path):
+    """return (path, encoding) of the best file for Accept-Encoding"""
+    accepted = {
+        coding.split(';')[0].strip()
+        for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')
+    }
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(full_path + suffix):
+            return full_path + suffix, encoding
+
+    return full_path, None
+
+
+def _etag(immutable, stats, encoding):
+    """the name of immutable files, the size and modified time of the
+    file for others"""
+    if immutable:
+        etag = immutable.group(1)
+    else:
+        etag = f'{stats.st_size:x}-{stats.st_mtime_ns:x}'
+    return quote_etag(f'{etag}-{encoding}' if encoding else etag)
+
+
+def _handed_off(file_path):
+    """let the front server send the file"""
+    response = HttpResponse()
+    if settings.MEDIA_DELIVERY == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + \
+            os.path.relpath(file_path, settings.MEDIA_ROOT)
+    else:
+        response['X-Sendfile'] = file_path
+
+    return response
+
+
+def _streamed(request, file_path, size, etag):
+    """send the file, or the range of it asked for, from the worker"""
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and request.META.get('HTTP_IF_RANGE', etag) == etag:
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(file_path, 'rb')
+    if byte_range is None:
+        response = MediaResponse(file)
+    else:
+        first, last = byte_range
+        response = MediaResponse(RangeFile(file, first, last), status=206)
+        response['Content-Range'] = f'bytes {first}-{last}/{size}'
+        response['Content-Length'] = last - first + 1
+
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@require_safe
+def serve(request, path):
+    """serve a file of MEDIA_ROOT
+
+    MEDIA_DELIVERY 'x-accel-redirect' (nginx) or 'x-sendfile' (apache,
+    lighttpd) only sends headers and lets the front server send the file
+    and answer Range requests. 'app' sends it from the worker, whole
+    files through the server's wsgi.file_wrapper, i.e. sendfile() where
+    supported. files named by their digest or a uuid are cached for a
+    year and their ETag is their name, the time a shared file was
+    written says nothing about a response. others are revalidated with
+    their ETag and Last-Modified
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('not found')
+
+    if not os.path.isfile(full_path):
+        raise Http404('not found')
+
+    immutable = IMMUTABLE_NAME.match(os.path.basename(path))
+    file_path, encoding = _precompressed(request, full_path)
+    stats = os.stat(file_path)
+    etag = _etag(immutable, stats, encoding)
+
+    if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = HttpResponse(status=304)
+    elif settings.MEDIA_DELIVERY in ('x-accel-redirect', 'x-sendfile'):
+        response = _handed_off(file_path)
+    else:
+        response = _streamed(request, file_path, stats.st_size, etag)
+
+    if response.status_code in (200, 206):
+        response['Content-Type'] = mimetypes.guess_type(full_path)[0] or \
+            'application/octet-stream'
+        if not immutable:
+            response['Last-Modified'] = http_date(stats.st_mtime)
+        if encoding:
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = etag
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = (
+        IMMUTABLE_CACHE_CONTROL if immutable else 'no-cache'
+    )
+    return response
@@ -0,0 +1,97 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+    generate_latest, multiprocess,
+)
+
+from core.perf import url_name
+
+
+# with PROMETHEUS_MULTIPROC_DIR in the environment prometheus_client keeps
+# the values of every worker process in files in that directory, see
+# metrics_view
+REQUESTS = Counter(
+    'http_requests_total', 'requests by url name, method and status',
+    ['view', 'method', 'status']
+)
+LATENCY = Histogram(
+    'http_request_duration_seconds', 'request latency by url name',
+    ['view', 'method']
+)
+QUERIES = Histogram(
+    'http_request_db_queries', 'SQL queries per request by url name',
+    ['view'], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, float('inf'))
+)
+AUTH_TOKEN_LOOKUPS = Counter(
+    'auth_token_lookups_total',
+    'token authentications by the tier that answered them',
+    ['source']
+)
+IMAGE_UPLOADS = Counter(
+    'recipe_image_uploads_total', 'recipe image uploads by outcome',
+    ['result']
+)
+IMAGE_UPLOAD_BYTES = Histogram(
+    'recipe_image_upload_bytes', 'size of accepted recipe image uploads',
+    buckets=tuple(2 ** exponent for exponent in range(14, 27, 2)) +
+    (float('inf'),)
+)
+IMAGE_PROCESSING = Histogram(
+    'recipe_image_processing_seconds',
+    'time to build the renditions of an image by outcome',
+    ['result']
+)
+
+
+class QueryCounter:
+    """execute wrapper counting the queries of a request"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """count requests and observe their latency and query count"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+
+        view = url_name(request)
+        REQUESTS.labels(view, request.method, response.status_code).inc()
+        LATENCY.labels(view, request.method).observe(
+            time.perf_counter() - start
+        )
+        QUERIES.labels(view).observe(queries.count)
+        return response
+
+
+def metrics_view(request):
+    """the metrics of every worker in the prometheus text format"""
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(
+            registry, path=settings.PROMETHEUS_MULTIPROC_DIR
+        )
+    else:
+        registry = REGISTRY
+
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """index the implicit m2m through tables by related id first
+
+    recipe filtering looks up recipe ids by tag/ingredient id, these
+    indexes let it do so with index only scans
+    """
+
+    dependencies = [
+        ('core', '0007_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX core_recipe_tags_tag_id_recipe_id_idx '
+            'ON core_recipe_tags (tag_id, recipe_id)',
+            'DROP INDEX core_recipe_tags_tag_id_recipe_id_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX core_recipe_ingredients_ingredient_id_recipe_id_idx '
+            'ON core_recipe_ingredients (ingredient_id, recipe_id)',
+            'DROP INDEX core_recipe_ingredients_ingredient_id_recipe_id_idx',
+        ),
+    ]
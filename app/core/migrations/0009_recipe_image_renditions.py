@@ -0,0 +1,39 @@
+# Generated by Django 2.1.15 on 2026-10-18 05:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_through_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeImageRendition',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=32)),
+                ('format', models.CharField(max_length=8)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('image', models.ImageField(upload_to='uploads/recipe/renditions/')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_status',
+            field=models.CharField(blank=True, choices=[('pending', 'pending'), ('processing', 'processing'), ('ready', 'ready'), ('failed', 'failed')], max_length=16),
+        ),
+        migrations.AddField(
+            model_name='recipeimagerendition',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='core.Recipe'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='recipeimagerendition',
+            unique_together={('recipe', 'name', 'format')},
+        ),
+    ]
@@ -0,0 +1,55 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def dedupe_names(apps, schema_editor):
+    """merge tags/ingredients of a user sharing a name into the oldest
+
+    assignments of the duplicates move to the kept row
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+
+    for model_name, relation in [('Tag', 'tags'),
+                                 ('Ingredient', 'ingredients')]:
+        model = apps.get_model('core', model_name)
+        through = Recipe._meta.get_field(relation).remote_field.through
+        column = f'{model_name.lower()}_id'
+
+        duplicated = model.objects.values('user', 'name').annotate(
+            keep=Min('id'),
+            count=Count('id')
+        ).filter(count__gt=1)
+
+        for group in duplicated:
+            keep = group['keep']
+            others = list(model.objects.filter(
+                user=group['user'],
+                name=group['name']
+            ).exclude(pk=keep).values_list('pk', flat=True))
+
+            assigned = set(through.objects.filter(**{
+                f'{column}__in': others
+            }).values_list('recipe_id', flat=True))
+            assigned -= set(through.objects.filter(**{
+                column: keep
+            }).values_list('recipe_id', flat=True))
+
+            through.objects.filter(**{f'{column}__in': others}).delete()
+            through.objects.bulk_create(
+                through(recipe_id=recipe_id, **{column: keep})
+                for recipe_id in assigned
+            )
+            model.objects.filter(pk__in=others).delete()
+
+
+class Migration(migrations.Migration):
+    """runs apart from 0012, postgres refuses the unique index while
+    deferred foreign key checks of the deletes are pending"""
+
+    dependencies = [
+        ('core', '0010_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+# a copy of core.search as of this migration, the title weighs more than
+# tag and ingredient names
+UPDATE_SEARCH_VECTORS_SQL = '''
+UPDATE core_recipe AS recipe SET search_vector =
+    setweight(to_tsvector(%s::regconfig, recipe.title), 'A') ||
+    setweight(to_tsvector(%s::regconfig, coalesce((
+        SELECT string_agg(tag.name, ' ')
+        FROM core_recipe_tags AS assigned
+        JOIN core_tag AS tag ON tag.id = assigned.tag_id
+        WHERE assigned.recipe_id = recipe.id
+    ), '')), 'B') ||
+    setweight(to_tsvector(%s::regconfig, coalesce((
+        SELECT string_agg(ingredient.name, ' ')
+        FROM core_recipe_ingredients AS assigned
+        JOIN core_ingredient AS ingredient
+            ON ingredient.id = assigned.ingredient_id
+        WHERE assigned.recipe_id = recipe.id
+    ), '')), 'B')
+'''
+
+
+def create_search_index(apps, schema_editor):
+    """GIN index the search documents and build them for existing
+    recipes, other databases search with LIKE"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(
+        'CREATE INDEX core_recipe_search_vector_idx '
+        'ON core_recipe USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        UPDATE_SEARCH_VECTORS_SQL, [settings.RECIPE_SEARCH_CONFIG] * 3
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX core_recipe_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_unique_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
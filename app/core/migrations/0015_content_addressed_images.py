@@ -0,0 +1,25 @@
+# Generated by Django 2.1.15 on 2026-10-18 06:49
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_price_time_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(db_index=True, null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.AlterField(
+            model_name='recipeimagerendition',
+            name='image',
+            field=models.ImageField(db_index=True, storage=core.storage.ContentAddressedStorage(), upload_to='uploads/recipe/renditions/'),
+        ),
+    ]
@@ -1,16 +1,22 @@
-from django.db import models
+from django.db import connections, models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
 from django.conf import settings
-import uuid
+from django.core.exceptions import EmptyResultSet
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import timezone
 import os
 
+from core import search
+from core.storage import image_storage
+
 
 def recipe_image_file_path(instance, filename):
-    ext = filename.split('.')[-1]
-    filename = f'{uuid.uuid4()}.{ext}'
+    """directory and extension of a recipe image, the storage names the
+    file after its content"""
+    ext = filename.split('.')[-1].lower()
 
-    return os.path.join('uploads/recipe/', filename)
+    return os.path.join('uploads/recipe/', f'image.{ext}')
 
 
 class UserManager(BaseUserManager):
@@ -55,6 +61,60 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+class UserNamedQuerySet(models.QuerySet):
+    """tags and ingredients, unique per user and name"""
+
+    def get_or_create_names(self, user, names):
+        """return {name: (id, created)} for the names of a user
+
+        missing names are inserted with INSERT ... ON CONFLICT DO NOTHING,
+        so concurrent creates neither fail nor rewrite existing rows. like
+        bulk_create no signals are sent
+        """
+        names = list(dict.fromkeys(names))
+        connection = connections[self.db]
+        if connection.vendor != 'postgresql':
+            return self._get_or_create_names(user, names)
+
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        rows = {}
+        while len(rows) < len(names):
+            # rows deleted between both statements are inserted next round
+            missing = [name for name in names if name not in rows]
+            now = timezone.now()
+            params = []
+            for name in missing:
+                params += [user.pk, name, now]
+
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {table} (user_id, name, updated_at) '
+                    f'VALUES {", ".join(["(%s, %s, %s)"] * len(missing))} '
+                    f'ON CONFLICT (user_id, name) DO NOTHING '
+                    f'RETURNING name, id',
+                    params
+                )
+                rows.update(
+                    (name, (pk, True)) for name, pk in cursor.fetchall()
+                )
+
+            rows.update(
+                (name, (pk, False)) for name, pk in self.filter(
+                    user=user,
+                    name__in=[name for name in missing if name not in rows]
+                ).values_list('name', 'id')
+            )
+
+        return rows
+
+    def _get_or_create_names(self, user, names):
+        rows = {}
+        for name in names:
+            obj, created = self.get_or_create(user=user, name=name)
+            rows[name] = (obj.pk, created)
+        return rows
+
+
 class Tag(models.Model):
     """tag to be used for recipe"""
     name = models.CharField(max_length=255)
@@ -62,6 +122,16 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = UserNamedQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ('user', 'name')
+        indexes = [
+            # keyset pagination order, see BaseRecipeAttrViewSet.ordering
+            models.Index(fields=['user', '-name', 'id']),
+        ]
 
     def __str__(self):
         return self.name
@@ -74,12 +144,73 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = UserNamedQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ('user', 'name')
+        indexes = [
+            # keyset pagination order, see BaseRecipeAttrViewSet.ordering
+            models.Index(fields=['user', '-name', 'id']),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """queryset helpers to load recipe relations in bulk"""
+
+    def with_related_ids(self, *relations):
+        """prefetch only primary keys of tags and/or ingredients"""
+        return self._prefetch_columns(relations, ('id',))
+
+    def with_related(self, *relations):
+        """prefetch tags and/or ingredients with the columns nested
+        serializers need"""
+        return self._prefetch_columns(relations, ('id', 'name'))
+
+    def _prefetch_columns(self, relations, columns):
+        related = {'tags': Tag, 'ingredients': Ingredient}
+        return self.prefetch_related(*[
+            models.Prefetch(
+                relation,
+                queryset=related[relation].objects.only(
+                    *columns
+                ).order_by('pk')
+            )
+            for relation in relations or related
+        ])
+
+    def refresh_search_vectors(self):
+        """rebuild the search document of the recipes, postgres only"""
+        connection = connections[self.db]
+        if connection.vendor != 'postgresql':
+            return
+
+        try:
+            sql, params = self.values('id').query.sql_with_params()
+        except EmptyResultSet:
+            return
+
+        search.update_search_vectors(
+            connection, f'recipe.id IN ({sql})', params
+        )
+
+
 class Recipe(models.Model):
+    IMAGE_PENDING = 'pending'
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, 'pending'),
+        (IMAGE_PROCESSING, 'processing'),
+        (IMAGE_READY, 'ready'),
+        (IMAGE_FAILED, 'failed'),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
@@ -90,7 +221,56 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # content addressed, files may be shared, see recipe.images
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=image_storage,
+        db_index=True
+    )
+    image_status = models.CharField(
+        max_length=16,
+        choices=IMAGE_STATUS_CHOICES,
+        blank=True
+    )
+    # also bumped on tag/ingredient changes, see recipe.signals
+    updated_at = models.DateTimeField(auto_now=True)
+    # title, tag and ingredient names, see refresh_search_vectors()
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # keyset pagination orders, see RecipeViewSet.get_ordering
+            models.Index(fields=['user', '-id']),
+            models.Index(fields=['user', 'price', 'id']),
+            models.Index(fields=['user', 'time_minutes', 'id']),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class RecipeImageRendition(models.Model):
+    """resized copy of a recipe image, generated in the background"""
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='renditions'
+    )
+    name = models.CharField(max_length=32)
+    format = models.CharField(max_length=8)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    image = models.ImageField(
+        upload_to='uploads/recipe/renditions/',
+        storage=image_storage,
+        db_index=True
+    )
+
+    class Meta:
+        unique_together = ('recipe', 'name', 'format')
+
+    def __str__(self):
+        return f'{self.recipe_id} {self.name} {self.format}'
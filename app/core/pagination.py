@@ -0,0 +1,234 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.utils.translation import ugettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """cursor pagination that seeks on the full ordering key
+
+    unlike OFFSET, every page is a single index range scan starting right
+    after the last row of the previous page, so deep pages cost the same
+    as the first one. views set `ordering` to a tuple of fields or
+    annotations that uniquely identifies a row, e.g. ('-name', 'id')
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    ordering = ('-id',)
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(view)
+        self.cursor = self.decode_cursor(request)
+
+        if self.cursor is None:
+            position, reverse = None, False
+        else:
+            position, reverse = self.cursor
+
+        ordering = self._reverse(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = self._seek_queryset(queryset, ordering, position)
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        self.page = results
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+
+        return self.page_size
+
+    def get_ordering(self, view):
+        """return the ordering key declared by the view, views ordering
+        per request implement get_ordering()"""
+        if hasattr(view, 'get_ordering'):
+            return tuple(view.get_ordering())
+
+        return tuple(getattr(view, 'ordering', None) or self.ordering)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        if self.page:
+            return self.encode_cursor(self._position(self.page[-1]), False)
+
+        # an empty page reached backwards: the next page restarts
+        # from the position we came from
+        return self.encode_cursor(self.cursor[0], False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+
+        if self.page:
+            return self.encode_cursor(self._position(self.page[0]), True)
+
+        return self.encode_cursor(self.cursor[0], True)
+
+    def decode_cursor(self, request):
+        """return (position, reverse) from the cursor query param"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            padding = '=' * (-len(encoded) % 4)
+            payload = json.loads(
+                urlsafe_b64decode(encoded + padding).decode('ascii')
+            )
+            position = payload['p']
+            reverse = bool(payload['r'])
+            ordering = payload['o']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if ordering != list(self.ordering) or \
+                not isinstance(position, list) or \
+                len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps(
+            {'p': position, 'r': int(reverse), 'o': list(self.ordering)},
+            cls=DjangoJSONEncoder,
+            separators=(',', ':')
+        )
+        encoded = urlsafe_b64encode(payload.encode('ascii'))
+        return replace_query_param(
+            remove_query_param(self.base_url, self.cursor_query_param),
+            self.cursor_query_param,
+            encoded.decode('ascii').rstrip('=')
+        )
+
+    def _position(self, item):
+        """return the ordering key values of a result row, an object or
+        a values() dict"""
+        if isinstance(item, dict):
+            return [item[field.lstrip('-')] for field in self.ordering]
+
+        return [getattr(item, field.lstrip('-')) for field in self.ordering]
+
+    @staticmethod
+    def _reverse(ordering):
+        return tuple(
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in ordering
+        )
+
+    def _seek_queryset(self, queryset, ordering, position):
+        """filter the rows after position
+
+        an ordering of columns in one direction, e.g. ('price', 'id'),
+        compares row values: (price, id) > (p0, p1) is a single index
+        range condition. other orderings use _seek()
+        """
+        connection = connections[queryset.db]
+        columns = self._columns(queryset, ordering, connection)
+        directions = {field.startswith('-') for field in ordering}
+        if columns is None or len(directions) != 1:
+            return queryset.filter(self._seek(ordering, position))
+
+        fields, names = zip(*columns)
+        operator = '<' if directions.pop() else '>'
+        # the ORM of this django version has no row values
+        return queryset.extra(
+            where=[
+                f'({", ".join(names)}) {operator} '
+                f'({", ".join(["%s"] * len(names))})'
+            ],
+            params=[
+                field.get_db_prep_value(field.to_python(value), connection)
+                for field, value in zip(fields, position)
+            ]
+        )
+
+    @staticmethod
+    def _columns(queryset, ordering, connection):
+        """return (field, quoted column) of the ordering, None when it
+        has annotations"""
+        meta = queryset.model._meta
+        columns = []
+        for field in ordering:
+            try:
+                field = meta.get_field(field.lstrip('-'))
+            except FieldDoesNotExist:
+                return None
+
+            columns.append((field, '{}.{}'.format(
+                connection.ops.quote_name(meta.db_table),
+                connection.ops.quote_name(field.column)
+            )))
+
+        return columns
+
+    @staticmethod
+    def _seek(ordering, position):
+        """build the row-after-position condition for the given ordering
+
+        for ('-name', 'id') this is
+        name <= p0 AND (name < p0 OR (name = p0 AND id > p1))
+        the redundant leading bound is what the planner turns into an
+        index range, the OR alone is only applied as a filter
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+
+        if len(ordering) > 1:
+            name = ordering[0].lstrip('-')
+            lookup = 'lte' if ordering[0].startswith('-') else 'gte'
+            condition = Q(**{f'{name}__{lookup}': position[0]}) & condition
+
+        return condition
@@ -0,0 +1,210 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager, nullcontext
+
+from django.conf import settings
+from django.db import connections
+
+
+# upper bounds of the histogram buckets, values above the last bound
+# fall into an extra unbounded bucket
+MS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+BUCKETS = {
+    'wall_ms': MS_BUCKETS,
+    'db_ms': MS_BUCKETS,
+    'serializer_ms': MS_BUCKETS,
+    'queries': (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500),
+    'response_bytes': (
+        256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304
+    ),
+}
+QUANTILES = (0.5, 0.9, 0.99)
+
+_local = threading.local()
+
+
+class Histogram:
+    """counts of observations per bucket, quantiles are estimated as the
+    upper bound of their bucket"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else None,
+            'max': self.max,
+            **{f'p{int(q * 100)}': self.quantile(q) for q in QUANTILES},
+            'buckets': dict(zip(
+                [str(bound) for bound in self.bounds] + ['+Inf'],
+                self.counts
+            )),
+        }
+
+
+class PerfStats:
+    """histograms of the sampled requests of this process per view"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view, metrics):
+        with self._lock:
+            histograms = self._views.get(view)
+            if histograms is None:
+                histograms = self._views[view] = {
+                    name: Histogram(bounds) for name, bounds in BUCKETS.items()
+                }
+            for name, value in metrics.items():
+                histograms[name].observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view: {
+                    name: histogram.as_dict()
+                    for name, histogram in histograms.items()
+                }
+                for view, histograms in self._views.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+
+stats = PerfStats()
+
+
+class RequestMetrics:
+    """metrics of one sampled request, also the execute wrapper counting
+    and timing its queries"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.timings = defaultdict(float)
+        self._active = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+
+    @contextmanager
+    def timer(self, name):
+        if name in self._active:
+            yield
+            return
+
+        self._active.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - start
+            self._active.discard(name)
+
+
+def timer(name):
+    """add the time spent in the block to the sampled request, nested
+    blocks of the same name count once"""
+    metrics = getattr(_local, 'metrics', None)
+    return nullcontext() if metrics is None else metrics.timer(name)
+
+
+class SerializerTimingMixin:
+    """report to_representation time of sampled requests as serializer
+    time, see timer()"""
+
+    def to_representation(self, instance):
+        if getattr(_local, 'metrics', None) is None:
+            return super().to_representation(instance)
+
+        with timer('serializer'):
+            return super().to_representation(instance)
+
+
+def url_name(request):
+    """the namespaced url name of a handled request, e.g.
+    recipe:recipe-list. unlike paths these are few"""
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+def _server_timing(wall, metrics):
+    return ', '.join([
+        f'app;dur={wall * 1000:.1f}',
+        f'db;dur={metrics.db * 1000:.1f};desc="{metrics.queries} queries"',
+        f'serializer;dur={metrics.timings["serializer"] * 1000:.1f}',
+    ])
+
+
+class PerfMiddleware:
+    """sample PERF_SAMPLE_RATE of the requests and record their wall
+    time, query count and time, serializer time and response size per
+    view in `stats`. sampled responses carry a Server-Timing header,
+    unsampled requests only pay for the sampling decision
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.PERF_SAMPLE_RATE
+        if not rate or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        _local.metrics = metrics
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        wall = time.perf_counter() - start
+
+        recorded = {
+            'wall_ms': wall * 1000,
+            'db_ms': metrics.db * 1000,
+            'serializer_ms': metrics.timings['serializer'] * 1000,
+            'queries': metrics.queries,
+        }
+        if not response.streaming:
+            recorded['response_bytes'] = len(response.content)
+        stats.record(f'{request.method} {url_name(request)}', recorded)
+
+        response['Server-Timing'] = _server_timing(wall, metrics)
+        return response
@@ -0,0 +1,34 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer on orjson when it is installed
+
+    falls back to the stdlib renderer without orjson, for indented
+    output, e.g. the browsable API, and unless unicode compact JSON is
+    configured, which is the only output orjson produces. NaN renders as
+    null instead of failing like STRICT_JSON
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact or \
+                self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+        if data is None:
+            return bytes()
+
+        ret = orjson.dumps(data, default=self.encoder_class().default)
+        # keep the output a javascript subset, like JSONRenderer
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029'
+            )
+        return ret
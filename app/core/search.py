@@ -0,0 +1,35 @@
+from django.conf import settings
+
+
+# the title weighs more than tag and ingredient names
+UPDATE_SEARCH_VECTOR_SQL = '''
+UPDATE core_recipe AS recipe SET search_vector =
+    setweight(to_tsvector(%s::regconfig, recipe.title), 'A') ||
+    setweight(to_tsvector(%s::regconfig, coalesce((
+        SELECT string_agg(tag.name, ' ')
+        FROM core_recipe_tags AS assigned
+        JOIN core_tag AS tag ON tag.id = assigned.tag_id
+        WHERE assigned.recipe_id = recipe.id
+    ), '')), 'B') ||
+    setweight(to_tsvector(%s::regconfig, coalesce((
+        SELECT string_agg(ingredient.name, ' ')
+        FROM core_recipe_ingredients AS assigned
+        JOIN core_ingredient AS ingredient
+            ON ingredient.id = assigned.ingredient_id
+        WHERE assigned.recipe_id = recipe.id
+    ), '')), 'B')
+'''
+
+
+def update_search_vectors(connection, where='', params=()):
+    """rebuild the search document of recipes matching the where clause,
+    postgres only"""
+    sql = UPDATE_SEARCH_VECTOR_SQL
+    if where:
+        sql += f'WHERE {where}'
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql,
+            [settings.RECIPE_SEARCH_CONFIG] * 3 + list(params)
+        )
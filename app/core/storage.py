@@ -0,0 +1,76 @@
+import hashlib
+import os
+import posixpath
+import time
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def file_digest(content):
+    """sha256 hex digest of a django File"""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """file system storage naming files by the sha256 of their content
+
+    only the directory and extension of a name are kept, the file is
+    stored as <directory>/<first two digits>/<digest><extension>. saving
+    content that is already stored writes nothing, so a name always
+    refers to the same bytes and rows with the same content share one
+    file. deleting shared files is up to the caller, see
+    recipe.images.delete_unreferenced
+
+    contents carrying a `sha256` attribute, e.g. uploads hashed while
+    they were received, are not read again to name them
+
+    the modified time of a file is when its content was written and is
+    kept when the content is saved again, the access time is set to
+    mark the reuse, see get_saved_time
+    """
+
+    def digest_name(self, name, digest):
+        directory = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        digest = getattr(content, 'sha256', None) or file_digest(content)
+        name = self.digest_name(name, digest)
+        path = self.path(name)
+        try:
+            self._mark_reused(path)
+        except FileNotFoundError:
+            # written aside and moved in place, concurrent saves of the
+            # same content never expose a partial file
+            part = super()._save(f'{name}.{uuid.uuid4().hex}.part', content)
+            os.replace(self.path(part), path)
+
+        return name
+
+    @staticmethod
+    def _mark_reused(path):
+        stats = os.stat(path)
+        os.utime(path, ns=(time.time_ns(), stats.st_mtime_ns))
+
+    def get_saved_time(self, name):
+        """the last time content was saved as `name`, written or reused.
+        reads may move it forward too where the file system records
+        access times"""
+        return max(self.get_accessed_time(name), self.get_modified_time(name))
+
+
+image_storage = ContentAddressedStorage()
@@ -1,23 +1,62 @@
 from django.test import TestCase
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 
 from unittest.mock import patch
 
 
+CHECK_DATABASE = 'core.management.commands.wait_for_db.Command.check_database'
+
+
 class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         """test waiting for db when db is available"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
+        with patch(CHECK_DATABASE) as cd:
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+            self.assertEqual(cd.call_count, 1)
+
+    def test_wait_for_db_queries_database(self):
+        """test the database is really queried"""
+        call_command('wait_for_db', timeout=1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """test waiting for db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
+        with patch(CHECK_DATABASE) as cd:
+            cd.side_effect = [OperationalError] * 5 + [None]
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+            self.assertEqual(cd.call_count, 6)
+            self.assertEqual(ts.call_count, 5)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_backoff(self, ts):
+        """test retry delays grow up to the max interval"""
+        with patch(CHECK_DATABASE) as cd:
+            cd.side_effect = [OperationalError] * 6 + [None]
+            call_command('wait_for_db', interval=1, max_interval=4)
+
+        delays = [call[0][0] for call in ts.call_args_list]
+        bounds = [1, 2, 4, 4, 4, 4]
+        for delay, bound in zip(delays, bounds):
+            self.assertGreaterEqual(delay, bound / 2)
+            self.assertLessEqual(delay, bound)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_alias(self, ts):
+        """test the database alias to check can be chosen"""
+        with patch(CHECK_DATABASE) as cd:
+            call_command('wait_for_db', database='other')
+            cd.assert_called_once_with('other')
+
+    @patch('time.sleep', return_value=True)
+    @patch('time.monotonic', side_effect=[0, 5, 11])
+    def test_wait_for_db_timeout(self, tm, ts):
+        """test giving up once the timeout passed"""
+        with patch(CHECK_DATABASE) as cd:
+            cd.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', timeout=10)
+
+        self.assertEqual(cd.call_count, 2)
@@ -0,0 +1,128 @@
+import threading
+from unittest import skipUnless
+
+from django.db import connection, connections
+from django.db.utils import OperationalError
+from django.test import TestCase
+
+from core.db import pool
+from core.db.pool import ConnectionPool
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(TestCase):
+    """test the in-process connection pool"""
+
+    def test_reuses_returned_connections(self):
+        connection_pool = ConnectionPool(size=2)
+        conn = connection_pool.getconn(FakeConnection)
+        connection_pool.putconn(conn)
+
+        self.assertIs(connection_pool.getconn(FakeConnection), conn)
+        self.assertEqual(conn.rollbacks, 1)
+
+    def test_failed_check_replaced(self):
+        """test connections failing the checkout check are dropped"""
+        connection_pool = ConnectionPool(size=1)
+        stale = connection_pool.getconn(FakeConnection)
+        connection_pool.putconn(stale)
+
+        conn = connection_pool.getconn(FakeConnection, check=lambda c: False)
+
+        self.assertIsNot(conn, stale)
+        self.assertTrue(stale.closed)
+
+    def test_exhausted_pool_times_out(self):
+        connection_pool = ConnectionPool(size=1, timeout=0.01)
+        connection_pool.getconn(FakeConnection)
+
+        with self.assertRaises(OperationalError):
+            connection_pool.getconn(FakeConnection)
+
+    def test_waits_for_returned_connection(self):
+        connection_pool = ConnectionPool(size=1, timeout=5)
+        conn = connection_pool.getconn(FakeConnection)
+        threading.Timer(0.05, connection_pool.putconn, [conn]).start()
+
+        self.assertIs(connection_pool.getconn(FakeConnection), conn)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'postgresql only')
+class DatabaseWrapperTests(TestCase):
+    """test health checks and pooling of the postgresql backend"""
+
+    def make_wrapper(self, **settings):
+        wrapper = connections['default'].__class__(
+            {**connection.settings_dict, **settings},
+            alias='wrapper-test'
+        )
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def tearDown(self):
+        pool.discard_pools()
+
+    def terminate_backend(self, wrapper):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_terminate_backend(%s)',
+                [wrapper.connection.get_backend_pid()]
+            )
+
+    def query(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            return cursor.fetchone()[0]
+
+    def test_health_check_reconnects(self):
+        """test a connection dropped by the server is replaced"""
+        wrapper = self.make_wrapper(CONN_HEALTH_CHECKS=True)
+        self.query(wrapper)
+        self.terminate_backend(wrapper)
+
+        wrapper.close_if_unusable_or_obsolete()
+
+        self.assertEqual(self.query(wrapper), 1)
+
+    def test_without_health_check_fails(self):
+        wrapper = self.make_wrapper(CONN_HEALTH_CHECKS=False)
+        self.query(wrapper)
+        self.terminate_backend(wrapper)
+
+        wrapper.close_if_unusable_or_obsolete()
+
+        with self.assertRaises(OperationalError):
+            self.query(wrapper)
+
+    def test_pool_reuses_connection(self):
+        wrapper = self.make_wrapper(POOL_SIZE=2)
+        self.query(wrapper)
+        raw = wrapper.connection
+
+        wrapper.close()
+        self.query(wrapper)
+
+        self.assertIs(wrapper.connection, raw)
+
+    def test_pool_checks_connections_on_checkout(self):
+        wrapper = self.make_wrapper(POOL_SIZE=2, CONN_HEALTH_CHECKS=True)
+        self.query(wrapper)
+        self.terminate_backend(wrapper)
+        raw = wrapper.connection
+
+        wrapper.close()
+
+        self.assertEqual(self.query(wrapper), 1)
+        self.assertIsNot(wrapper.connection, raw)
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.models import Recipe, RecipeImageRendition
+from core.storage import image_storage
+
+
+class GcRecipeImagesTests(TestCase):
+    """test deleting recipe image files nothing refers to"""
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings = override_settings(MEDIA_ROOT=root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = get_user_model().objects.create_user(
+            'gc@me.com',
+            'testpass'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=2
+        )
+
+    def save(self, directory, content, age=3600):
+        name = image_storage.save(
+            directory + 'image.jpg', ContentFile(content)
+        )
+        past = time.time() - age
+        os.utime(image_storage.path(name), (past, past))
+        return name
+
+    def gc(self, *args):
+        out = StringIO()
+        call_command('gc_recipe_images', *args, stdout=out)
+        return out.getvalue()
+
+    def test_unreferenced_files_deleted(self):
+        image = self.save('uploads/recipe/', b'image')
+        rendition = self.save('uploads/recipe/renditions/', b'rendition')
+        orphan = self.save('uploads/recipe/', b'orphan')
+        recent = self.save('uploads/recipe/', b'recent', age=0)
+        Recipe.objects.filter(pk=self.recipe.pk).update(image=image)
+        RecipeImageRendition.objects.create(
+            recipe=self.recipe, name='small', format='jpeg', width=1,
+            height=1, image=rendition
+        )
+
+        out = self.gc('--grace', '60')
+
+        self.assertIn('1 unreferenced files, freed 6 bytes', out)
+        self.assertFalse(image_storage.exists(orphan))
+        for name in (image, rendition, recent):
+            self.assertTrue(image_storage.exists(name))
+
+    def test_reused_files_kept(self):
+        """test an upload of stored content may still commit"""
+        name = self.save('uploads/recipe/', b'image')
+        image_storage.save('uploads/recipe/image.jpg', ContentFile(b'image'))
+
+        out = self.gc('--grace', '60')
+
+        self.assertIn('0 unreferenced files', out)
+        self.assertTrue(image_storage.exists(name))
+
+    def test_dry_run(self):
+        orphan = self.save('uploads/recipe/', b'orphan')
+
+        out = self.gc('--dry-run')
+
+        self.assertIn(orphan, out)
+        self.assertIn('would free 6 bytes', out)
+        self.assertTrue(image_storage.exists(orphan))
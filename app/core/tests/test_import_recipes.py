@@ -0,0 +1,148 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Tag, Ingredient, Recipe
+
+
+def recipe_line(title, **fields):
+    record = {
+        'title': title,
+        'time_minutes': 10,
+        'price': '2.50',
+        'tags': ['vegan'],
+        'ingredients': ['salt', 'pepper'],
+    }
+    record.update(fields)
+    return json.dumps(record) + '\n'
+
+
+class ImportRecipesTests(TestCase):
+    """test importing recipes from NDJSON and csv files"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'import@me.com',
+            'testpass'
+        )
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as output:
+            output.write(content)
+        return path
+
+    def call(self, path, **options):
+        call_command(
+            'import_recipes', 'import@me.com', path, stdout=StringIO(),
+            **options
+        )
+
+    def test_import_ndjson(self):
+        vegan = Tag.objects.create(user=self.user, name='vegan')
+        path = self.write('recipes.ndjson', ''.join(
+            recipe_line(f'Soup {i}') for i in range(3)
+        ) + recipe_line('Cake', tags=[{'id': 1, 'name': 'sweet'}], link='x'))
+
+        self.call(path, batch_size=2)
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(
+            [recipe.title for recipe in recipes],
+            ['Soup 0', 'Soup 1', 'Soup 2', 'Cake']
+        )
+        self.assertEqual(list(recipes[0].tags.all()), [vegan])
+        self.assertEqual(
+            sorted(recipes[0].ingredients.values_list('name', flat=True)),
+            ['pepper', 'salt']
+        )
+        self.assertEqual(recipes[3].tags.get().name, 'sweet')
+        self.assertEqual(recipes[3].link, 'x')
+        self.assertEqual(Ingredient.objects.count(), 2)
+
+    def test_import_csv(self):
+        path = self.write('recipes.csv', (
+            'title,time_minutes,price,link,tags,ingredients\n'
+            'Curry,30,4.00,,spicy|vegan,rice\n'
+            '"Tea, green",5,1,,,\n'
+        ))
+
+        self.call(path)
+
+        curry = Recipe.objects.get(title='Curry')
+        self.assertEqual(str(curry.price), '4.00')
+        self.assertEqual(
+            sorted(curry.tags.values_list('name', flat=True)),
+            ['spicy', 'vegan']
+        )
+        tea = Recipe.objects.get(title='Tea, green')
+        self.assertFalse(tea.tags.exists())
+
+    def test_import_resumes_after_invalid_record(self):
+        lines = [recipe_line(f'Recipe {i}') for i in range(5)]
+        lines[3] = recipe_line('Broken', price='free')
+        path = self.write('recipes.ndjson', ''.join(lines))
+
+        with self.assertRaisesMessage(CommandError, 'record 4: price'):
+            self.call(path, batch_size=2)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+        lines[3] = recipe_line('Recipe 3')
+        self.write('recipes.ndjson', ''.join(lines))
+        self.call(path, batch_size=2)
+
+        self.assertEqual(
+            list(Recipe.objects.order_by('id').values_list(
+                'title', flat=True
+            )),
+            [f'Recipe {i}' for i in range(5)]
+        )
+
+        self.call(path)
+        self.assertEqual(Recipe.objects.count(), 5)
+
+        self.call(path, restart=True)
+        self.assertEqual(Recipe.objects.count(), 10)
+
+    def test_import_without_returning_ids(self):
+        """test the path of databases without RETURNING and COPY"""
+        path = self.write('recipes.ndjson', ''.join(
+            recipe_line(f'Soup {i}') for i in range(3)
+        ))
+
+        with patch.object(connection, 'vendor', 'sqlite'), patch.object(
+                connection.features, 'can_return_ids_from_bulk_insert',
+                False):
+            self.call(path, batch_size=2)
+
+        for recipe in Recipe.objects.all():
+            self.assertEqual(recipe.tags.get().name, 'vegan')
+            self.assertEqual(recipe.ingredients.count(), 2)
+
+    def test_import_exported_recipes(self):
+        recipe = Recipe.objects.create(
+            user=self.user, title='Pie', time_minutes=50, price=3
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name='sweet'))
+        path = os.path.join(self.directory, 'recipes.ndjson.gz')
+        call_command('export_recipes', 'import@me.com', output=path,
+                     gzip=True)
+        other = get_user_model().objects.create_user('other@me.com', 'pass')
+
+        call_command('import_recipes', 'other@me.com', path,
+                     stdout=StringIO())
+
+        imported = Recipe.objects.get(user=other)
+        self.assertEqual(imported.title, 'Pie')
+        self.assertEqual(imported.tags.get().user, other)
@@ -0,0 +1,155 @@
+import os
+import shutil
+import tempfile
+import uuid
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import media
+
+
+CONTENT = bytes(range(256)) * 4
+
+
+def media_url(path):
+    return reverse('media', args=[path])
+
+
+class MediaTests(TestCase):
+    """test serving uploaded files"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings = override_settings(MEDIA_ROOT=self.root,
+                                     MEDIA_DELIVERY='app')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.name = f'uploads/recipe/{uuid.uuid4()}.jpg'
+        self.write(self.name, CONTENT)
+
+    def write(self, name, content):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+
+    def test_serve_file(self):
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertEqual(res['Cache-Control'], media.IMMUTABLE_CACHE_CONTROL)
+
+    def test_other_names_revalidated(self):
+        self.write('uploads/logo.png', CONTENT)
+
+        res = self.client.get(media_url('uploads/logo.png'))
+        res.close()
+
+        self.assertEqual(res['Cache-Control'], 'no-cache')
+
+    def test_not_modified(self):
+        res = self.client.get(media_url(self.name))
+        res.close()
+
+        res = self.client.get(
+            media_url(self.name), HTTP_IF_NONE_MATCH=res['ETag']
+        )
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, b'')
+
+    def test_digest_named_files_validated_by_name(self):
+        digest = 'ab' * 32
+        name = f'uploads/recipe/ab/{digest}.jpg'
+        self.write(name, CONTENT)
+
+        res = self.client.get(media_url(name))
+        res.close()
+        os.utime(os.path.join(self.root, name), (0, 0))
+        again = self.client.get(media_url(name))
+        again.close()
+
+        self.assertEqual(res['ETag'], f'"{digest}"')
+        self.assertEqual(again['ETag'], res['ETag'])
+        self.assertFalse(res.has_header('Last-Modified'))
+
+    def test_missing_and_outside_root(self):
+        res = self.client.get(media_url('uploads/recipe/missing.jpg'))
+        self.assertEqual(res.status_code, 404)
+
+        res = self.client.get(media_url('../etc/passwd'))
+        self.assertEqual(res.status_code, 404)
+
+    def test_range(self):
+        res = self.client.get(media_url(self.name), HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[10:20])
+        self.assertEqual(res['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+        self.assertEqual(res['Content-Length'], '10')
+
+    def test_suffix_range(self):
+        res = self.client.get(media_url(self.name), HTTP_RANGE='bytes=-5')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[-5:])
+
+    def test_unsatisfiable_range(self):
+        res = self.client.get(
+            media_url(self.name), HTTP_RANGE=f'bytes={len(CONTENT)}-'
+        )
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_stale_if_range_sends_whole_file(self):
+        res = self.client.get(
+            media_url(self.name), HTTP_RANGE='bytes=0-9',
+            HTTP_IF_RANGE='"stale"'
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+
+    def test_precompressed(self):
+        self.write('data/recipes.json', b'{}')
+        self.write('data/recipes.json.gz', b'gzipped')
+
+        res = self.client.get(
+            media_url('data/recipes.json'), HTTP_ACCEPT_ENCODING='gzip, br'
+        )
+
+        self.assertEqual(b''.join(res.streaming_content), b'gzipped')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+
+        res = self.client.get(media_url('data/recipes.json'))
+
+        self.assertEqual(b''.join(res.streaming_content), b'{}')
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    @override_settings(MEDIA_DELIVERY='x-accel-redirect',
+                       MEDIA_ACCEL_PREFIX='/protected/')
+    def test_x_accel_redirect(self):
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['X-Accel-Redirect'], f'/protected/{self.name}')
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+
+    @override_settings(MEDIA_DELIVERY='x-sendfile')
+    def test_x_sendfile(self):
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(
+            res['X-Sendfile'], os.path.join(self.root, self.name)
+        )
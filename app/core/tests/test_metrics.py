@@ -0,0 +1,92 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import token_cache
+
+
+METRICS_URL = reverse('metrics')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sample_value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTests(TestCase):
+    """test the prometheus metrics of the API process"""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        cache.clear()
+        token_cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'metrics@me.com',
+            'testpass'
+        )
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_requests_counted_by_url_name(self):
+        labels = {
+            'view': 'recipe:recipe-list', 'method': 'GET', 'status': '200'
+        }
+        requests = sample_value('http_requests_total', **labels)
+        queries = sample_value(
+            'http_request_db_queries_count', view='recipe:recipe-list'
+        )
+
+        self.client.get(RECIPES_URL)
+
+        self.assertEqual(
+            sample_value('http_requests_total', **labels), requests + 1
+        )
+        self.assertEqual(
+            sample_value(
+                'http_request_db_queries_count', view='recipe:recipe-list'
+            ),
+            queries + 1
+        )
+
+    def test_auth_token_lookups_by_source(self):
+        database = sample_value('auth_token_lookups_total', source='database')
+        local = sample_value('auth_token_lookups_total', source='local')
+
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+
+        self.assertEqual(
+            sample_value('auth_token_lookups_total', source='database'),
+            database + 1
+        )
+        self.assertEqual(
+            sample_value('auth_token_lookups_total', source='local'),
+            local + 1
+        )
+
+    def test_metrics_endpoint(self):
+        self.client.get(RECIPES_URL)
+
+        res = APIClient().get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(
+            b'http_requests_total{method="GET",status="200",'
+            b'view="recipe:recipe-list"}',
+            res.content
+        )
+
+    def test_metrics_endpoint_multiprocess(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(PROMETHEUS_MULTIPROC_DIR=directory):
+            res = APIClient().get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
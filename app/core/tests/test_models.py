@@ -1,6 +1,5 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
-from unittest.mock import patch
 from core import models
 
 
@@ -71,12 +70,9 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(recipe), recipe.title)
 
-    @patch('uuid.uuid4')
-    def test_recipe_file_name_uuid(self, mock_uuid):
-        """Test that image is saved in the correct location"""
-        uuid = 'test-uuid'
-        mock_uuid.return_value = uuid
-        file_path = models.recipe_image_file_path(None, 'myimage.jpg')
+    def test_recipe_file_name(self):
+        """Test that image is saved in the correct location, the storage
+        names the file after its content"""
+        file_path = models.recipe_image_file_path(None, 'myimage.JPG')
 
-        exp_path = f'uploads/recipe/{uuid}.jpg'
-        self.assertEqual(file_path, exp_path)
+        self.assertEqual(file_path, 'uploads/recipe/image.jpg')
@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import perf
+from core.models import Recipe
+
+
+PERF_URL = reverse('core:perf')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class HistogramTests(TestCase):
+
+    def test_quantiles_bucket_bounds(self):
+        histogram = perf.Histogram((1, 10, 100))
+        for value in (0.5, 5, 7, 50, 500):
+            histogram.observe(value)
+
+        data = histogram.as_dict()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(data['p50'], 10)
+        self.assertEqual(data['p99'], 500)
+        self.assertEqual(
+            data['buckets'], {'1': 1, '10': 2, '100': 1, '+Inf': 1}
+        )
+
+
+class PerfMiddlewareTests(TestCase):
+    """test sampling requests into per view histograms"""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        cache.clear()
+        perf.stats.reset()
+        self.addCleanup(perf.stats.reset)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'perf@me.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=2
+        )
+
+    @override_settings(PERF_SAMPLE_RATE=1)
+    def test_sampled_request_recorded(self):
+        res = self.client.get(RECIPES_URL)
+
+        self.assertIn('db;dur=', res['Server-Timing'])
+        self.assertIn('3 queries', res['Server-Timing'])
+        metrics = perf.stats.snapshot()['GET recipe:recipe-list']
+        self.assertEqual(metrics['wall_ms']['count'], 1)
+        self.assertEqual(metrics['queries']['sum'], 3)
+        self.assertGreater(metrics['serializer_ms']['sum'], 0)
+        self.assertEqual(
+            metrics['response_bytes']['sum'], len(res.content)
+        )
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_unsampled_request_not_recorded(self):
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', res)
+        self.assertEqual(perf.stats.snapshot(), {})
+
+    @override_settings(PERF_SAMPLE_RATE=1)
+    def test_stats_endpoint_admin_only(self):
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(PERF_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        admin = get_user_model().objects.create_superuser(
+            'admin@me.com', 'testpass'
+        )
+        self.client.force_authenticate(admin)
+        res = self.client.get(PERF_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('GET recipe:recipe-list', res.data['views'])
+
+        res = self.client.delete(PERF_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertNotIn(
+            'GET recipe:recipe-list', perf.stats.snapshot()
+        )
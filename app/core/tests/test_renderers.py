@@ -0,0 +1,55 @@
+import io
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import ugettext_lazy as _
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import parsers, renderers
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+DATA = {
+    'results': [{'id': 1, 'title': 'Crêpes\u2028', 'price': Decimal('2.5')}],
+    'detail': _('Not found.'),
+    'next': None,
+}
+
+
+class FastJSONTests(SimpleTestCase):
+    """test the orjson renderer and parser match the stdlib ones"""
+
+    def test_render_matches_json_renderer(self):
+        rendered = FastJSONRenderer().render(DATA)
+
+        self.assertEqual(rendered, JSONRenderer().render(DATA))
+
+    def test_render_indented(self):
+        media_type = 'application/json; indent=2'
+
+        self.assertEqual(
+            FastJSONRenderer().render(DATA, media_type),
+            JSONRenderer().render(DATA, media_type)
+        )
+
+    def test_render_without_orjson(self):
+        with patch.object(renderers, 'orjson', None):
+            rendered = FastJSONRenderer().render(DATA)
+
+        self.assertEqual(rendered, JSONRenderer().render(DATA))
+
+    def test_parse(self):
+        body = '{"title": "Crêpes", "tags": [1, 2]}'.encode()
+
+        for orjson in (parsers.orjson, None):
+            with patch.object(parsers, 'orjson', orjson):
+                self.assertEqual(
+                    FastJSONParser().parse(io.BytesIO(body)),
+                    JSONParser().parse(io.BytesIO(body))
+                )
+                with self.assertRaises(ParseError):
+                    FastJSONParser().parse(io.BytesIO(b'{"title"'))
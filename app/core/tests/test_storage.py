@@ -0,0 +1,66 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from core.storage import image_storage
+
+
+class ContentAddressedStorageTests(TestCase):
+    """test naming stored files by their content"""
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings = override_settings(MEDIA_ROOT=root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_named_by_digest(self):
+        digest = hashlib.sha256(b'image').hexdigest()
+
+        name = image_storage.save(
+            'uploads/recipe/image.JPG', ContentFile(b'image')
+        )
+
+        self.assertEqual(
+            name, f'uploads/recipe/{digest[:2]}/{digest}.jpg'
+        )
+        with image_storage.open(name) as file:
+            self.assertEqual(file.read(), b'image')
+
+    def test_same_content_stored_once(self):
+        first = image_storage.save('uploads/a.png', ContentFile(b'image'))
+        second = image_storage.save('uploads/b.png', ContentFile(b'image'))
+        other = image_storage.save('uploads/c.png', ContentFile(b'other'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        directory = os.path.dirname(image_storage.path(first))
+        self.assertEqual(os.listdir(directory), [os.path.basename(first)])
+
+    def test_known_digest_trusted(self):
+        content = ContentFile(b'image')
+        content.sha256 = 'ab' * 32
+
+        name = image_storage.save('uploads/a.png', content)
+
+        self.assertEqual(name, f'uploads/ab/{"ab" * 32}.png')
+
+    def test_reuse_keeps_modified_time(self):
+        name = image_storage.save('uploads/a.png', ContentFile(b'image'))
+        path = image_storage.path(name)
+        os.utime(path, (1000, 1000))
+
+        image_storage.save('uploads/b.png', ContentFile(b'image'))
+
+        self.assertEqual(os.stat(path).st_mtime, 1000)
+        self.assertGreater(os.stat(path).st_atime, time.time() - 60)
+        self.assertEqual(
+            image_storage.get_saved_time(name),
+            image_storage.get_accessed_time(name)
+        )
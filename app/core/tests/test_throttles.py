@@ -0,0 +1,171 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def upload_image_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+@override_settings(API_THROTTLE_BUCKETS={
+    'default': (3, 1), 'upload_image': (1, 0.01)
+})
+class TokenBucketThrottleTests(TestCase):
+    """test the per user and scope request budgets"""
+
+    def setUp(self):
+        self.cache = caches['throttle']
+        self.cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'throttle@me.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.now = 1000.0
+        clock = patch('core.throttles.time.time', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def test_bucket_empties_and_refills(self):
+        for _ in range(3):
+            res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '1')
+
+        self.now += 1
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_buckets_kept_when_default_cache_culled(self):
+        for _ in range(4):
+            self.client.get(RECIPES_URL)
+
+        caches['default'].set_many({f'filler{n}': n for n in range(1000)})
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_budgets_per_view_and_user(self):
+        for _ in range(4):
+            self.client.get(RECIPES_URL)
+
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        other = APIClient()
+        other.force_authenticate(get_user_model().objects.create_user(
+            'other@me.com', 'testpass'
+        ))
+        res = other.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_upload_image_budget(self):
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=2
+        )
+        url = upload_image_url(recipe.id)
+
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '100')
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_anonymous_by_address(self):
+        url = reverse('user:create')
+        self.client.logout()
+        for n in range(3):
+            self.client.post(url, {'email': f'anon{n}@me.com'})
+
+        res = self.client.post(url, {'email': 'anon@me.com'})
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = self.client.post(
+            url, {'email': 'anon@me.com'}, REMOTE_ADDR='10.0.0.2'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_anonymous_forwarded_for_ignored(self):
+        url = reverse('user:create')
+        self.client.logout()
+        for n in range(3):
+            self.client.post(
+                url, {'email': f'anon{n}@me.com'},
+                HTTP_X_FORWARDED_FOR=f'10.0.1.{n}'
+            )
+
+        res = self.client.post(
+            url, {'email': 'anon@me.com'}, HTTP_X_FORWARDED_FOR='10.0.1.9'
+        )
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+@override_settings(API_MAX_IN_FLIGHT=2)
+class InFlightThrottleTests(TestCase):
+    """test the cap on concurrent requests of a user"""
+
+    def setUp(self):
+        self.cache = caches['throttle']
+        self.cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'inflight@me.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.key = f'inflight:user:{self.user.pk}'
+
+    def test_slot_given_back(self):
+        self.cache.set(self.key, 1)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.cache.get(self.key), 1)
+
+    def test_cap_reached(self):
+        self.cache.set(self.key, 2)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '1')
+        self.assertEqual(self.cache.get(self.key), 2)
+
+    def test_slot_culled_before_incr(self):
+        incr = self.cache.incr
+        culled = []
+
+        def culling_incr(key, *args, **kwargs):
+            if not culled:
+                culled.append(key)
+                self.cache.delete(key)
+            return incr(key, *args, **kwargs)
+
+        with patch.object(self.cache, 'incr', culling_incr):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(culled, [self.key])
+        self.assertEqual(self.cache.get(self.key), 0)
@@ -0,0 +1,111 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+from core.cache import incr_counter
+
+
+_lock = threading.Lock()
+
+
+def _cache():
+    return caches[settings.API_THROTTLE_CACHE]
+
+
+def client_key(throttle, request):
+    """the user of a request, its client address when anonymous"""
+    if request.user and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+
+    return f'ip:{throttle.get_ident(request)}'
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """a token bucket per client and throttle scope
+
+    the scope of a view is its `throttle_scope`, or the class name, and
+    `throttle_action_scopes` maps actions to scopes of their own. budgets
+    come from API_THROTTLE_BUCKETS. buckets live in API_THROTTLE_CACHE,
+    with a shared cache concurrent requests of other workers may both
+    take the last token
+    """
+
+    def get_scope(self, view):
+        action = getattr(view, 'action', None)
+        scopes = getattr(view, 'throttle_action_scopes', {})
+        if action in scopes:
+            return scopes[action]
+
+        return getattr(view, 'throttle_scope', None) or type(view).__name__
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(view)
+        buckets = settings.API_THROTTLE_BUCKETS
+        capacity, rate = buckets.get(scope, buckets['default'])
+        key = f'throttle:{scope}:{client_key(self, request)}'
+        cache = _cache()
+
+        with _lock:
+            now = time.time()
+            tokens, updated = cache.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # the bucket is full again, i.e. forgettable, after this long
+            cache.set(key, (tokens, now), (capacity - tokens) / rate + 1)
+
+        self.wait_seconds = 0 if allowed else (1 - tokens) / rate
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class InFlightThrottle(BaseThrottle):
+    """cap the requests of a client running at once at API_MAX_IN_FLIGHT
+
+    counts live in API_THROTTLE_CACHE, InFlightMiddleware gives the slot
+    back once the view returned. slots of crashed workers expire after
+    API_IN_FLIGHT_TTL
+    """
+
+    def allow_request(self, request, view):
+        key = f'inflight:{client_key(self, request)}'
+        in_flight = incr_counter(_cache(), key, settings.API_IN_FLIGHT_TTL)
+        if in_flight > settings.API_MAX_IN_FLIGHT:
+            _release(key)
+            return False
+
+        request._request.in_flight_key = key
+        return True
+
+    def wait(self):
+        return 1
+
+
+def _release(key):
+    try:
+        _cache().decr(key)
+    except ValueError:
+        # expired meanwhile
+        pass
+
+
+class InFlightMiddleware:
+    """give back the slots taken by InFlightThrottle, streamed response
+    bodies are sent after that"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            key = getattr(request, 'in_flight_key', None)
+            if key is not None:
+                _release(key)
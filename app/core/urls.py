@@ -0,0 +1,8 @@
+from django.urls import path
+
+from core import views
+
+app_name = 'core'
+urlpatterns = [
+    path('perf/', views.PerfStatsView.as_view(), name='perf'),
+]
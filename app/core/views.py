@@ -0,0 +1,28 @@
+from django.conf import settings
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import perf
+from user.authentication import CachedTokenAuthentication
+
+
+class PerfStatsView(APIView):
+    """request metrics of this process aggregated per view, DELETE
+    resets them"""
+    authentication_classes = (
+        CachedTokenAuthentication, SessionAuthentication
+    )
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response({
+            'sample_rate': settings.PERF_SAMPLE_RATE,
+            'views': perf.stats.snapshot(),
+        })
+
+    def delete(self, request):
+        perf.stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
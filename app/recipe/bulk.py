@@ -0,0 +1,295 @@
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from recipe import cache
+
+
+def batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _add_error(errors, index, field, message):
+    errors[index] = dict(errors[index] or {}, **{field: [message]})
+
+
+def failed(errors):
+    """nothing is written once an item fails, the valid ones are reported
+    as failed dependencies"""
+    results = [
+        {'status': status.HTTP_400_BAD_REQUEST, 'errors': error}
+        if error else {'status': status.HTTP_424_FAILED_DEPENDENCY}
+        for error in errors
+    ]
+    return Response({'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def succeeded(pks, item_status, response_status=status.HTTP_200_OK):
+    results = [{'status': item_status, 'id': pk} for pk in pks]
+    return Response({'results': results}, status=response_status)
+
+
+class BulkMixin:
+    """create, update and delete many objects of a user in one request
+
+    items are validated in one pass, related ids with one query per
+    relation, and written with bulk queries inside a single transaction.
+    bulk queries fire no model signals, so updated_at and the collection
+    versions are maintained here
+    """
+
+    # many to many relations written through their through tables
+    bulk_relations = {}
+    # collection versions changed by any bulk write, see recipe.cache
+    bulk_collections = ()
+
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False,
+            url_path='bulk')
+    def bulk(self, request):
+        """POST a list of objects, PATCH a list of objects with their ids
+        or DELETE a list of ids"""
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'detail': _('expected a non empty list')})
+
+        limit = settings.RECIPE_BULK_MAX_ITEMS
+        if len(items) > limit:
+            raise ValidationError(
+                {'detail': _('at most %d items per request') % limit}
+            )
+
+        handler = {
+            'POST': self.create_many,
+            'PATCH': self.update_many,
+            'DELETE': self.destroy_many,
+        }[request.method]
+
+        return handler(items)
+
+    def get_owned_queryset(self):
+        return self.queryset.model.objects.filter(user=self.request.user)
+
+    def create_many(self, items):
+        validated, errors = self.validate_many(items)
+        if any(errors):
+            return failed(errors)
+
+        model = self.queryset.model
+        with transaction.atomic():
+            objects = []
+            for batch in batches(validated, settings.RECIPE_BULK_BATCH_SIZE):
+                objects += model.objects.bulk_create([
+                    model(user=self.request.user, **self._fields(data))
+                    for data in batch
+                ])
+            self._set_created_pks(objects)
+            self._write_relations(objects, validated)
+            self.after_bulk_write([obj.pk for obj in objects], ())
+
+        self._bump_versions()
+        return succeeded(
+            [obj.pk for obj in objects],
+            status.HTTP_201_CREATED,
+            status.HTTP_201_CREATED
+        )
+
+    def _set_created_pks(self, objects):
+        """bulk_create only sets the pks where the database returns them"""
+        model = self.queryset.model
+        features = connections[model.objects.db].features
+        if features.can_return_ids_from_bulk_insert:
+            return
+
+        # without RETURNING the objects are the users latest ones, this
+        # transaction holds the write lock since the insert
+        pks = reversed(model.objects.filter(
+            user=self.request.user
+        ).order_by('-pk').values_list('pk', flat=True)[:len(objects)])
+        for obj, pk in zip(objects, pks):
+            obj.pk = pk
+
+    def update_many(self, items):
+        errors = [None] * len(items)
+        ids = [item.get('id') if isinstance(item, dict) else None
+               for item in items]
+        instances = self.get_owned_queryset().in_bulk(
+            [pk for pk in ids if _is_id(pk)]
+        )
+
+        seen = set()
+        for index, pk in enumerate(ids):
+            if not _is_id(pk) or pk not in instances:
+                _add_error(errors, index, 'id', _('not found'))
+            elif pk in seen:
+                _add_error(errors, index, 'id', _('duplicate id'))
+            else:
+                seen.add(pk)
+
+        validated, errors = self.validate_many(
+            items,
+            [instances.get(pk) if _is_id(pk) else None for pk in ids],
+            errors
+        )
+        if any(errors):
+            return failed(errors)
+
+        try:
+            with transaction.atomic():
+                now = timezone.now()
+                pairs = list(zip(ids, validated))
+                for batch in batches(pairs, settings.RECIPE_BULK_BATCH_SIZE):
+                    self.get_owned_queryset().filter(
+                        pk__in=[pk for pk, _data in batch]
+                    ).update(updated_at=now, **self._cases(batch))
+                self._write_relations(
+                    [instances[pk] for pk in ids], validated, replace=True
+                )
+                self.after_bulk_write(ids, self.related_ids(ids))
+        except IntegrityError:
+            # e.g. renaming a tag to the name of another one
+            return Response(
+                {'detail': _('update conflicts with existing objects')},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        self._bump_versions()
+        return succeeded(ids, status.HTTP_200_OK)
+
+    def destroy_many(self, items):
+        errors = [None] * len(items)
+        owned = set(self.get_owned_queryset().filter(
+            pk__in=[pk for pk in items if _is_id(pk)]
+        ).values_list('pk', flat=True))
+
+        for index, pk in enumerate(items):
+            if not _is_id(pk) or pk not in owned:
+                _add_error(errors, index, 'id', _('not found'))
+        if any(errors):
+            return failed(errors)
+
+        with transaction.atomic():
+            related = self.related_ids(items)
+            self.perform_destroy_many(
+                self.get_owned_queryset().filter(pk__in=items)
+            )
+            self.after_bulk_write((), related)
+
+        self._bump_versions()
+        return succeeded(items, status.HTTP_204_NO_CONTENT)
+
+    def validate_many(self, items, instances=None, errors=None):
+        """validate every item, return validated data and item errors"""
+        partial = instances is not None
+        instances = instances or [None] * len(items)
+        errors = errors or [None] * len(items)
+        validated = []
+
+        for index, (item, instance) in enumerate(zip(items, instances)):
+            serializer = self.get_serializer(
+                instance,
+                data=item,
+                partial=partial
+            )
+            if serializer.is_valid():
+                validated.append(serializer.validated_data)
+            else:
+                validated.append(None)
+                errors[index] = dict(errors[index] or {}, **serializer.errors)
+
+        self._validate_relations(validated, errors)
+        return validated, errors
+
+    def _validate_relations(self, validated, errors):
+        """related ids must belong to the user, one query per relation"""
+        for relation, model in self.bulk_relations.items():
+            ids = {
+                pk for data in validated if data
+                for pk in data.get(relation, ())
+            }
+            owned = set(model.objects.filter(
+                user=self.request.user,
+                pk__in=ids
+            ).values_list('pk', flat=True))
+
+            for index, data in enumerate(validated):
+                missing = set(data.get(relation, ())) - owned if data else ()
+                if missing:
+                    _add_error(
+                        errors, index, relation,
+                        _('invalid ids: %s') % ', '.join(
+                            str(pk) for pk in sorted(missing)
+                        )
+                    )
+
+    def _fields(self, data):
+        return {
+            name: value for name, value in data.items()
+            if name not in self.bulk_relations
+        }
+
+    def _cases(self, pairs):
+        """CASE expressions updating every field to its value per row"""
+        model = self.queryset.model
+        names = {name for _pk, data in pairs for name in self._fields(data)}
+
+        return {
+            name: Case(
+                *[When(pk=pk, then=Value(data[name]))
+                  for pk, data in pairs if name in data],
+                default=F(name),
+                output_field=model._meta.get_field(name)
+            )
+            for name in names
+        }
+
+    def _write_relations(self, objects, validated, replace=False):
+        """insert the through table rows of all objects in batches"""
+        for relation in self.bulk_relations:
+            field = self.queryset.model._meta.get_field(relation)
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            changed = [
+                (obj.pk, data[relation])
+                for obj, data in zip(objects, validated)
+                if relation in data
+            ]
+
+            if replace:
+                through.objects.filter(**{
+                    f'{source}_id__in': [pk for pk, _ids in changed]
+                }).delete()
+
+            through.objects.bulk_create(
+                [
+                    through(**{f'{source}_id': pk, f'{target}_id': related})
+                    for pk, ids in changed
+                    for related in set(ids)
+                ],
+                batch_size=settings.RECIPE_BULK_BATCH_SIZE
+            )
+
+    def related_ids(self, pks):
+        """return ids of objects embedding the given ones"""
+        return ()
+
+    def after_bulk_write(self, pks, related_ids):
+        """maintain what model signals would, pks are the created or
+        updated objects, related_ids those embedding changed objects"""
+
+    def perform_destroy_many(self, queryset):
+        queryset.delete()
+
+    def _bump_versions(self):
+        cache.bump_version(self.request.user.pk, *self.bulk_collections)
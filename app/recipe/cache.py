@@ -0,0 +1,71 @@
+import hashlib
+import time
+
+from django.conf import settings
+
+from core.cache import shared_cache
+
+
+def _cache():
+    """the RECIPE_CACHE alias, None unless the workers share it. a worker
+    keeping its own versions would serve lists another worker changed"""
+    return shared_cache(settings.RECIPE_CACHE)
+
+
+def _version_key(user_id, collection):
+    return f'recipe:version:{collection}:{user_id}'
+
+
+def _new_version():
+    """seed versions from the clock, so a version lost to eviction is
+    never handed out again for different data"""
+    return int(time.time() * 10 ** 6)
+
+
+def collection_version(user_id, collection):
+    """return the current version of a user's tags/ingredients/recipes,
+    None without a shared RECIPE_CACHE"""
+    cache = _cache()
+    if cache is None:
+        return None
+
+    key = _version_key(user_id, collection)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+
+    return version
+
+
+def bump_version(user_id, *collections):
+    """mark collections of a user as changed"""
+    cache = _cache()
+    if cache is None:
+        return
+
+    for collection in collections:
+        key = _version_key(user_id, collection)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+
+
+def list_key(request, collection):
+    """cache key of a list response, changes with the collection version.
+    None when lists are not cached"""
+    version = collection_version(request.user.pk, collection)
+    if version is None:
+        return None
+
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'recipe:list:{collection}:{request.user.pk}:{version}:{url}'
+
+
+def get_list(key):
+    return _cache().get(key)
+
+
+def set_list(key, data):
+    _cache().set(key, data, settings.RECIPE_CACHE_TTL)
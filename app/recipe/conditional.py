@@ -0,0 +1,111 @@
+import hashlib
+import json
+from calendar import timegm
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from recipe import cache
+
+
+def _is_conditional(request):
+    return (
+        'HTTP_IF_NONE_MATCH' in request.META or
+        'HTTP_IF_MODIFIED_SINCE' in request.META
+    )
+
+
+def _etag(request, *parts):
+    """validators differ per user, url and negotiated format"""
+    parts += (
+        request.user.pk,
+        request.get_full_path(),
+        request.accepted_media_type,
+    )
+    value = ':'.join(str(part) for part in parts)
+    return quote_etag(hashlib.md5(value.encode()).hexdigest())
+
+
+def _validators(request, updated_at):
+    return (
+        _etag(request, updated_at.isoformat()),
+        timegm(updated_at.utctimetuple()),
+    )
+
+
+def _set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class ConditionalGetMixin:
+    """answer list and retrieve with 304 Not Modified while unchanged
+
+    lists are validated by the per user collection version, so unchanged
+    lists are answered without querying, objects by their updated_at.
+    without a shared RECIPE_CACHE there are no versions and lists are
+    validated by their content
+    """
+
+    def get_collection(self):
+        return self.queryset.model._meta.model_name
+
+    def list(self, request, *args, **kwargs):
+        version = cache.collection_version(
+            request.user.pk, self.get_collection()
+        )
+        if version is None:
+            return self._list_validated_by_content(request, *args, **kwargs)
+
+        etag = _etag(request, version)
+        response = get_conditional_response(request._request, etag=etag)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+
+        return _set_validators(response, etag)
+
+    def _list_validated_by_content(self, request, *args, **kwargs):
+        """without shared collection versions the ETag is a digest of
+        the list, a 304 still runs the queries but sends no body"""
+        response = super().list(request, *args, **kwargs)
+        content = json.dumps(
+            response.data, cls=DjangoJSONEncoder, sort_keys=True
+        )
+        etag = _etag(request, hashlib.md5(content.encode()).hexdigest())
+        not_modified = get_conditional_response(request._request, etag=etag)
+        return _set_validators(not_modified or response, etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        if _is_conditional(request):
+            # check the timestamp alone before loading the object
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            try:
+                updated_at = self.get_queryset().filter(
+                    **{self.lookup_field: kwargs[lookup_url_kwarg]}
+                ).prefetch_related(None).order_by().values_list(
+                    'updated_at', flat=True
+                ).first()
+            except (TypeError, ValueError):
+                # malformed lookups 404 from get_object below
+                updated_at = None
+
+            if updated_at is not None:
+                etag, last_modified = _validators(request, updated_at)
+                response = get_conditional_response(
+                    request._request,
+                    etag=etag,
+                    last_modified=last_modified
+                )
+                if response is not None:
+                    return _set_validators(response, etag, last_modified)
+
+        instance = self.get_object()
+        response = Response(self.get_serializer(instance).data)
+        return _set_validators(
+            response,
+            *_validators(request, instance.updated_at)
+        )
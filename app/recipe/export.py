@@ -0,0 +1,53 @@
+import zlib
+from itertools import islice
+
+from django.conf import settings
+
+from core.models import Recipe
+from core.renderers import FastJSONRenderer
+from recipe.serializers import RecipeSerializer
+
+
+CONTENT_TYPE = 'application/x-ndjson'
+GZIP_CONTENT_TYPE = 'application/gzip'
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def export_recipes(user, chunk_size=None):
+    """yield the recipes of the user with their tags and ingredients as
+    NDJSON, one bytestring per chunk of recipes
+
+    recipes are read from a server side cursor and their relations
+    loaded per chunk, so memory use depends on chunk_size only
+    """
+    chunk_size = chunk_size or settings.RECIPE_EXPORT_CHUNK_SIZE
+    serializer = RecipeSerializer(expand=tuple(RecipeSerializer.expandable))
+    renderer = FastJSONRenderer()
+
+    rows = Recipe.objects.filter(user=user).order_by('id').values(
+        *serializer.value_columns()
+    ).iterator(chunk_size=chunk_size)
+
+    for chunk in _chunks(rows, chunk_size):
+        yield b''.join(
+            renderer.render(recipe) + b'\n'
+            for recipe in serializer.represent_rows(chunk)
+        )
+
+
+def gzipped(chunks, level=6):
+    """compress a stream of bytestrings into a gzip stream"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import Count, Exists, F, FloatField, OuterRef, Q, Value
+from django.db.models.functions import Cast
+
+from core.models import Tag, Ingredient, Recipe
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_CHOICES = (MATCH_ANY, MATCH_ALL)
+
+# keyset ordering of search results, best match first
+SEARCH_ORDERING = ('-rank', '-id')
+
+# ordering query param values, every ordering ends in id to stay unique
+# for keyset pagination and is served by a (user, field, id) index
+ORDERINGS = {
+    'id': ('id',),
+    '-id': ('-id',),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+    'time_minutes': ('time_minutes', 'id'),
+    '-time_minutes': ('-time_minutes', '-id'),
+}
+
+# range query params and their lookups
+RANGES = {
+    'price_min': 'price__gte',
+    'price_max': 'price__lte',
+    'time_max': 'time_minutes__lte',
+}
+
+
+def filter_by_related(queryset, relation, ids, match=MATCH_ANY):
+    """keep recipes linked to any or all of the given related ids
+
+    both modes query the m2m through table in a subquery instead of
+    joining it, so a recipe matching several ids is returned once.
+    `any` is a correlated EXISTS, `all` a GROUP BY recipe HAVING count
+    over the (related_id, recipe_id) index of the through table
+    """
+    ids = set(ids)
+    field = Recipe._meta.get_field(relation)
+    source = field.m2m_column_name()
+    target = field.m2m_reverse_name()
+    links = field.remote_field.through.objects.filter(
+        **{f'{target}__in': ids}
+    )
+
+    if match == MATCH_ALL:
+        matching = links.values(source).annotate(
+            matched=Count(target)
+        ).filter(matched=len(ids)).values(source)
+        return queryset.filter(pk__in=matching)
+
+    annotation = f'has_{relation}'
+    return queryset.annotate(**{
+        annotation: Exists(links.filter(**{source: OuterRef('pk')}))
+    }).filter(**{annotation: True})
+
+
+def search(queryset, term):
+    """keep recipes matching the term in title, tag or ingredient names
+
+    on postgres this is a full text search on the GIN indexed
+    search_vector, annotated with its rank. other databases fall back to
+    an unranked LIKE search, so `rank` is constant there
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        query = SearchQuery(term, config=settings.RECIPE_SEARCH_CONFIG)
+        # ts_rank returns a real, as a double it survives the JSON
+        # round trip through the pagination cursor exactly
+        return queryset.annotate(rank=Cast(
+            SearchRank(F('search_vector'), query),
+            FloatField()
+        )).filter(search_vector=query)
+
+    tags = Tag.objects.filter(name__icontains=term)
+    ingredients = Ingredient.objects.filter(name__icontains=term)
+    return queryset.annotate(
+        rank=Value(0.0, output_field=FloatField())
+    ).filter(
+        Q(title__icontains=term) |
+        Q(pk__in=Recipe.tags.through.objects.filter(
+            tag__in=tags
+        ).values('recipe_id')) |
+        Q(pk__in=Recipe.ingredients.through.objects.filter(
+            ingredient__in=ingredients
+        ).values('recipe_id'))
+    )
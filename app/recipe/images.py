@@ -0,0 +1,161 @@
+import io
+import logging
+import time
+from datetime import timedelta
+
+from PIL import Image, features
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from core import metrics
+from core.models import Recipe, RecipeImageRendition
+from core.storage import image_storage
+
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'uploads/recipe/renditions/'
+
+
+def _formats():
+    """return the (format, extension) pairs renditions are encoded to"""
+    formats = [('jpeg', 'jpg')]
+    if features.check('webp'):
+        formats.append(('webp', 'webp'))
+
+    return formats
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    if fmt == 'jpeg':
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(buffer, format='JPEG', quality=85, optimize=True,
+                   progressive=True)
+    else:
+        image.save(buffer, format='WEBP', quality=80, method=4)
+
+    return buffer.getvalue()
+
+
+def build_renditions(source_name, storage):
+    """resize a stored image to every configured size and format
+
+    returns unsaved RecipeImageRendition objects, their files are
+    already written to storage
+    """
+    renditions = []
+
+    with storage.open(source_name) as source:
+        original = Image.open(source)
+        original.load()
+
+    if original.mode not in ('RGB', 'RGBA', 'L'):
+        original = original.convert('RGBA')
+
+    for name, size in settings.RECIPE_IMAGE_RENDITIONS.items():
+        image = original.copy()
+        image.thumbnail((size, size), Image.LANCZOS)
+
+        for fmt, ext in _formats():
+            path = storage.save(
+                f'{RENDITIONS_DIR}{name}.{ext}',
+                ContentFile(_encode(image, fmt))
+            )
+            renditions.append(RecipeImageRendition(
+                name=name,
+                format=fmt,
+                width=image.width,
+                height=image.height,
+                image=path
+            ))
+
+    return renditions
+
+
+def referenced(names):
+    """the names of `names` a recipe or rendition refers to"""
+    names = list(names)
+    return set(
+        Recipe.objects.filter(image__in=names).values_list('image', flat=True)
+    ).union(
+        RecipeImageRendition.objects.filter(
+            image__in=names
+        ).values_list('image', flat=True)
+    )
+
+
+def unreferenced(names, grace):
+    """the names of `names` whose file no recipe or rendition refers to
+
+    stored files are shared by every row with the same content (see
+    core.storage), the rows referring to a file are its reference count.
+    files saved or reused within the last `grace` seconds are left out,
+    an upload of the same content may not be committed yet
+    """
+    names = set(names) - {''}
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    for name in sorted(names - referenced(names)):
+        try:
+            if image_storage.get_saved_time(name) <= cutoff:
+                yield name
+        except FileNotFoundError:
+            pass
+
+
+def delete_unreferenced(names, grace=None):
+    """delete the files of `names` nothing refers to anymore"""
+    if grace is None:
+        grace = settings.RECIPE_IMAGE_DELETE_GRACE
+    for name in unreferenced(names, grace):
+        image_storage.delete(name)
+
+
+def process_recipe_image(recipe_id):
+    """generate the renditions of a recipe's current image
+
+    the recipe may get a new image while this runs, results are only
+    stored if the image they were built from is still the current one
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).only('id', 'image').first()
+    if recipe is None or not recipe.image:
+        return
+
+    source_name = recipe.image.name
+    current = Recipe.objects.filter(pk=recipe_id, image=source_name)
+    current.update(image_status=Recipe.IMAGE_PROCESSING)
+    start = time.perf_counter()
+
+    try:
+        renditions = build_renditions(source_name, recipe.image.storage)
+    except Exception:
+        logger.exception('failed to process image of recipe %s', recipe_id)
+        current.update(image_status=Recipe.IMAGE_FAILED)
+        metrics.IMAGE_PROCESSING.labels('failed').observe(
+            time.perf_counter() - start
+        )
+        return
+
+    with transaction.atomic():
+        still_current = current.select_for_update().exists()
+        if still_current:
+            stale = list(RecipeImageRendition.objects.filter(
+                recipe_id=recipe_id
+            ))
+            RecipeImageRendition.objects.filter(recipe_id=recipe_id).delete()
+            for rendition in renditions:
+                rendition.recipe_id = recipe_id
+            RecipeImageRendition.objects.bulk_create(renditions)
+            current.update(image_status=Recipe.IMAGE_READY)
+
+    delete_unreferenced(
+        rendition.image.name
+        for rendition in (stale if still_current else renditions)
+    )
+    metrics.IMAGE_PROCESSING.labels(
+        'ready' if still_current else 'replaced'
+    ).observe(time.perf_counter() - start)
@@ -0,0 +1,263 @@
+import csv
+import io
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import cache
+
+
+FORMATS = ('ndjson', 'csv')
+# recipe columns of a record, missing optional ones take their default
+FIELDS = ('title', 'time_minutes', 'price', 'link')
+OPTIONAL = {'link': ''}
+RELATIONS = {'tags': Tag, 'ingredients': Ingredient}
+# separates the names in the tags and ingredients columns of csv files
+CSV_NAME_SEPARATOR = '|'
+
+
+class InvalidRecord(ValueError):
+    """a record that can not be imported"""
+
+
+def read_ndjson(lines):
+    """yield the records of NDJSON lines, e.g. an export. relations are
+    lists of names or of objects with a name"""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            raise InvalidRecord(f'invalid JSON: {exc}')
+        if not isinstance(record, dict):
+            raise InvalidRecord('expected a JSON object')
+
+        for relation in RELATIONS:
+            record[relation] = [
+                name['name'] if isinstance(name, dict) else name
+                for name in record.get(relation) or []
+            ]
+        yield record
+
+
+def read_csv(lines):
+    """yield the records of csv lines with a header row, relations are
+    names separated by CSV_NAME_SEPARATOR"""
+    for record in csv.DictReader(lines):
+        for relation in RELATIONS:
+            record[relation] = [
+                name for name in
+                (record.get(relation) or '').split(CSV_NAME_SEPARATOR)
+                if name
+            ]
+        yield record
+
+
+READERS = {'ndjson': read_ndjson, 'csv': read_csv}
+
+
+class RecipeImporter:
+    """insert recipes with tags and ingredients given by name for a user
+
+    names are resolved with in-memory maps of the users tags and
+    ingredients, unknown ones are created once per batch. each batch is
+    one transaction. on postgres recipes and their relations are written
+    with COPY, recipe ids are reserved from the sequence beforehand.
+    other databases use bulk_create. like bulk_create no signals are
+    sent, search documents and list caches are updated per batch
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.db = router.db_for_write(Recipe)
+        self.ids = {
+            relation: dict(model.objects.filter(user=user).values_list(
+                'name', 'id'
+            ))
+            for relation, model in RELATIONS.items()
+        }
+        self.valid = {
+            relation: set(ids) for relation, ids in self.ids.items()
+        }
+
+    def prepare(self, record):
+        """validate a record, return ({field: value}, {relation: names})"""
+        return self.clean_fields(record), {
+            relation: self.clean_names(relation, record[relation])
+            for relation in RELATIONS
+        }
+
+    def import_batch(self, prepared):
+        """insert a batch of prepared records, return the recipe count"""
+        with transaction.atomic(using=self.db):
+            for relation in RELATIONS:
+                self.resolve(relation, {
+                    name for values, names in prepared
+                    for name in names[relation]
+                })
+
+            pks = self.insert([values for values, names in prepared])
+            for relation in RELATIONS:
+                self.link(relation, [
+                    (pk, self.ids[relation][name])
+                    for pk, (values, names) in zip(pks, prepared)
+                    for name in names[relation]
+                ])
+
+            Recipe.objects.using(self.db).filter(
+                pk__in=pks
+            ).refresh_search_vectors()
+
+        cache.bump_version(self.user.pk, 'recipe')
+        return len(pks)
+
+    def clean_fields(self, record):
+        values = {}
+        for name in FIELDS:
+            value = record.get(name)
+            if value is None and name in OPTIONAL:
+                value = OPTIONAL[name]
+            try:
+                values[name] = Recipe._meta.get_field(name).clean(
+                    value, None
+                )
+            except ValidationError as exc:
+                raise InvalidRecord(f'{name}: {" ".join(exc.messages)}')
+
+        return values
+
+    def clean_names(self, relation, names):
+        """strip and dedupe names, each distinct name is validated once"""
+        valid = self.valid[relation]
+        field = RELATIONS[relation]._meta.get_field('name')
+        cleaned = []
+        for name in names:
+            name = str(name).strip()
+            if name not in valid:
+                try:
+                    field.clean(name, None)
+                except ValidationError as exc:
+                    raise InvalidRecord(
+                        f'{relation}: {" ".join(exc.messages)}'
+                    )
+                valid.add(name)
+            cleaned.append(name)
+
+        return list(dict.fromkeys(cleaned))
+
+    def resolve(self, relation, names):
+        """create the names missing from the map"""
+        missing = [name for name in names if name not in self.ids[relation]]
+        if not missing:
+            return
+
+        rows = RELATIONS[relation].objects.using(
+            self.db
+        ).get_or_create_names(self.user, missing)
+        self.ids[relation].update(
+            (name, pk) for name, (pk, created) in rows.items()
+        )
+        cache.bump_version(
+            self.user.pk, RELATIONS[relation]._meta.model_name
+        )
+
+    def insert(self, rows):
+        """insert recipes from {field: value} rows, return their pks"""
+        connection = connections[self.db]
+        if connection.vendor == 'postgresql':
+            return self.copy_recipes(connection, rows)
+
+        recipes = [Recipe(user=self.user, **values) for values in rows]
+        Recipe.objects.using(self.db).bulk_create(recipes)
+        if connection.features.can_return_ids_from_bulk_insert:
+            return [recipe.pk for recipe in recipes]
+
+        # without RETURNING the recipes are the users latest ones, this
+        # transaction holds the write lock since the insert
+        return list(reversed(Recipe.objects.using(self.db).filter(
+            user=self.user
+        ).order_by('-pk').values_list('pk', flat=True)[:len(recipes)]))
+
+    def copy_recipes(self, connection, rows):
+        """COPY the recipes with ids reserved from the pk sequence, the
+        remaining columns take their defaults like bulk_create would"""
+        meta = Recipe._meta
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+                'FROM generate_series(1, %s)',
+                [meta.db_table, meta.pk.column, len(rows)]
+            )
+            pks = [pk for pk, in cursor.fetchall()]
+
+        now = timezone.now()
+        fields = meta.concrete_fields
+        defaults = {
+            field.attname: now if getattr(field, 'auto_now', False) or
+            getattr(field, 'auto_now_add', False) else field.get_default()
+            for field in fields
+        }
+        defaults[meta.get_field('user').attname] = self.user.pk
+
+        _copy(connection, meta.db_table, [field.column for field in fields], (
+            [
+                field.get_db_prep_save(row[field.attname], connection)
+                for field in fields
+            ]
+            for row in (
+                dict(defaults, **values, **{meta.pk.attname: pk})
+                for pk, values in zip(pks, rows)
+            )
+        ))
+        return pks
+
+    def link(self, relation, pairs):
+        """insert (recipe id, related id) rows into the through table"""
+        if not pairs:
+            return
+
+        field = Recipe._meta.get_field(relation)
+        through = field.remote_field.through
+        source = field.m2m_column_name()
+        target = field.m2m_reverse_name()
+        connection = connections[self.db]
+
+        if connection.vendor == 'postgresql':
+            _copy(connection, through._meta.db_table, [source, target], pairs)
+        else:
+            through.objects.using(self.db).bulk_create(
+                through(**{source: pk, target: related_pk})
+                for pk, related_pk in pairs
+            )
+
+
+def _copy_text(value):
+    """a value in the text format of COPY"""
+    if value is None:
+        return '\\N'
+    if type(value) is int:
+        return str(value)
+
+    return str(value).replace('\\', '\\\\').replace(
+        '\t', '\\t'
+    ).replace('\n', '\\n').replace('\r', '\\r')
+
+
+def _copy(connection, table, columns, rows):
+    """COPY rows of values into the columns of a table, postgres only"""
+    quote = connection.ops.quote_name
+    data = io.StringIO(''.join(
+        '\t'.join(_copy_text(value) for value in row) + '\n'
+        for row in rows
+    ))
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {quote(table)} '
+            f'({", ".join(quote(column) for column in columns)}) '
+            f'FROM STDIN',
+            data
+        )
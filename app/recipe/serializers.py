@@ -1,8 +1,108 @@
-from rest_framework import serializers
-from core.models import Tag, Ingredient, Recipe
-
+from collections import defaultdict
 
-class TagSerializer(serializers.ModelSerializer):
+from rest_framework import serializers
+from core.models import Tag, Ingredient, Recipe, RecipeImageRendition
+from core.perf import SerializerTimingMixin, timer
+from recipe.uploads import validate_image_header
+
+
+# fields representing a database value as the value itself
+IDENTITY_FIELDS = (serializers.IntegerField, serializers.CharField)
+RELATION_FIELDS = (serializers.ManyRelatedField, serializers.ListSerializer)
+
+
+class ValuesSerializerMixin:
+    """read only representation of values() rows
+
+    resolves the fields and their conversions once per serializer
+    instead of once per row and field like to_representation, and loads
+    many to many relations for all rows with one query each. supports
+    id lists and nested ValuesSerializerMixin serializers
+    """
+
+    def value_columns(self):
+        """columns the rows passed to represent_rows() need"""
+        fields = self._readable_fields
+        columns = [
+            field.source for field in fields
+            if not isinstance(field, RELATION_FIELDS)
+        ]
+        if len(columns) < len(fields):
+            columns.append(self.Meta.model._meta.pk.attname)
+        return columns
+
+    def represent_rows(self, rows):
+        """return the representation of each row like .data would"""
+        rows = list(rows)
+        with timer('serializer'):
+            return self._represent_rows(rows)
+
+    def _represent_rows(self, rows):
+        columns = []
+        relations = []
+        for field in self._readable_fields:
+            if isinstance(field, RELATION_FIELDS):
+                relations.append(
+                    (field.field_name, self._related_rows(field, rows))
+                )
+            elif isinstance(field, IDENTITY_FIELDS):
+                columns.append((field.field_name, field.source, None))
+            else:
+                columns.append(
+                    (field.field_name, field.source, field.to_representation)
+                )
+
+        pk = self.Meta.model._meta.pk.attname
+        data = []
+        for row in rows:
+            item = {}
+            for name, source, convert in columns:
+                value = row[source]
+                if convert is not None and value is not None:
+                    value = convert(value)
+                item[name] = value
+            for name, related in relations:
+                item[name] = related[row[pk]]
+            data.append(item)
+
+        return data
+
+    def _related_rows(self, field, rows):
+        """map row pks to the representation of their related objects"""
+        relation = self.Meta.model._meta.get_field(field.source)
+        source = relation.m2m_column_name()
+        target = relation.m2m_reverse_field_name()
+        links = relation.remote_field.through.objects.filter(**{
+            f'{source}__in': [
+                row[self.Meta.model._meta.pk.attname] for row in rows
+            ]
+        })
+
+        # the prefetches of RecipeQuerySet order related objects by pk
+        links = links.order_by(source, relation.m2m_reverse_name())
+
+        related = defaultdict(list)
+        if isinstance(field, serializers.ListSerializer):
+            columns = field.child.value_columns()
+            links = list(links.values_list(
+                source, *(f'{target}__{column}' for column in columns)
+            ))
+            objects = field.child.represent_rows(
+                dict(zip(columns, link[1:])) for link in links
+            )
+            for link, obj in zip(links, objects):
+                related[link[0]].append(obj)
+        else:
+            for pk, related_pk in links.values_list(
+                    source, relation.m2m_reverse_name()):
+                related[pk].append(related_pk)
+
+        return related
+
+
+class TagSerializer(ValuesSerializerMixin,
+                    SerializerTimingMixin,
+                    serializers.ModelSerializer):
     """serializer fot tag objects"""
 
     class Meta:
@@ -11,7 +111,9 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(ValuesSerializerMixin,
+                           SerializerTimingMixin,
+                           serializers.ModelSerializer):
 
     class Meta:
         model = Ingredient
@@ -19,7 +121,9 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(ValuesSerializerMixin,
+                       SerializerTimingMixin,
+                       serializers.ModelSerializer):
 
     ingredients = serializers.PrimaryKeyRelatedField(
         many=True,
@@ -31,6 +135,12 @@ class RecipeSerializer(serializers.ModelSerializer):
         queryset=Tag.objects.all()
     )
 
+    # relations ?expand= inlines instead of listing their ids
+    expandable = {
+        'ingredients': IngredientSerializer,
+        'tags': TagSerializer,
+    }
+
     class Meta:
         model = Recipe
         fields = ('id', 'title', 'ingredients', 'tags', 'price',
@@ -38,16 +148,62 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         read_only_fields = ('id',)
 
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        """fields limits the representation to the given field names,
+        expand inlines the given relations"""
+        super().__init__(*args, **kwargs)
+
+        for name in expand:
+            self.fields[name] = self.expandable[name](
+                many=True,
+                read_only=True
+            )
+
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class RecipeBulkSerializer(RecipeSerializer):
+    """takes plain related ids, recipe.bulk checks them for all items
+    with one query"""
+    ingredients = serializers.ListField(child=serializers.IntegerField())
+    tags = serializers.ListField(child=serializers.IntegerField())
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageRenditionSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = RecipeImageRendition
+        fields = ('name', 'format', 'width', 'height', 'image')
+        read_only_fields = fields
+
+
+class RecipeImageSerializer(SerializerTimingMixin,
+                            serializers.ModelSerializer):
     """for uploading images """
+    renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
+        fields = ('id', 'image', 'image_status', 'renditions')
+        read_only_fields = ('id', 'image_status')
+
+    def validate_image(self, value):
+        return validate_image_header(value)
+
+    def get_renditions(self, obj):
+        """renditions of the current image, once processing finished"""
+        if obj.image_status != Recipe.IMAGE_READY:
+            return []
+
+        return RecipeImageRenditionSerializer(
+            obj.renditions.all(),
+            many=True,
+            context=self.context
+        ).data
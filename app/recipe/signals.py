@@ -0,0 +1,100 @@
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import cache
+
+
+def touch_recipes(recipes):
+    """bump updated_at and rebuild the search documents of recipes whose
+    tags or ingredients changed"""
+    now = timezone.now()
+    recipes.update(updated_at=now)
+    recipes.refresh_search_vectors()
+    return now
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_attr_version(sender, instance, **kwargs):
+    cache.bump_version(instance.user_id, sender._meta.model_name)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def touch_renamed_attr_recipes(sender, instance, created, **kwargs):
+    """recipes embed tag and ingredient names"""
+    if created:
+        return
+
+    relation = 'tags' if sender is Tag else 'ingredients'
+    touch_recipes(Recipe.objects.filter(**{relation: instance}))
+    cache.bump_version(instance.user_id, 'recipe')
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_attr_recipes(sender, instance, **kwargs):
+    """the assignments are gone by post_delete"""
+    relation = 'tags' if sender is Tag else 'ingredients'
+    instance._assigned_recipe_ids = list(Recipe.objects.filter(
+        **{relation: instance}
+    ).values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def touch_deleted_attr_recipes(sender, instance, **kwargs):
+    """deletes drop the ids and names from recipes"""
+    touch_recipes(Recipe.objects.filter(
+        pk__in=instance.__dict__.pop('_assigned_recipe_ids', [])
+    ))
+    cache.bump_version(instance.user_id, 'recipe')
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_assigned_version(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """assignments change the assigned_only lists and the recipes"""
+    collection = 'tag' if sender is Recipe.tags.through else 'ingredient'
+
+    if action == 'pre_clear' and reverse:
+        # the cleared recipes are gone by post_clear
+        instance._cleared_recipe_ids = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+        return
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        instance.updated_at = touch_recipes(
+            Recipe.objects.filter(pk=instance.pk)
+        )
+    else:
+        if action == 'post_clear':
+            pk_set = instance.__dict__.pop('_cleared_recipe_ids', [])
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+
+    cache.bump_version(instance.user_id, collection, 'recipe')
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_saved_recipe(sender, instance, update_fields, **kwargs):
+    """the title is part of the search document"""
+    if update_fields is None or 'title' in update_fields:
+        Recipe.objects.filter(pk=instance.pk).refresh_search_vectors()
+
+    cache.bump_version(instance.user_id, 'recipe')
+
+
+@receiver(post_delete, sender=Recipe)
+def bump_deleted_recipe_versions(sender, instance, **kwargs):
+    cache.bump_version(instance.user_id, 'tag', 'ingredient', 'recipe')
@@ -0,0 +1,51 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from recipe import images
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """return the per process image worker pool, created on first use
+
+    created lazily so pre-forking servers start one pool per worker
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.RECIPE_IMAGE_WORKERS,
+                    thread_name_prefix='recipe-image'
+                )
+
+    return _executor
+
+
+def _process(recipe_id):
+    """run in a pool thread, which owns its own db connection"""
+    close_old_connections()
+    try:
+        images.process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception('image task for recipe %s crashed', recipe_id)
+    finally:
+        close_old_connections()
+
+
+def enqueue_image_processing(recipe_id):
+    """process a recipe image once the current transaction commits"""
+    if settings.RECIPE_IMAGE_PROCESSING_EAGER:
+        images.process_recipe_image(recipe_id)
+        return
+
+    transaction.on_commit(lambda: get_executor().submit(_process, recipe_id))
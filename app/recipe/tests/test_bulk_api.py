@@ -0,0 +1,235 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Tag, Ingredient, Recipe
+
+
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredient-bulk')
+
+
+def sample_recipe(user, **params):
+    defaults = {
+        'title': 'sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class BulkApiTests(TestCase):
+    """test the bulk endpoints"""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'bulk@me.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='salt'
+        )
+
+    def recipe_items(self, count):
+        return [
+            {
+                'title': f'recipe {i}',
+                'time_minutes': i,
+                'price': '1.50',
+                'tags': [self.tag.id],
+                'ingredients': [self.ingredient.id],
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create_ingredients(self):
+        res = self.client.post(
+            INGREDIENTS_BULK_URL,
+            [{'name': 'pepper'}, {'name': 'sugar'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        ids = [item['id'] for item in res.data['results']]
+        names = Ingredient.objects.filter(pk__in=ids).values_list(
+            'name', flat=True
+        )
+        self.assertEqual(sorted(names), ['pepper', 'sugar'])
+
+    def test_bulk_create_existing_names(self):
+        res = self.client.post(
+            TAGS_BULK_URL,
+            [{'name': 'vegan'}, {'name': 'raw'}, {'name': 'raw'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        results = res.data['results']
+        self.assertEqual(
+            [item['status'] for item in results], [200, 201, 201]
+        )
+        self.assertEqual(results[0]['id'], self.tag.id)
+        self.assertEqual(results[1]['id'], results[2]['id'])
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_bulk_rename_conflict(self):
+        spare = Tag.objects.create(user=self.user, name='spare')
+
+        res = self.client.patch(
+            TAGS_BULK_URL, [{'id': spare.id, 'name': 'vegan'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        spare.refresh_from_db()
+        self.assertEqual(spare.name, 'spare')
+
+    def test_bulk_create_recipes(self):
+        res = self.client.post(
+            RECIPES_BULK_URL, self.recipe_items(3), format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['results']), 3)
+        for item in res.data['results']:
+            recipe = Recipe.objects.get(pk=item['id'])
+            self.assertEqual(recipe.user, self.user)
+            self.assertEqual(list(recipe.tags.all()), [self.tag])
+            self.assertEqual(
+                list(recipe.ingredients.all()), [self.ingredient]
+            )
+
+    def test_bulk_create_query_count_constant(self):
+        counts = []
+        for size in (2, 20):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(
+                    RECIPES_BULK_URL, self.recipe_items(size), format='json'
+                )
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_bulk_create_all_or_nothing(self):
+        other = get_user_model().objects.create_user('other@me.com', 'pass')
+        foreign = Tag.objects.create(user=other, name='foreign')
+        items = self.recipe_items(3)
+        items[1]['tags'] = [foreign.id]
+        del items[2]['title']
+
+        res = self.client.post(RECIPES_BULK_URL, items, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        results = res.data['results']
+        self.assertEqual(results[0]['status'], 424)
+        self.assertIn('tags', results[1]['errors'])
+        self.assertIn('title', results[2]['errors'])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_requires_list(self):
+        res = self.client.post(
+            TAGS_BULK_URL, {'name': 'single'}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update_recipes(self):
+        first = sample_recipe(self.user)
+        second = sample_recipe(self.user)
+        first.tags.add(self.tag)
+
+        res = self.client.patch(RECIPES_BULK_URL, [
+            {'id': first.id, 'title': 'changed', 'tags': []},
+            {'id': second.id, 'price': '9.99'},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.title, 'changed')
+        self.assertEqual(str(first.price), '5.00')
+        self.assertEqual(first.tags.count(), 0)
+        self.assertEqual(second.title, 'sample recipe')
+        self.assertEqual(str(second.price), '9.99')
+
+    def test_bulk_update_other_user_not_found(self):
+        other = get_user_model().objects.create_user('other@me.com', 'pass')
+        recipe = sample_recipe(other)
+
+        res = self.client.patch(
+            RECIPES_BULK_URL, [{'id': recipe.id, 'title': 'mine'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data['results'][0]['errors'])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'sample recipe')
+
+    def test_bulk_update_tags_touches_recipes(self):
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(self.tag)
+        before = Recipe.objects.get(pk=recipe.pk).updated_at
+
+        self.client.patch(
+            TAGS_BULK_URL, [{'id': self.tag.id, 'name': 'vegetarian'}],
+            format='json'
+        )
+
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.name, 'vegetarian')
+        self.assertGreater(
+            Recipe.objects.get(pk=recipe.pk).updated_at, before
+        )
+
+    def test_bulk_delete(self):
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(self.tag)
+        spare = Tag.objects.create(user=self.user, name='spare')
+
+        res = self.client.delete(
+            TAGS_BULK_URL, [self.tag.id, spare.id], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(Tag.objects.exists())
+        self.assertEqual(recipe.tags.count(), 0)
+
+        res = self.client.delete(RECIPES_BULK_URL, [recipe.id], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_delete_invalidates_list_cache(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        tags_url = reverse('recipe:tag-list')
+
+        with override_settings(
+            CACHES={**settings.CACHES, 'recipes': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            }},
+            RECIPE_CACHE='recipes'
+        ):
+            self.client.get(tags_url)
+
+            self.client.delete(TAGS_BULK_URL, [self.tag.id], format='json')
+
+            self.assertEqual(self.client.get(tags_url).data['results'], [])
@@ -0,0 +1,209 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Tag, Ingredient, Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def shared_recipe_cache(location):
+    """RECIPE_CACHE in a file based cache, which like memcached is seen by
+    every worker using the same location"""
+    return override_settings(
+        CACHES={**settings.CACHES, 'recipes': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': location,
+        }},
+        RECIPE_CACHE='recipes'
+    )
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ConditionalGetTests(TestCase):
+    """test ETag and Last-Modified handling of recipe endpoints"""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        shared = shared_recipe_cache(self.location)
+        shared.enable()
+        self.addCleanup(shared.disable)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'etag@me.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='vegan')
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pancakes',
+            time_minutes=10,
+            price=5.00
+        )
+
+    def revalidate(self, url, res):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+    def test_unchanged_list_not_modified_without_queries(self):
+        for url in (RECIPES_URL, TAGS_URL, INGREDIENTS_URL):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+            with self.assertNumQueries(0):
+                again = self.revalidate(url, res)
+
+            self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(again['ETag'], res['ETag'])
+
+    def test_list_modified_after_create(self):
+        res = self.client.get(RECIPES_URL)
+        Recipe.objects.create(
+            user=self.user, title='Waffles', time_minutes=5, price=3.00
+        )
+
+        again = self.revalidate(RECIPES_URL, res)
+
+        self.assertEqual(again.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(again.data['results']), 2)
+
+    def test_list_modified_after_assignment(self):
+        res = self.client.get(RECIPES_URL)
+        self.recipe.tags.add(self.tag)
+
+        again = self.revalidate(RECIPES_URL, res)
+
+        self.assertEqual(again.status_code, status.HTTP_200_OK)
+        self.assertEqual(again.data['results'][0]['tags'], [self.tag.id])
+
+    def test_list_modified_through_other_worker(self):
+        """test a write handled by another worker changes the list ETag
+        this worker answers with"""
+        res = self.client.get(TAGS_URL)
+
+        with shared_recipe_cache(self.location):
+            self.client.post(TAGS_URL, {'name': 'baked'})
+
+        again = self.revalidate(TAGS_URL, res)
+
+        self.assertEqual(again.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(again['ETag'], res['ETag'])
+
+    def test_list_validated_by_content_without_shared_cache(self):
+        with self.settings(RECIPE_CACHE='default'):
+            res = self.client.get(TAGS_URL)
+            again = self.revalidate(TAGS_URL, res)
+            self.assertEqual(
+                again.status_code, status.HTTP_304_NOT_MODIFIED
+            )
+
+            Tag.objects.filter(pk=self.tag.pk).update(name='baked')
+            again = self.revalidate(TAGS_URL, res)
+
+        self.assertEqual(again.status_code, status.HTTP_200_OK)
+        self.assertEqual(again.data['results'][0]['name'], 'baked')
+
+    def test_list_etag_per_query(self):
+        res = self.client.get(RECIPES_URL)
+        other = self.client.get(RECIPES_URL, {'tags': self.tag.id})
+
+        self.assertNotEqual(res['ETag'], other['ETag'])
+
+    def test_retrieve_not_modified(self):
+        url = detail_url(self.recipe.id)
+        res = self.client.get(url)
+        self.assertIn('Last-Modified', res)
+
+        with self.assertNumQueries(1):
+            again = self.revalidate(url, res)
+        since = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=res['Last-Modified']
+        )
+
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(since.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_retrieve_modified_after_tag_rename(self):
+        self.recipe.tags.add(self.tag)
+        url = detail_url(self.recipe.id)
+        res = self.client.get(url)
+
+        self.tag.name = 'vegetarian'
+        self.tag.save()
+        again = self.revalidate(url, res)
+
+        self.assertEqual(again.status_code, status.HTTP_200_OK)
+        self.assertEqual(again.data['tags'][0]['name'], 'vegetarian')
+
+    def test_retrieve_tag_not_modified(self):
+        url = reverse('recipe:tag-detail', args=[self.tag.id])
+        res = self.client.get(url)
+
+        self.assertEqual(res.data['name'], 'vegan')
+        self.assertEqual(
+            self.revalidate(url, res).status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+
+    def test_retrieve_missing_not_found(self):
+        res = self.client.get(detail_url(0), HTTP_IF_NONE_MATCH='"x"')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class UpdatedAtTests(TestCase):
+    """test updated_at follows changes of recipe relations"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'updated@me.com',
+            'testpass'
+        )
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='eggs'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Omelette',
+            time_minutes=5,
+            price=2.00
+        )
+
+    def assert_touched(self, change):
+        before = Recipe.objects.get(pk=self.recipe.pk).updated_at
+        change()
+        after = Recipe.objects.get(pk=self.recipe.pk).updated_at
+
+        self.assertGreater(after, before)
+
+    def test_assignments_touch_recipe(self):
+        self.assert_touched(
+            lambda: self.recipe.ingredients.add(self.ingredient)
+        )
+        self.assert_touched(
+            lambda: self.recipe.ingredients.remove(self.ingredient)
+        )
+
+    def test_reverse_clear_touches_recipe(self):
+        self.recipe.ingredients.add(self.ingredient)
+
+        self.assert_touched(lambda: self.ingredient.recipe_set.clear())
+
+    def test_delete_touches_recipe(self):
+        self.recipe.ingredients.add(self.ingredient)
+
+        self.assert_touched(self.ingredient.delete)
@@ -0,0 +1,100 @@
+import gzip
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import export
+from recipe.serializers import RecipeDetailSerializer
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def parse_lines(content):
+    return [json.loads(line) for line in content.decode().splitlines()]
+
+
+class RecipeExportTests(TestCase):
+    """test streaming the recipes of a user as NDJSON"""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'export@me.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        salt = Ingredient.objects.create(user=self.user, name='salt')
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_minutes=i,
+                price='2.50'
+            )
+            recipe.tags.add(tag)
+            recipe.ingredients.add(salt)
+
+    def expected(self):
+        return json.loads(json.dumps(RecipeDetailSerializer(
+            Recipe.objects.filter(user=self.user).order_by('id'), many=True
+        ).data))
+
+    def test_export_requires_login(self):
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_streams_ndjson(self):
+        other = get_user_model().objects.create_user('other@me.com', 'pass')
+        Recipe.objects.create(
+            user=other, title='Other', time_minutes=1, price=1
+        )
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], export.CONTENT_TYPE)
+        content = b''.join(res.streaming_content)
+        self.assertEqual(parse_lines(content), self.expected())
+
+    def test_export_gzip(self):
+        res = self.client.get(EXPORT_URL, {'gzip': 1})
+
+        self.assertEqual(res['Content-Type'], export.GZIP_CONTENT_TYPE)
+        self.assertIn('recipes.ndjson.gz', res['Content-Disposition'])
+        content = gzip.decompress(b''.join(res.streaming_content))
+        self.assertEqual(parse_lines(content), self.expected())
+
+    def test_export_in_chunks(self):
+        chunks = list(export.export_recipes(self.user, chunk_size=2))
+
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(parse_lines(b''.join(chunks)), self.expected())
+
+    def test_export_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'recipes.ndjson.gz')
+            call_command(
+                'export_recipes', 'export@me.com', output=path, gzip=True
+            )
+            with gzip.open(path) as exported:
+                content = exported.read()
+
+        self.assertEqual(parse_lines(content), self.expected())
+
+    def test_export_command_unknown_user(self):
+        with self.assertRaises(CommandError):
+            call_command('export_recipes', 'nobody@me.com')
@@ -0,0 +1,152 @@
+import io
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from core.models import Recipe
+from recipe import images, tasks
+
+
+def sample_image(size=(300, 200), fmt='PNG'):
+    """return an encoded image"""
+    buffer = io.BytesIO()
+    Image.new('RGBA', size).save(buffer, format=fmt)
+    return ContentFile(buffer.getvalue(), name=f'sample.{fmt.lower()}')
+
+
+class ImageProcessingTests(TestCase):
+    """test generating recipe image renditions"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'images@me.com',
+            'testpass'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pancakes',
+            time_minutes=10,
+            price=5.00,
+            image_status=Recipe.IMAGE_PENDING
+        )
+
+    def tearDown(self):
+        for rendition in self.recipe.renditions.all():
+            rendition.image.delete()
+        self.recipe.image.delete()
+
+    def test_process_recipe_image(self):
+        """test every size and format is generated"""
+        self.recipe.image.save('sample.png', sample_image())
+
+        images.process_recipe_image(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        renditions = {
+            (rendition.name, rendition.format): rendition
+            for rendition in self.recipe.renditions.all()
+        }
+        self.assertEqual(len(renditions), 6)
+        self.assertEqual(renditions[('small', 'webp')].width, 160)
+        # renditions are never upscaled
+        self.assertEqual(renditions[('large', 'jpeg')].width, 300)
+
+    def test_reprocessing_reuses_rendition_files(self):
+        """test renditions of the same image share their files"""
+        self.recipe.image.save('sample.png', sample_image())
+        images.process_recipe_image(self.recipe.id)
+        old = {r.pk: r.image.name for r in self.recipe.renditions.all()}
+
+        images.process_recipe_image(self.recipe.id)
+
+        renditions = list(self.recipe.renditions.all())
+        self.assertFalse(old.keys() & {r.pk for r in renditions})
+        self.assertEqual(
+            set(old.values()), {r.image.name for r in renditions}
+        )
+        for rendition in renditions:
+            self.assertTrue(
+                rendition.image.storage.exists(rendition.image.name)
+            )
+
+    @override_settings(RECIPE_IMAGE_DELETE_GRACE=0)
+    def test_reprocessing_deletes_unreferenced_files(self):
+        """test renditions of a replaced image are removed"""
+        self.recipe.image.save('sample.png', sample_image())
+        images.process_recipe_image(self.recipe.id)
+        old = list(self.recipe.renditions.all())
+
+        self.recipe.image.save('sample.png', sample_image(size=(200, 300)))
+        images.process_recipe_image(self.recipe.id)
+
+        self.assertEqual(self.recipe.renditions.count(), len(old))
+        for rendition in old:
+            self.assertFalse(
+                rendition.image.storage.exists(rendition.image.name)
+            )
+
+    @override_settings(RECIPE_IMAGE_DELETE_GRACE=0)
+    def test_shared_files_kept(self):
+        """test files another recipe refers to are not deleted"""
+        self.recipe.image.save('sample.png', sample_image())
+        other = Recipe.objects.create(
+            user=self.user, title='Waffles', time_minutes=10, price=5.00,
+            image=self.recipe.image.name
+        )
+        name = self.recipe.image.name
+
+        images.delete_unreferenced([name])
+        self.assertTrue(self.recipe.image.storage.exists(name))
+
+        Recipe.objects.filter(pk__in=[self.recipe.pk, other.pk]).delete()
+        images.delete_unreferenced([name])
+        self.assertFalse(self.recipe.image.storage.exists(name))
+
+    def test_recently_saved_files_kept(self):
+        """test an upload reusing a file may still commit"""
+        self.recipe.image.save('sample.png', sample_image())
+        name = self.recipe.image.name
+        Recipe.objects.filter(pk=self.recipe.pk).update(image=None)
+
+        images.delete_unreferenced([name], grace=60)
+
+        self.assertTrue(self.recipe.image.storage.exists(name))
+
+    def test_stale_image_discarded(self):
+        """test renditions of a replaced image are thrown away"""
+        self.recipe.image.save('sample.png', sample_image())
+        build = images.build_renditions
+
+        def replace_image_while_building(name, storage):
+            renditions = build(name, storage)
+            Recipe.objects.filter(pk=self.recipe.pk).update(image='other.png')
+            return renditions
+
+        with patch('recipe.images.build_renditions',
+                   side_effect=replace_image_while_building):
+            images.process_recipe_image(self.recipe.id)
+
+        self.assertFalse(self.recipe.renditions.exists())
+
+    def test_invalid_image_failed(self):
+        """test unreadable images are marked as failed"""
+        self.recipe.image.save('broken.png', ContentFile(b'not an image'))
+
+        images.process_recipe_image(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+
+    @patch('recipe.tasks.transaction.on_commit')
+    def test_enqueue_after_commit(self, on_commit):
+        """test processing is deferred until the upload is committed"""
+        tasks.enqueue_image_processing(self.recipe.id)
+
+        self.assertEqual(on_commit.call_count, 1)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_PENDING)
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from django.urls import reverse
 from django.test import TestCase
 from rest_framework import status
@@ -12,6 +13,7 @@ INGREDIENTS_URL = reverse('recipe:ingredient-list')
 
 class PublicIngredientsAPITests(TestCase):
     def setUp(self):
+        caches['throttle'].clear()
         self.client = APIClient()
 
     def test_login_required(self):
@@ -25,6 +27,7 @@ class PrivateIngredientsAPITests(TestCase):
     """test the private API"""
 
     def setUp(self):
+        caches['throttle'].clear()
         self.client = APIClient()
 
         self.user = get_user_model().objects.create_user(
@@ -43,7 +46,7 @@ class PrivateIngredientsAPITests(TestCase):
         serializer = IngredientSerializer(ingredients, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         other_user = get_user_model().objects.create_user(
@@ -57,8 +60,8 @@ class PrivateIngredientsAPITests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0].get('name'), ingredient.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0].get('name'), ingredient.name)
 
     def test_create_ingredients_successful(self):
         payload = {'name': 'milky'}
@@ -97,8 +100,8 @@ class PrivateIngredientsAPITests(TestCase):
 
         serializer1 = IngredientSerializer(ingredient1)
         serializer2 = IngredientSerializer(ingredient2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_ingredient_assigned_unique(self):
         """Test filtering ingredients by assigned returns unique items"""
@@ -120,4 +123,4 @@ class PrivateIngredientsAPITests(TestCase):
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
@@ -0,0 +1,125 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core.models import Tag, Ingredient, Recipe
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def shared_recipe_cache(location):
+    """RECIPE_CACHE in a file based cache, which like memcached is seen by
+    every worker using the same location"""
+    return override_settings(
+        CACHES={**settings.CACHES, 'recipes': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': location,
+        }},
+        RECIPE_CACHE='recipes'
+    )
+
+
+class ListCacheTests(TestCase):
+    """test caching of tag and ingredient list responses"""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        shared = shared_recipe_cache(self.location)
+        shared.enable()
+        self.addCleanup(shared.disable)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'cache@me.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pancakes',
+            time_minutes=10,
+            price=5.00
+        )
+
+    def names(self, url, params=None):
+        res = self.client.get(url, params)
+        return [item['name'] for item in res.data['results']]
+
+    def test_repeat_reads_run_no_queries(self):
+        Tag.objects.create(user=self.user, name='vegan')
+        self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'][0]['name'], 'vegan')
+
+    def test_create_invalidates(self):
+        self.assertEqual(self.names(TAGS_URL), [])
+
+        self.client.post(TAGS_URL, {'name': 'vegan'})
+
+        self.assertEqual(self.names(TAGS_URL), ['vegan'])
+
+    def test_delete_invalidates(self):
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        self.assertEqual(self.names(TAGS_URL), ['vegan'])
+
+        self.client.delete(reverse('recipe:tag-detail', args=[tag.id]))
+
+        self.assertEqual(self.names(TAGS_URL), [])
+
+    def test_assignment_invalidates_assigned_only(self):
+        ingredient = Ingredient.objects.create(user=self.user, name='eggs')
+        params = {'assigned_only': 1}
+        self.assertEqual(self.names(INGREDIENTS_URL, params), [])
+
+        self.recipe.ingredients.add(ingredient)
+        self.assertEqual(self.names(INGREDIENTS_URL, params), ['eggs'])
+
+        self.recipe.delete()
+        self.assertEqual(self.names(INGREDIENTS_URL, params), [])
+
+    def test_query_params_cached_separately(self):
+        Tag.objects.create(user=self.user, name='vegan')
+
+        self.assertEqual(self.names(TAGS_URL), ['vegan'])
+        self.assertEqual(self.names(TAGS_URL, {'assigned_only': 1}), [])
+
+    def test_cache_per_user(self):
+        Tag.objects.create(user=self.user, name='vegan')
+        self.client.get(TAGS_URL)
+        other = get_user_model().objects.create_user('other@me.com', 'pass')
+        self.client.force_authenticate(other)
+
+        self.assertEqual(self.names(TAGS_URL), [])
+
+    def test_other_worker_write_seen(self):
+        """test a write handled by another worker invalidates the lists
+        this worker cached"""
+        Tag.objects.create(user=self.user, name='vegan')
+        self.assertEqual(self.names(TAGS_URL), ['vegan'])
+
+        with shared_recipe_cache(self.location):
+            self.client.post(TAGS_URL, {'name': 'baked'})
+
+        self.assertEqual(self.names(TAGS_URL), ['vegan', 'baked'])
+
+    def test_process_local_cache_ignored(self):
+        """test lists are not cached in a cache of one worker"""
+        Tag.objects.create(user=self.user, name='vegan')
+
+        with self.settings(RECIPE_CACHE='default'):
+            self.client.get(TAGS_URL)
+            with self.assertNumQueries(1):
+                res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'][0]['name'], 'vegan')
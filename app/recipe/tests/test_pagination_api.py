@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Tag, Ingredient, Recipe
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class KeysetPaginationTests(TestCase):
+    """test cursor pagination of the recipe API lists"""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'pages@me.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, page_size):
+        """follow next links and return every page of results"""
+        pages = []
+        res = self.client.get(url, {'page_size': page_size})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data['results'])
+            if not res.data['next']:
+                return pages
+            res = self.client.get(res.data['next'])
+
+    def test_tags_ordered_by_name(self):
+        """test tags are split across pages in name order"""
+        for name in ['b', 'a', 'e', 'c', 'd']:
+            Tag.objects.create(user=self.user, name=name)
+
+        pages = self.walk(TAGS_URL, 2)
+
+        expected = list(
+            Tag.objects.order_by('-name', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(
+            [tag['id'] for page in pages for tag in page],
+            expected
+        )
+
+    def test_ingredients_paginated(self):
+        """test ingredients list is paginated"""
+        for i in range(3):
+            Ingredient.objects.create(user=self.user, name=f'ingredient {i}')
+
+        pages = self.walk(INGREDIENTS_URL, 2)
+
+        self.assertEqual([len(page) for page in pages], [2, 1])
+
+    def test_recipes_ordered_by_id_desc(self):
+        """test recipes are paginated newest first"""
+        recipes = [
+            Recipe.objects.create(
+                user=self.user, title=f'recipe {i}', time_minutes=5, price=1
+            )
+            for i in range(5)
+        ]
+
+        pages = self.walk(RECIPES_URL, 2)
+
+        self.assertEqual(
+            [recipe['id'] for page in pages for recipe in page],
+            [recipe.id for recipe in reversed(recipes)]
+        )
+
+    def test_previous_link(self):
+        """test previous link returns the page before"""
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f'tag {i}')
+
+        first = self.client.get(TAGS_URL, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertEqual(back.data['next'], first.data['next'])
+
+    def test_invalid_cursor(self):
+        """test a tampered cursor is rejected"""
+        res = self.client.get(TAGS_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_deep_page_seeks_without_offset(self):
+        """test following pages filters on the key instead of OFFSET"""
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f'tag {i}')
+        first = self.client.get(TAGS_URL, {'page_size': 2})
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(first.data['next'])
+
+        self.assertEqual(len(ctx.captured_queries), 1)
+        sql = ctx.captured_queries[0]['sql']
+        self.assertNotIn('OFFSET', sql)
+        # the leading bound an index range can start from
+        self.assertIn('"core_tag"."name" <=', sql)
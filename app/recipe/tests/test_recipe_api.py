@@ -1,12 +1,15 @@
 import tempfile
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import caches
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from prometheus_client import REGISTRY
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -54,6 +57,7 @@ class PublicRecipeApiTests(TestCase):
     """Test unauthenticated recipe API access"""
 
     def setUp(self):
+        caches['throttle'].clear()
         self.client = APIClient()
 
     def test_required_auth(self):
@@ -67,6 +71,7 @@ class PrivateRecipeApiTests(TestCase):
     """Test authenticated recipe API access"""
 
     def setUp(self):
+        caches['throttle'].clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             'test@londonappdev.com',
@@ -84,7 +89,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test retrieving recipes for user"""
@@ -100,8 +105,8 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         """Test viewing a recipe detail"""
@@ -223,9 +228,9 @@ class PrivateRecipeApiTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """Test returning recipes with specific ingredients"""
@@ -245,22 +250,200 @@ class PrivateRecipeApiTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+    def test_filter_recipes_by_tags_unique(self):
+        """Test recipes matching several tags are returned once"""
+        recipe = sample_recipe(user=self.user)
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Dessert')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': '{},{}'.format(tag1.id, tag2.id)}
+        )
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_recipes_by_all_tags(self):
+        """Test returning recipes having every requested tag"""
+        recipe1 = sample_recipe(user=self.user, title='Vegan cake')
+        recipe2 = sample_recipe(user=self.user, title='Vegan curry')
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Dessert')
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag1)
+
+        res = self.client.get(RECIPES_URL, {
+            'tags': '{},{},{}'.format(tag1.id, tag2.id, tag1.id),
+            'tags_match': 'all',
+        })
+
+        # the API lists related ids in primary key order
+        serializer1 = RecipeSerializer(
+            Recipe.objects.with_related_ids('tags', 'ingredients').get(
+                pk=recipe1.pk
+            )
+        )
+        self.assertEqual(res.data['results'], [serializer1.data])
+
+    def test_filter_recipes_by_all_ingredients(self):
+        """Test returning recipes having every requested ingredient"""
+        recipe1 = sample_recipe(user=self.user, title='Omelette')
+        recipe2 = sample_recipe(user=self.user, title='Boiled eggs')
+        ingredient1 = sample_ingredient(user=self.user, name='Eggs')
+        ingredient2 = sample_ingredient(user=self.user, name='Milk')
+        recipe1.ingredients.add(ingredient1, ingredient2)
+        recipe2.ingredients.add(ingredient1)
+
+        res = self.client.get(RECIPES_URL, {
+            'ingredients': '{},{}'.format(ingredient1.id, ingredient2.id),
+            'ingredients_match': 'all',
+        })
+
+        # the API lists related ids in primary key order
+        serializer1 = RecipeSerializer(
+            Recipe.objects.with_related_ids('tags', 'ingredients').get(
+                pk=recipe1.pk
+            )
+        )
+        self.assertEqual(res.data['results'], [serializer1.data])
+
+    def test_filter_recipes_invalid_params(self):
+        """Test invalid filter params are rejected"""
+        res1 = self.client.get(RECIPES_URL, {'tags': '1,abc'})
+        res2 = self.client.get(RECIPES_URL, {'tags': '1', 'tags_match': 'x'})
+
+        self.assertEqual(res1.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res2.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_recipes_by_price_and_time(self):
+        """Test range filtering on price and time"""
+        cheap = sample_recipe(user=self.user, price=2.00, time_minutes=10)
+        sample_recipe(user=self.user, price=8.00, time_minutes=10)
+        sample_recipe(user=self.user, price=4.00, time_minutes=45)
+        mid = sample_recipe(user=self.user, price=5.00, time_minutes=30)
+
+        res = self.client.get(RECIPES_URL, {
+            'price_min': '1.50',
+            'price_max': '5',
+            'time_max': '30',
+        })
+
+        ids = [recipe['id'] for recipe in res.data['results']]
+        self.assertEqual(ids, [mid.id, cheap.id])
+
+    def test_order_recipes(self):
+        """Test ordering recipes by price and time"""
+        slow = sample_recipe(user=self.user, price=2.00, time_minutes=60)
+        fast = sample_recipe(user=self.user, price=9.00, time_minutes=5)
+        mid = sample_recipe(user=self.user, price=2.00, time_minutes=20)
+
+        by_price = self.client.get(RECIPES_URL, {'ordering': 'price'})
+        by_time = self.client.get(RECIPES_URL, {'ordering': '-time_minutes'})
+
+        self.assertEqual(
+            [recipe['id'] for recipe in by_price.data['results']],
+            [slow.id, mid.id, fast.id]
+        )
+        self.assertEqual(
+            [recipe['id'] for recipe in by_time.data['results']],
+            [slow.id, mid.id, fast.id]
+        )
+
+    def test_order_recipes_pages(self):
+        """Test ordered pages continue after equal prices"""
+        recipes = [
+            sample_recipe(user=self.user, price=price)
+            for price in (3.00, 1.00, 3.00, 2.00)
+        ]
+
+        ids = []
+        res = self.client.get(
+            RECIPES_URL, {'ordering': '-price', 'page_size': 1}
+        )
+        for _ in range(5):
+            ids += [recipe['id'] for recipe in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(ids, [
+            recipes[2].id, recipes[0].id, recipes[3].id, recipes[1].id
+        ])
+
+    def test_range_and_ordering_invalid_params(self):
+        """Test invalid range and ordering params are rejected"""
+        for params in [
+            {'price_min': 'cheap'},
+            {'price_max': 'NaN'},
+            {'time_max': '1e'},
+            {'ordering': 'title'},
+        ]:
+            res = self.client.get(RECIPES_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sparse_fields(self):
+        """Test requesting a subset of fields"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+
+        res = self.client.get(RECIPES_URL, {'fields': 'id,title,tags'})
+        detail = self.client.get(detail_url(recipe.id), {'fields': 'tags'})
+
+        self.assertEqual(res.data['results'], [{
+            'id': recipe.id,
+            'title': recipe.title,
+            'tags': [recipe.tags.get().id],
+        }])
+        self.assertEqual(detail.data, {
+            'tags': [{'id': recipe.tags.get().id, 'name': 'Main course'}]
+        })
+
+    def test_expand_relations(self):
+        """Test inlining related objects in lists"""
+        recipe = sample_recipe(user=self.user)
+        recipe.ingredients.add(sample_ingredient(user=self.user))
+
+        res = self.client.get(RECIPES_URL, {'expand': 'ingredients'})
+
+        serializer = RecipeDetailSerializer(recipe)
+        self.assertEqual(res.data['results'], [serializer.data])
+
+    def test_sparse_fields_invalid_params(self):
+        """Test unknown fields and relations are rejected"""
+        res1 = self.client.get(RECIPES_URL, {'fields': 'id,user'})
+        res2 = self.client.get(RECIPES_URL, {'expand': 'price'})
+
+        self.assertEqual(res1.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res2.status_code, status.HTTP_400_BAD_REQUEST)
 
 
 class RecipeImageUploadTests(TestCase):
 
     def setUp(self):
+        caches['throttle'].clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user('user', 'testpass')
         self.client.force_authenticate(self.user)
         self.recipe = sample_recipe(user=self.user)
 
     def tearDown(self):
+        for rendition in self.recipe.renditions.all():
+            rendition.image.delete()
         self.recipe.image.delete()
 
+    def upload_sample_image(self, size=(10, 10)):
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img = Image.new('RGB', size)
+            img.save(ntf, format='JPEG')
+            ntf.seek(0)
+            return self.client.post(url, {'image': ntf}, format='multipart')
+
     def test_upload_image_to_recipe(self):
         """Test uploading an image to recipe"""
         url = image_upload_url(self.recipe.id)
@@ -275,9 +458,89 @@ class RecipeImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def test_same_image_stored_once(self):
+        """Test recipes with the same image share its file"""
+        self.upload_sample_image()
+        other = sample_recipe(user=self.user, title='Other')
+        url = image_upload_url(other.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+            ntf.seek(0)
+            self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.recipe.image.name, other.image.name)
+
+    @override_settings(RECIPE_IMAGE_DELETE_GRACE=0,
+                       RECIPE_IMAGE_PROCESSING_EAGER=True)
+    @patch('recipe.views.transaction.on_commit', side_effect=lambda f: f())
+    def test_replaced_image_deleted(self, on_commit):
+        """Test uploading a new image removes the file of the old one"""
+        self.upload_sample_image()
+        self.recipe.refresh_from_db()
+        replaced = self.recipe.image.path
+
+        self.upload_sample_image(size=(20, 20))
+
+        self.recipe.refresh_from_db()
+        self.assertNotEqual(self.recipe.image.path, replaced)
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+        self.assertFalse(os.path.exists(replaced))
+
+    @override_settings(RECIPE_IMAGE_PROCESSING_EAGER=True)
+    def test_upload_image_metrics(self):
+        """Test accepted uploads and their processing are measured"""
+        uploads = REGISTRY.get_sample_value('recipe_image_upload_bytes_count')
+        processed = REGISTRY.get_sample_value(
+            'recipe_image_processing_seconds_count', {'result': 'ready'}
+        ) or 0
+
+        self.upload_sample_image()
+
+        self.assertEqual(
+            REGISTRY.get_sample_value('recipe_image_upload_bytes_count'),
+            uploads + 1
+        )
+        self.assertEqual(
+            REGISTRY.get_sample_value(
+                'recipe_image_processing_seconds_count', {'result': 'ready'}
+            ),
+            processed + 1
+        )
+
     def test_upload_image_bad_request(self):
         """Test uploading an invalid image"""
         url = image_upload_url(self.recipe.id)
         res = self.client.post(url, {'image': 'notimage'}, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_image_processing_pending(self):
+        """Test upload returns before renditions are generated"""
+        res = self.upload_sample_image()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
+        self.assertEqual(res.data['renditions'], [])
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.renditions.exists())
+
+    @override_settings(RECIPE_IMAGE_PROCESSING_EAGER=True)
+    def test_upload_image_renditions(self):
+        """Test processed images expose their renditions"""
+        self.upload_sample_image(size=(2000, 1000))
+
+        res = self.client.get(image_upload_url(self.recipe.id))
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_READY)
+        sizes = {
+            (rendition['name'], rendition['format']):
+                (rendition['width'], rendition['height'])
+            for rendition in res.data['renditions']
+        }
+        self.assertEqual(sizes[('small', 'jpeg')], (160, 80))
+        self.assertEqual(sizes[('large', 'jpeg')], (1280, 640))
+        for rendition in self.recipe.renditions.all():
+            self.assertTrue(os.path.exists(rendition.image.path))
@@ -0,0 +1,242 @@
+import tempfile
+from unittest import skipUnless
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def image_upload_url(recipe_id):
+    """Return URL for recipe image upload"""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def sample_recipes(user, count, tags=(), ingredients=()):
+    """Create recipes linked to every given tag and ingredient"""
+    recipes = []
+    for i in range(count):
+        recipe = Recipe.objects.create(
+            user=user,
+            title=f'Recipe {i}',
+            time_minutes=10,
+            price=5.00
+        )
+        recipe.tags.add(*tags)
+        recipe.ingredients.add(*ingredients)
+        recipes.append(recipe)
+
+    return recipes
+
+
+class RecipeQueryCountTests(TestCase):
+    """Test the recipe API runs a fixed number of queries"""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'queries@me.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(3)
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Ingredient {i}')
+            for i in range(3)
+        ]
+
+    def assertListQueries(self, params=None, queries=3):
+        """assert list query count does not grow with the number of rows"""
+        sample_recipes(self.user, 1, self.tags, self.ingredients)
+        with self.assertNumQueries(queries):
+            res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        sample_recipes(self.user, 20, self.tags, self.ingredients)
+        with self.assertNumQueries(queries):
+            res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res
+
+    def test_list_query_count(self):
+        """Test listing recipes prefetches tags and ingredients"""
+        res = self.assertListQueries()
+
+        self.assertEqual(len(res.data['results']), 21)
+        self.assertEqual(len(res.data['results'][0]['tags']), 3)
+        self.assertEqual(len(res.data['results'][0]['ingredients']), 3)
+
+    def test_filter_query_count(self):
+        """Test filtering recipes prefetches tags and ingredients"""
+        self.assertListQueries({
+            'tags': str(self.tags[0].id),
+            'ingredients': str(self.ingredients[0].id),
+        })
+
+    def test_sparse_fields_query_count(self):
+        """Test unrequested relations are not loaded"""
+        res = self.assertListQueries({'fields': 'id,title'}, queries=1)
+        self.assertEqual(res.data['results'][0].keys(), {'id', 'title'})
+
+        res = self.assertListQueries({'fields': 'id,tags'}, queries=2)
+        self.assertEqual(res.data['results'][0].keys(), {'id', 'tags'})
+
+    def test_sparse_fields_columns(self):
+        """Test only requested columns and the ordering key are selected"""
+        sample_recipes(self.user, 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+                RECIPES_URL, {'fields': 'title', 'ordering': 'price'}
+            )
+
+        select = queries[0]['sql'].split(' FROM ')[0]
+        self.assertIn('"title"', select)
+        self.assertIn('"price"', select)
+        self.assertNotIn('"link"', select)
+        self.assertNotIn('"search_vector"', select)
+
+    def test_expand_query_count(self):
+        """Test expanded relations are prefetched with names"""
+        res = self.assertListQueries({'expand': 'tags'})
+
+        recipe = res.data['results'][0]
+        self.assertEqual(recipe['tags'][0].keys(), {'id', 'name'})
+        self.assertEqual(len(recipe['ingredients']), 3)
+        self.assertIsInstance(recipe['ingredients'][0], int)
+
+    def test_retrieve_query_count(self):
+        """Test retrieving a recipe prefetches nested objects"""
+        recipe = sample_recipes(self.user, 1, self.tags, self.ingredients)[0]
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 3)
+        self.assertEqual(res.data['tags'][0].keys(), {'id', 'name'})
+
+    def test_upload_image_query_count(self):
+        """Test uploading an image does not load recipe relations"""
+        recipe = sample_recipes(self.user, 1, self.tags, self.ingredients)[0]
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+            ntf.seek(0)
+            with self.assertNumQueries(2):
+                res = self.client.post(
+                    image_upload_url(recipe.id),
+                    {'image': ntf},
+                    format='multipart'
+                )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        recipe.image.delete()
+
+
+@skipUnless(connection.vendor == 'postgresql', 'postgres query plans')
+class RecipeQueryPlanTests(TestCase):
+    """Test recipe list queries are served by indexes
+
+    sequential scans are disabled so the plans do not depend on table
+    sizes, a seq scan or sort showing up means no index fits the query
+    """
+
+    def setUp(self):
+        caches['throttle'].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'plans@me.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        for i in range(3):
+            Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10 * i,
+                price=i
+            )
+
+    def plan(self, params):
+        """return the query plan of the recipe list query"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        sql = next(
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT') and
+            'FROM "core_recipe" WHERE' in query['sql']
+        )
+        with connection.cursor() as cursor:
+            # with a few rows sorting is cheaper than any index, so only
+            # sort when no index can serve the ordering
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+            cursor.execute(f'EXPLAIN {sql}')
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def assertIndexScan(self, params):
+        plan = self.plan(params)
+
+        self.assertIn('Index', plan)
+        self.assertNotIn('Seq Scan', plan)
+        self.assertNotIn('Sort', plan)
+        return plan
+
+    def test_default_ordering_plan(self):
+        self.assertIndexScan({})
+
+    def test_price_range_plan(self):
+        self.assertIndexScan({
+            'price_min': '1', 'price_max': '2', 'ordering': 'price'
+        })
+
+    def test_price_descending_plan(self):
+        self.assertIndexScan({'ordering': '-price'})
+        self.assertIndexScan({'price_max': '2', 'ordering': '-price'})
+
+    def test_time_range_plan(self):
+        self.assertIndexScan({'time_max': '30', 'ordering': 'time_minutes'})
+
+    def test_next_page_plan(self):
+        res = self.client.get(
+            RECIPES_URL, {'ordering': 'price', 'page_size': 1}
+        )
+        cursor = res.data['next'].split('cursor=')[1].split('&')[0]
+
+        plan = self.assertIndexScan({
+            'ordering': 'price', 'page_size': 1, 'cursor': cursor
+        })
+
+        # the seek is an index range, not a filter on the scanned rows
+        conditions = [
+            line for line in plan.splitlines() if 'Index Cond' in line
+        ]
+        self.assertEqual(len(conditions), 1)
+        self.assertIn('ROW(price, id) > ROW(', conditions[0])
+        self.assertNotIn('Filter', plan)
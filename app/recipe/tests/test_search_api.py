@@ -0,0 +1,139 @@
+from unittest import skipIf, skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import connection, connections
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core.models import Tag, Ingredient, Recipe
+from recipe import filters
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sample_recipe(user, title):
+    return Recipe.objects.create(
+        user=user, title=title, time_minutes=10, price=5.00
+    )
+
+
+class RecipeSearchTests(TestCase):
+    """test searching recipes by title, tag and ingredient names"""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'search@me.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, term, **params):
+        res = self.client.get(RECIPES_URL, {'search': term, **params})
+        return [recipe['id'] for recipe in res.data['results']]
+
+    @skipUnless(connection.vendor == 'postgresql', 'ranked on postgresql')
+    def test_search_title_ranked_above_related_names(self):
+        soup = sample_recipe(self.user, 'Tomato soup')
+        salad = sample_recipe(self.user, 'Summer salad')
+        salad.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='tomatoes')
+        )
+        sample_recipe(self.user, 'Pancakes')
+
+        self.assertEqual(self.search('tomato'), [soup.id, salad.id])
+
+    @skipIf(connection.vendor == 'postgresql', 'ranked on postgresql')
+    def test_search_unranked_newest_first(self):
+        soup = sample_recipe(self.user, 'Tomato soup')
+        salad = sample_recipe(self.user, 'Summer salad')
+        salad.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='tomatoes')
+        )
+
+        self.assertEqual(self.search('tomato'), [salad.id, soup.id])
+
+    def test_search_tag_names(self):
+        curry = sample_recipe(self.user, 'Curry')
+        tag = Tag.objects.create(user=self.user, name='spicy')
+        curry.tags.add(tag)
+
+        self.assertEqual(self.search('spicy'), [curry.id])
+
+        curry.tags.remove(tag)
+        self.assertEqual(self.search('spicy'), [])
+
+    def test_search_follows_renames_and_deletes(self):
+        curry = sample_recipe(self.user, 'Curry')
+        tag = Tag.objects.create(user=self.user, name='spicy')
+        curry.tags.add(tag)
+
+        tag.name = 'hot'
+        tag.save()
+        self.assertEqual(self.search('spicy'), [])
+        self.assertEqual(self.search('hot'), [curry.id])
+
+        tag.delete()
+        self.assertEqual(self.search('hot'), [])
+
+        curry.title = 'Chili'
+        curry.save()
+        self.assertEqual(self.search('chili'), [curry.id])
+
+    def test_search_bulk_created(self):
+        res = self.client.post(reverse('recipe:recipe-bulk'), [{
+            'title': 'Lemon tart',
+            'time_minutes': 40,
+            'price': '4.00',
+            'tags': [],
+            'ingredients': [],
+        }], format='json')
+
+        self.assertEqual(
+            self.search('lemon'), [res.data['results'][0]['id']]
+        )
+
+    def test_search_limited_to_user(self):
+        other = get_user_model().objects.create_user('other@me.com', 'pass')
+        sample_recipe(other, 'Tomato soup')
+
+        self.assertEqual(self.search('tomato'), [])
+
+    @skipUnless(connection.vendor == 'postgresql', 'ranked on postgresql')
+    def test_search_pages_by_rank(self):
+        best = sample_recipe(self.user, 'Tomato tomato soup')
+        good = sample_recipe(self.user, 'Tomato soup')
+        salad = sample_recipe(self.user, 'Salad')
+        salad.tags.add(Tag.objects.create(user=self.user, name='tomato'))
+
+        ids = []
+        res = self.client.get(
+            RECIPES_URL, {'search': 'tomato', 'page_size': 1}
+        )
+        for _ in range(5):
+            ids += [recipe['id'] for recipe in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(ids, [best.id, good.id, salad.id])
+
+    def test_like_fallback(self):
+        soup = sample_recipe(self.user, 'Tomato soup')
+        salad = sample_recipe(self.user, 'Salad')
+        salad.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Tomatoes')
+        )
+        sample_recipe(self.user, 'Pancakes')
+
+        with patch.object(connections['default'], 'vendor', 'sqlite'):
+            found = filters.search(Recipe.objects.all(), 'tomato')
+
+        self.assertEqual(
+            set(found.values_list('id', flat=True)), {soup.id, salad.id}
+        )
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from django.urls import reverse
 from django.test import TestCase
 from rest_framework import status
@@ -14,6 +15,7 @@ class PublicTagAPITests(TestCase):
     """test the publicly available API"""
 
     def setUp(self):
+        caches['throttle'].clear()
         self.client = APIClient()
 
     def test_login_required(self):
@@ -27,6 +29,7 @@ class PrivateTagAPITests(TestCase):
     """test the private API"""
 
     def setUp(self):
+        caches['throttle'].clear()
         self.client = APIClient()
 
         self.user = get_user_model().objects.create_user(
@@ -45,7 +48,7 @@ class PrivateTagAPITests(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         other_user = get_user_model().objects.create_user(
@@ -59,8 +62,8 @@ class PrivateTagAPITests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0].get('name'), tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0].get('name'), tag.name)
 
     def test_create_tag_successful(self):
         payload = {'name': 'milky'}
@@ -73,6 +76,29 @@ class PrivateTagAPITests(TestCase):
 
         self.assertTrue(exists)
 
+    def test_create_tag_existing_name(self):
+        """test creating a tag twice returns the existing one"""
+        first = self.client.post(TAGS_URL, {'name': 'milky'})
+        second = self.client.post(TAGS_URL, {'name': 'milky'})
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_create_tag_same_name_other_user(self):
+        """test names are only unique per user"""
+        other_user = get_user_model().objects.create_user(
+            'joker@me.com',
+            'hahaha'
+        )
+        Tag.objects.create(user=other_user, name='milky')
+
+        res = self.client.post(TAGS_URL, {'name': 'milky'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(name='milky').count(), 2)
+
     def test_create_tag_invalid(self):
         payload = {'name': ''}
         res = self.client.post(TAGS_URL, payload)
@@ -95,8 +121,8 @@ class PrivateTagAPITests(TestCase):
 
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_tags_assigned_unique(self):
         """Test filtering tags by assigned returns unique items"""
@@ -118,4 +144,4 @@ class PrivateTagAPITests(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
@@ -0,0 +1,146 @@
+import io
+import struct
+import zlib
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import SkipFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import serializers, status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe.uploads import RecipeImageUploadHandler, validate_image_header
+
+
+def image_upload_url(recipe_id):
+    """Return URL for recipe image upload"""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def sample_image_bytes(size=(10, 10), fmt='PNG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def png_claiming_size(width, height):
+    """return a tiny PNG whose header claims the given dimensions"""
+    data = bytearray(sample_image_bytes((1, 1)))
+    # IHDR data starts after the signature, chunk length and type
+    data[16:24] = struct.pack('>II', width, height)
+    data[29:33] = struct.pack('>I', zlib.crc32(bytes(data[12:29])))
+    return bytes(data)
+
+
+class RecipeImageUploadHandlerTests(TestCase):
+    """test streaming recipe image uploads"""
+
+    def receive(self, content, chunk_size=5):
+        handler = RecipeImageUploadHandler()
+        handler.new_file('image', 'upload.png', 'image/png', len(content))
+        for start in range(0, len(content), chunk_size):
+            handler.receive_data_chunk(content[start:start + chunk_size],
+                                       start)
+        return handler, handler.file_complete(len(content))
+
+    def test_streams_to_temporary_file(self):
+        """test uploads are written to disk, not memory"""
+        content = sample_image_bytes()
+
+        handler, file = self.receive(content)
+
+        self.assertIsInstance(file, TemporaryUploadedFile)
+        self.assertEqual(file.read(), content)
+        self.assertIsNone(handler.rejection)
+        file.close()
+
+    def test_rejects_non_image_signature(self):
+        """test files are dropped once the header is not an image"""
+        with self.assertRaises(SkipFile):
+            self.receive(b'<html>' + b'x' * 100)
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=100)
+    def test_rejects_oversized_file(self):
+        """test files are dropped as soon as they grow too large"""
+        with self.assertRaises(SkipFile):
+            self.receive(sample_image_bytes() + b'\0' * 200, chunk_size=50)
+
+
+class ValidateImageHeaderTests(TestCase):
+    """test image validation from headers"""
+
+    def test_valid_image(self):
+        file = io.BytesIO(sample_image_bytes(fmt='JPEG'))
+
+        self.assertIs(validate_image_header(file), file)
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=99)
+    def test_too_many_pixels(self):
+        with self.assertRaises(serializers.ValidationError):
+            validate_image_header(io.BytesIO(sample_image_bytes()))
+
+    @override_settings(RECIPE_IMAGE_MAX_SIDE=5)
+    def test_side_too_long(self):
+        with self.assertRaises(serializers.ValidationError):
+            validate_image_header(io.BytesIO(sample_image_bytes()))
+
+    def test_decompression_bomb(self):
+        """test bombs are rejected from the header alone"""
+        bomb = png_claiming_size(100000, 100000)
+
+        with self.assertRaises(serializers.ValidationError):
+            validate_image_header(io.BytesIO(bomb))
+
+
+class RecipeImageUploadLimitTests(TestCase):
+    """test upload-image rejects files over the limits"""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'limits@me.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pancakes',
+            time_minutes=10,
+            price=5.00
+        )
+
+    def upload(self, content, name='upload.png'):
+        file = io.BytesIO(content)
+        file.name = name
+        return self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': file},
+            format='multipart'
+        )
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=1000)
+    def test_oversized_upload(self):
+        res = self.upload(sample_image_bytes() + b'\0' * 2000)
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
+    def test_not_an_image(self):
+        res = self.upload(b'GIF is what this is not' * 10, name='fake.gif')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_decompression_bomb_upload(self):
+        res = self.upload(png_claiming_size(50000, 50000))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import serializers
+
+
+class ValuesSerializerTests(TestCase):
+    """test represent_rows() matches the model serializer output"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'values@me.com',
+            'testpass'
+        )
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('vegan', 'dessert')
+        ]
+        salt = Ingredient.objects.create(user=self.user, name='salt')
+
+        first = Recipe.objects.create(
+            user=self.user, title='Cake', time_minutes=30, price='4.50',
+            link='https://example.com/cake'
+        )
+        first.tags.add(*tags)
+        first.ingredients.add(salt)
+        Recipe.objects.create(
+            user=self.user, title='Toast', time_minutes=5, price=1
+        )
+        self.recipes = Recipe.objects.order_by('id')
+
+    def assertRepresentsRows(self, serializer_class, queryset, **kwargs):
+        serializer = serializer_class(**kwargs)
+        rows = queryset.values(*serializer.value_columns())
+
+        self.assertEqual(
+            serializer.represent_rows(rows),
+            serializer_class(queryset, many=True, **kwargs).data
+        )
+
+    def test_tags_and_ingredients(self):
+        self.assertRepresentsRows(
+            serializers.TagSerializer, Tag.objects.order_by('id')
+        )
+        self.assertRepresentsRows(
+            serializers.IngredientSerializer, Ingredient.objects.all()
+        )
+
+    def test_recipes(self):
+        self.assertRepresentsRows(serializers.RecipeSerializer, self.recipes)
+        self.assertRepresentsRows(
+            serializers.RecipeSerializer, self.recipes,
+            expand=('tags', 'ingredients')
+        )
+
+    def test_recipe_fields(self):
+        self.assertRepresentsRows(
+            serializers.RecipeSerializer, self.recipes,
+            fields=('title', 'tags'), expand=('tags',)
+        )
+        self.assertRepresentsRows(
+            serializers.RecipeSerializer, self.recipes, fields=('price',)
+        )
@@ -0,0 +1,139 @@
+import hashlib
+import warnings
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import serializers, status
+
+from core import metrics
+
+
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+)
+SIGNATURE_LENGTH = 12
+
+
+def sniff_image_format(header):
+    """return the image format a file header starts with, if allowed"""
+    for signature, fmt in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return fmt
+
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+
+    return None
+
+
+class RecipeImageUploadHandler(FileUploadHandler):
+    """stream recipe image uploads straight to a temporary file
+
+    nothing is buffered in memory. files that do not start with an image
+    signature or grow past RECIPE_IMAGE_MAX_BYTES are dropped while they
+    are still being received, the reason is kept in `rejection`. accepted
+    files carry the `sha256` of their content for the image storage
+    """
+    chunk_size = 64 * 2 ** 10
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.rejection = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = b''
+        self.digest = hashlib.sha256()
+        self.file = TemporaryUploadedFile(
+            self.file_name, self.content_type, 0, self.charset,
+            self.content_type_extra
+        )
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.RECIPE_IMAGE_MAX_BYTES:
+            self.reject(
+                _('image files may not exceed %(size)s bytes') % {
+                    'size': settings.RECIPE_IMAGE_MAX_BYTES
+                },
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        if len(self.header) < SIGNATURE_LENGTH:
+            self.header += raw_data[:SIGNATURE_LENGTH - len(self.header)]
+            if len(self.header) == SIGNATURE_LENGTH and \
+                    sniff_image_format(self.header) is None:
+                self.reject(_('upload a valid JPEG, PNG, GIF or WebP image'))
+
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if sniff_image_format(self.header) is None:
+            self.file.close()
+            self.rejection = (
+                _('upload a valid JPEG, PNG, GIF or WebP image'),
+                status.HTTP_400_BAD_REQUEST
+            )
+            metrics.IMAGE_UPLOADS.labels('rejected').inc()
+            return None
+
+        metrics.IMAGE_UPLOADS.labels('accepted').inc()
+        metrics.IMAGE_UPLOAD_BYTES.observe(file_size)
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.digest.hexdigest()
+        return self.file
+
+    def reject(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        """stop receiving the current file"""
+        self.rejection = (message, status_code)
+        metrics.IMAGE_UPLOADS.labels('rejected').inc()
+        raise SkipFile()
+
+
+def validate_image_header(file):
+    """check format and dimensions from the image header only
+
+    Image.open parses the header without decoding pixel data, so a
+    decompression bomb is rejected before it can allocate its bitmap
+    """
+    file.seek(0)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            image = Image.open(file)
+    except (Image.DecompressionBombWarning, Image.DecompressionBombError):
+        raise serializers.ValidationError(_('image has too many pixels'))
+    except (IOError, SyntaxError):
+        raise serializers.ValidationError(_('upload a valid image'))
+    finally:
+        file.seek(0)
+
+    if image.format not in ('JPEG', 'PNG', 'GIF', 'WEBP'):
+        raise serializers.ValidationError(
+            _('upload a valid JPEG, PNG, GIF or WebP image')
+        )
+
+    width, height = image.size
+    if max(width, height) > settings.RECIPE_IMAGE_MAX_SIDE:
+        raise serializers.ValidationError(
+            _('image sides may not exceed %(side)s pixels') % {
+                'side': settings.RECIPE_IMAGE_MAX_SIDE
+            }
+        )
+
+    if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise serializers.ValidationError(
+            _('image may not exceed %(pixels)s pixels') % {
+                'pixels': settings.RECIPE_IMAGE_MAX_PIXELS
+            }
+        )
+
+    return file
@@ -1,21 +1,80 @@
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.http import StreamingHttpResponse
+from django.utils.translation import ugettext_lazy as _
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from core.models import Tag, Ingredient, Recipe
-from recipe import serializers
+from recipe import (
+    bulk, cache, export, images, serializers, filters, signals, tasks,
+    uploads
+)
+from recipe.bulk import BulkMixin
+from recipe.conditional import ConditionalGetMixin
+from user.authentication import CachedTokenAuthentication
+
+
+class ValuesListMixin(mixins.ListModelMixin):
+    """list values() rows through the serializers represent_rows(),
+    see serializers.ValuesSerializerMixin"""
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        columns = set(serializer.value_columns())
+        if self.paginator is not None:
+            columns |= {
+                field.lstrip('-')
+                for field in self.paginator.get_ordering(self)
+            }
+
+        rows = self.filter_queryset(self.get_queryset()).values(*columns)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.represent_rows(page)
+            )
+
+        return Response(serializer.represent_rows(rows))
+
+
+class CachedListMixin(mixins.ListModelMixin):
+    """serve repeat list reads from the per user response cache"""
+
+    def list(self, request, *args, **kwargs):
+        key = cache.list_key(request, self.get_collection())
+        if key is None:
+            return super().list(request, *args, **kwargs)
 
+        data = cache.get_list(key)
+        if data is not None:
+            return Response(data)
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
-                            mixins.ListModelMixin,
+        response = super().list(request, *args, **kwargs)
+        cache.set_list(key, response.data)
+        return response
+
+
+class BaseRecipeAttrViewSet(ConditionalGetMixin,
+                            BulkMixin,
+                            CachedListMixin,
+                            ValuesListMixin,
+                            viewsets.GenericViewSet,
+                            mixins.RetrieveModelMixin,
                             mixins.CreateModelMixin):
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    ordering = ('-name', 'id')
 
     def get_queryset(self):
-        queryset = self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(
+            user=self.request.user
+        ).order_by(*self.ordering)
 
         assigned_only = bool(
             int(self.request.query_params.get('assigned_only', 0))
@@ -26,9 +85,82 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
 
         return queryset.distinct()
 
-    def perform_create(self, serializer):
-        """create object and associate with authenticated user """
-        serializer.save(user=self.request.user)
+    def create(self, request, *args, **kwargs):
+        """create the object unless the user already has one of the name,
+        answers 201 for new objects and 200 for existing ones"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        name = serializer.validated_data['name']
+
+        pk, created = self.queryset.model.objects.get_or_create_names(
+            request.user, [name]
+        )[name]
+        if created:
+            cache.bump_version(request.user.pk, self.get_collection())
+
+        serializer.instance = self.queryset.model(
+            pk=pk, user=request.user, name=name
+        )
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    def create_many(self, items):
+        validated, errors = self.validate_many(items)
+        if any(errors):
+            return bulk.failed(errors)
+
+        names = [data['name'] for data in validated]
+        rows = {}
+        with transaction.atomic():
+            for batch in bulk.batches(names, settings.RECIPE_BULK_BATCH_SIZE):
+                rows.update(self.queryset.model.objects.get_or_create_names(
+                    self.request.user, batch
+                ))
+
+        self._bump_versions()
+        return Response({'results': [
+            {
+                'status': status.HTTP_201_CREATED if rows[name][1]
+                else status.HTTP_200_OK,
+                'id': rows[name][0],
+            }
+            for name in names
+        ]}, status=status.HTTP_201_CREATED)
+
+    def related_ids(self, pks):
+        return list(Recipe.objects.filter(
+            **{f'{self.recipe_relation}__in': pks}
+        ).values_list('id', flat=True))
+
+    def after_bulk_write(self, pks, related_ids):
+        signals.touch_recipes(Recipe.objects.filter(pk__in=related_ids))
+
+    def perform_destroy_many(self, queryset):
+        """delete the assignments and the objects without collecting
+        them, the delete signals are covered by the bulk endpoint
+
+        queryset.delete() would load every object to send its delete
+        signals, each of which touches the recipes of that one object.
+        nothing else refers to tags and ingredients, so once the
+        assignments are gone a plain DELETE is enough
+        """
+        through = getattr(Recipe, self.recipe_relation).through
+        through.objects.filter(**{
+            f'{self.get_collection()}__in': queryset
+        }).delete()
+
+        pks = list(queryset.values_list('pk', flat=True))
+        connection = connections[queryset.db]
+        meta = self.queryset.model._meta
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {connection.ops.quote_name(meta.db_table)} '
+                f'WHERE {connection.ops.quote_name(meta.pk.column)} '
+                f'IN ({", ".join(["%s"] * len(pks))})',
+                pks
+            )
 
 
 class TagViewSet(BaseRecipeAttrViewSet,
@@ -36,6 +168,9 @@ class TagViewSet(BaseRecipeAttrViewSet,
 
     serializer_class = serializers.TagSerializer
     queryset = Tag.objects.all()
+    throttle_scope = 'tags'
+    recipe_relation = 'tags'
+    bulk_collections = ('tag', 'recipe')
 
     def perform_destroy(self, instance):
         instance.delete()
@@ -45,34 +180,192 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
 
     serializer_class = serializers.IngredientSerializer
     queryset = Ingredient.objects.all()
+    throttle_scope = 'ingredients'
+    recipe_relation = 'ingredients'
+    bulk_collections = ('ingredient', 'recipe')
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin,
+                    BulkMixin,
+                    ValuesListMixin,
+                    viewsets.ModelViewSet):
     """manage recipes in database"""
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    ordering = ('-id',)
+    bulk_relations = {'tags': Tag, 'ingredients': Ingredient}
+    bulk_collections = ('recipe', 'tag', 'ingredient')
+    throttle_scope = 'recipes'
+    throttle_action_scopes = {'upload_image': 'upload_image'}
 
     @staticmethod
     def _params_to_ints(qs_params):
         """convert a list of str ids to list of ints"""
-        return [int(param) for param in qs_params.split(',')]
+        try:
+            return [int(param) for param in qs_params.split(',')]
+        except ValueError:
+            raise ValidationError(
+                {'detail': _('expected a comma separated list of ids')}
+            )
+
+    @staticmethod
+    def _param_to_match(qs_param):
+        """validate an any/all match mode"""
+        if qs_param not in filters.MATCH_CHOICES:
+            raise ValidationError(
+                {'detail': _('match mode must be one of: any, all')}
+            )
+
+        return qs_param
+
+    @staticmethod
+    def _params_to_names(qs_params, choices):
+        """convert a comma separated list of names, each one of choices"""
+        names = [name for name in qs_params.split(',') if name]
+        if not set(names) <= set(choices):
+            raise ValidationError({'detail': _(
+                'expected a comma separated list of: %s'
+            ) % ', '.join(choices)})
+
+        return names
+
+    @staticmethod
+    def _param_to_number(qs_param):
+        """convert a str number to a decimal"""
+        try:
+            number = Decimal(qs_param)
+        except InvalidOperation:
+            number = None
+
+        if number is None or not number.is_finite():
+            raise ValidationError({'detail': _('expected a number')})
+
+        return number
+
+    @staticmethod
+    def _param_to_ordering(qs_param):
+        """validate an ordering against the indexed orderings"""
+        if qs_param not in filters.ORDERINGS:
+            raise ValidationError({'detail': _(
+                'ordering must be one of: %s'
+            ) % ', '.join(filters.ORDERINGS)})
+
+        return filters.ORDERINGS[qs_param]
 
     def get_queryset(self):
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
+        params = self.request.query_params
         queryset = self.queryset
 
-        if tags:
-            tags = RecipeViewSet._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tags)
+        for param, lookup in filters.RANGES.items():
+            value = params.get(param)
+            if value:
+                queryset = queryset.filter(**{
+                    lookup: RecipeViewSet._param_to_number(value)
+                })
+
+        for relation in ('tags', 'ingredients'):
+            ids = params.get(relation)
+            if ids:
+                queryset = filters.filter_by_related(
+                    queryset,
+                    relation,
+                    RecipeViewSet._params_to_ints(ids),
+                    RecipeViewSet._param_to_match(
+                        params.get(f'{relation}_match', filters.MATCH_ANY)
+                    )
+                )
+
+        term = self._search_term()
+        if term:
+            queryset = filters.search(queryset, term)
+
+        queryset = queryset.filter(
+            user=self.request.user
+        ).order_by(*self.get_ordering())
+
+        return self._load_for_action(queryset)
+
+    def _search_term(self):
+        return self.request.query_params.get('search', '').strip()
+
+    def get_ordering(self):
+        """ordering of the list, see KeysetPagination. searches are
+        ordered by rank unless an ordering is requested"""
+        ordering = self.request.query_params.get('ordering')
+        if ordering:
+            return RecipeViewSet._param_to_ordering(ordering)
+
+        if self._search_term():
+            return filters.SEARCH_ORDERING
+
+        return self.ordering
+
+    def _requested_fields(self):
+        """names of the fields=, all fields if not given"""
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return serializers.RecipeSerializer.Meta.fields
+
+        return RecipeViewSet._params_to_names(
+            fields, serializers.RecipeSerializer.Meta.fields
+        )
+
+    def _expanded(self):
+        """relations to inline, retrieve always inlines them"""
+        if self.action == 'retrieve':
+            return tuple(serializers.RecipeSerializer.expandable)
+
+        return RecipeViewSet._params_to_names(
+            self.request.query_params.get('expand', ''),
+            tuple(serializers.RecipeSerializer.expandable)
+        )
+
+    def _load_for_action(self, queryset):
+        """load only the relations and columns the action serializes,
+        lists select their columns with values(), see ValuesListMixin"""
+        if self.action == 'retrieve':
+            return self._load_fields(queryset)
+
+        if self.action == 'upload_image':
+            return queryset.only('id', 'user', 'image', 'image_status')
+
+        return queryset
+
+    def _load_fields(self, queryset):
+        """select the requested columns and prefetch the requested
+        relations as ids or inlined objects"""
+        fields = self._requested_fields()
+        expanded = self._expanded()
+        relations = [
+            name for name in serializers.RecipeSerializer.expandable
+            if name in fields
+        ]
+
+        ids = [name for name in relations if name not in expanded]
+        if ids:
+            queryset = queryset.with_related_ids(*ids)
+
+        inlined = [name for name in relations if name in expanded]
+        if inlined:
+            queryset = queryset.with_related(*inlined)
+
+        columns = {name for name in fields if name not in relations}
+        # validators of conditional requests
+        columns.add('updated_at')
+
+        return queryset.only(*columns)
 
-        if ingredients:
-            ingredients = RecipeViewSet._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients)
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ('list', 'retrieve'):
+            kwargs.setdefault('fields', self._requested_fields())
+            kwargs.setdefault('expand', self._expanded())
 
-        return queryset.filter(user=self.request.user)
+        return super().get_serializer(*args, **kwargs)
+
+    def after_bulk_write(self, pks, related_ids):
+        Recipe.objects.filter(pk__in=pks).refresh_search_vectors()
 
     def get_serializer_class(self):
         """return appropriate serializer class"""
@@ -83,21 +376,58 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if self.action == 'upload_image':
             return serializers.RecipeImageSerializer
 
+        if self.action == 'bulk':
+            return serializers.RecipeBulkSerializer
+
         return self.serializer_class
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-    @action(methods=['POST'], detail=True, url_path='upload-image')
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """stream every recipe of the user as NDJSON, gzipped if asked"""
+        compress = bool(int(request.query_params.get('gzip', 0)))
+
+        chunks = export.export_recipes(request.user)
+        filename = 'recipes.ndjson'
+        content_type = export.CONTENT_TYPE
+        if compress:
+            chunks = export.gzipped(chunks)
+            filename += '.gz'
+            content_type = export.GZIP_CONTENT_TYPE
+
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = \
+            f'attachment; filename="{filename}"'
+        return response
+
+    @action(methods=['GET', 'POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
+        """upload a recipe image, renditions are generated in background"""
         recipe = self.get_object()
+
+        if request.method == 'GET':
+            return Response(self.get_serializer(recipe).data)
+
+        handler = uploads.RecipeImageUploadHandler(request._request)
+        request._request.upload_handlers = [handler]
         serializer = self.get_serializer(
             recipe,
             data=request.data
         )
 
+        if handler.rejection:
+            message, status_code = handler.rejection
+            return Response({'image': [message]}, status=status_code)
+
         if serializer.is_valid():
-            serializer.save()
+            replaced = recipe.image.name
+            serializer.save(image_status=Recipe.IMAGE_PENDING)
+            tasks.enqueue_image_processing(recipe.id)
+            transaction.on_commit(
+                lambda: images.delete_unreferenced([replaced])
+            )
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
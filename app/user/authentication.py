@@ -0,0 +1,123 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import SAFE_METHODS
+
+from core import metrics
+from core.cache import LRUCache
+
+
+token_cache = LRUCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttl=settings.AUTH_TOKEN_CACHE_TTL,
+)
+
+
+def _cache_key(key):
+    """token keys are credentials, keep them out of shared cache keys"""
+    return 'authtoken:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _shared_cache():
+    alias = settings.AUTH_TOKEN_SHARED_CACHE
+    return caches[alias] if alias else None
+
+
+def _entry(user, token):
+    """what is cached of a token, never the user row: a user built from
+    it and saved would write stale columns back"""
+    return user._state.db, user.pk, user.is_active
+
+
+def _load(entry, key):
+    """return the user and token of an entry, only the user id and
+    is_active are loaded, other fields are read on access"""
+    db, user_id, is_active = entry
+    user = get_user_model().from_db(
+        db, ['id', 'is_active'], [user_id, is_active]
+    )
+    token = Token.from_db(db, ['key', 'user_id'], [key, user_id])
+    token.user = user
+    return user, token
+
+
+def invalidate_token(key):
+    """drop a token from every cache tier"""
+    cache_key = _cache_key(key)
+    token_cache.delete(cache_key)
+
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(cache_key)
+
+
+def invalidate_user(user_id):
+    """drop every token of a user from every cache tier"""
+    keys = Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+    for key in keys:
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """token authentication that keeps token -> user id in memory
+
+    reads hit an in-process LRU cache first, then the optional shared
+    cache (AUTH_TOKEN_SHARED_CACHE), and only then the database. their
+    request.user only has id and is_active loaded. writes always load
+    the token and user from the database, so they never act on a stale
+    user. entries are dropped when the token is deleted or its user is
+    saved, other processes may serve reads from their local copy for up
+    to AUTH_TOKEN_CACHE_TTL
+    """
+
+    def authenticate(self, request):
+        self.cached = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        cache_key = _cache_key(key)
+        shared = _shared_cache()
+
+        if not self.cached:
+            metrics.AUTH_TOKEN_LOOKUPS.labels('database').inc()
+            user, token = super().authenticate_credentials(key)
+            self._store(cache_key, _entry(user, token), shared)
+            return user, token
+
+        entry = token_cache.get(cache_key)
+        source = 'local'
+
+        if entry is None:
+            entry = shared.get(cache_key) if shared is not None else None
+            source = 'shared'
+
+            if entry is None:
+                source = 'database'
+                user, token = super().authenticate_credentials(key)
+                entry = _entry(user, token)
+                self._store(cache_key, entry, shared)
+            else:
+                token_cache.set(cache_key, entry)
+
+        metrics.AUTH_TOKEN_LOOKUPS.labels(source).inc()
+
+        user, token = _load(entry, key)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        return user, token
+
+    def _store(self, cache_key, entry, shared):
+        token_cache.set(cache_key, entry)
+        if shared is not None:
+            shared.set(
+                cache_key, entry, settings.AUTH_TOKEN_SHARED_CACHE_TTL
+            )
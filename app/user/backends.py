@@ -0,0 +1,113 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from core.cache import shared_cache
+
+
+UserModel = get_user_model()
+
+
+def _unknown_email_key(email):
+    return 'unknownemail:' + hashlib.sha256(email.encode()).hexdigest()
+
+
+def _unknown_email_cache():
+    """the AUTH_UNKNOWN_EMAIL_CACHE alias, None unless the workers share
+    it. a worker keeping its own entries would reject an email that signed
+    up through another worker until they expire"""
+    return shared_cache(settings.AUTH_UNKNOWN_EMAIL_CACHE)
+
+
+def is_unknown_email(email):
+    cache = _unknown_email_cache()
+    return cache is not None and cache.get(_unknown_email_key(email), False)
+
+
+def remember_unknown_email(email):
+    """return whether the email could be remembered"""
+    cache = _unknown_email_cache()
+    if cache is None:
+        return False
+
+    cache.set(
+        _unknown_email_key(email), True, settings.AUTH_UNKNOWN_EMAIL_TTL
+    )
+    return True
+
+
+def forget_unknown_email(email):
+    cache = _unknown_email_cache()
+    if cache is not None:
+        cache.delete(_unknown_email_key(email))
+
+
+class CheckTime:
+    """moving average of the time checking a password takes"""
+
+    def __init__(self, alpha=0.1):
+        self.alpha = alpha
+        self.average = None
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            if self.average is None:
+                self.average = seconds
+            else:
+                self.average += self.alpha * (seconds - self.average)
+
+    def pad(self, start, password):
+        """make a request started at `start` last as long as a password
+        check. the first one measures a real hash"""
+        if self.average is None:
+            UserModel().set_password(password)
+            self.observe(time.perf_counter() - start)
+            return
+
+        remaining = self.average - (time.perf_counter() - start)
+        if remaining > 0:
+            time.sleep(remaining)
+
+
+check_time = CheckTime()
+
+
+class EmailBackend(ModelBackend):
+    """ModelBackend that does not hash passwords of unknown emails
+
+    ModelBackend hashes the password for unknown emails too, so response
+    times do not tell which emails have an account. with a shared
+    AUTH_UNKNOWN_EMAIL_CACHE this backend remembers unknown emails for
+    AUTH_UNKNOWN_EMAIL_TTL and sleeps as long as a password check takes
+    instead, which keeps the timing but not the CPU cost. without one it
+    hashes like ModelBackend
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        start = time.perf_counter()
+        if not is_unknown_email(username):
+            try:
+                user = UserModel._default_manager.get_by_natural_key(username)
+            except UserModel.DoesNotExist:
+                if not remember_unknown_email(username):
+                    UserModel().set_password(password)
+                    return None
+            else:
+                valid = user.check_password(password)
+                check_time.observe(time.perf_counter() - start)
+                if valid and self.user_can_authenticate(user):
+                    return user
+                return None
+
+        check_time.pad(start, password)
+        return None
@@ -2,8 +2,10 @@ from django.contrib.auth import get_user_model, authenticate
 from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
 
+from core.perf import SerializerTimingMixin
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     """serializer for user model"""
 
     class Meta:
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user import authentication, backends
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """stop authenticating with a deleted token"""
+    authentication.invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_saved_user(sender, instance, update_fields=None, **kwargs):
+    """drop cached tokens so is_active/password changes apply at once"""
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+
+    authentication.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_unknown_email(sender, instance, **kwargs):
+    """let a new or renamed account log in at once"""
+    backends.forget_unknown_email(instance.email)
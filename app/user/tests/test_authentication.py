@@ -0,0 +1,143 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import token_cache
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """test token authentication served from the token cache"""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='cached@me.com',
+            password='testpass',
+            name='cached'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeat_requests_skip_token_query(self):
+        """test only the first request looks the token up, /me/ loads
+        the user itself"""
+        with self.assertNumQueries(2):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+        self.assertEqual(token_cache.hits, 1)
+
+    def test_invalid_token(self):
+        """test unknown tokens are rejected"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token wrong')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_invalidated(self):
+        """test a deleted token stops working at once"""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_invalidated(self):
+        """test deactivating a user drops its cached tokens"""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidated(self):
+        """test changing the password reloads the cached user"""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {'password': 'newpass123'})
+        with self.assertNumQueries(2):
+            self.client.get(ME_URL)
+
+    def test_cached_user_not_written_back(self):
+        """test updates go through the current user row, not the cache"""
+        self.client.get(ME_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            password=make_password('changed123')
+        )
+
+        res = self.client.patch(ME_URL, {'name': 'renamed'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'renamed')
+        self.assertTrue(self.user.check_password('changed123'))
+
+    def test_writes_load_user(self):
+        """test unsafe requests authenticate against the database"""
+        self.client.get(ME_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False
+        )
+
+        res = self.client.patch(ME_URL, {'name': 'renamed'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_entries_expire(self):
+        """test entries are looked up again after the ttl"""
+        self.client.get(ME_URL)
+
+        with patch('core.cache.time.monotonic', return_value=10 ** 9):
+            with self.assertNumQueries(2):
+                self.client.get(ME_URL)
+
+    @override_settings(
+        CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'tokens': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'tokens',
+            },
+            'throttle': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'throttle',
+            },
+        },
+        AUTH_TOKEN_SHARED_CACHE='tokens',
+    )
+    def test_shared_cache_tier(self):
+        """test the shared tier serves processes with a cold local cache"""
+        caches['tokens'].clear()
+        self.client.get(ME_URL)
+        token_cache.clear()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.token.delete()
+        token_cache.clear()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
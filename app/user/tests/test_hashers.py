@@ -0,0 +1,117 @@
+import threading
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth import hashers as django_hashers
+from django.contrib.auth.hashers import identify_hasher
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashers
+
+try:
+    import argon2
+except ImportError:
+    argon2 = None
+
+
+CREATE_USER_URL = reverse('user:create')
+TOKEN_URL = reverse('user:token')
+
+PAYLOAD = {'email': 'hash@me.com', 'password': 'testpass'}
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+class PasswordHashingTests(TestCase):
+    """test the configurable password hashers"""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        self.client = APIClient()
+
+    def login(self):
+        return self.client.post(TOKEN_URL, PAYLOAD)
+
+    def test_rehash_on_login_when_cost_changes(self):
+        user = get_user_model().objects.create_user(**PAYLOAD)
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+
+    def test_no_rehash_on_failed_login(self):
+        user = get_user_model().objects.create_user(**PAYLOAD)
+
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            res = self.client.post(
+                TOKEN_URL, {**PAYLOAD, 'password': 'wrongpass'}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        password = user.password
+        user.refresh_from_db()
+        self.assertEqual(user.password, password)
+
+    @skipUnless(argon2, 'argon2-cffi is not installed')
+    def test_rehash_on_login_when_hasher_changes(self):
+        user = get_user_model().objects.create_user(**PAYLOAD)
+
+        with override_settings(
+            PASSWORD_HASHERS=['core.hashers.Argon2PasswordHasher',
+                              'core.hashers.PBKDF2PasswordHasher'],
+            PASSWORD_ARGON2_TIME_COST=1,
+            PASSWORD_ARGON2_MEMORY_COST=64,
+            PASSWORD_ARGON2_PARALLELISM=1
+        ):
+            res = self.login()
+            user.refresh_from_db()
+            hasher = identify_hasher(user.password)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(hasher.algorithm, 'argon2')
+            self.assertFalse(hasher.must_update(user.password))
+
+    @override_settings(PASSWORD_HASHING_WORKERS=2)
+    def test_hashing_in_pool(self):
+        threads = []
+        encode = django_hashers.PBKDF2PasswordHasher.encode
+
+        def recording_encode(*args):
+            threads.append(threading.current_thread().name)
+            return encode(*args)
+
+        with patch.object(django_hashers.PBKDF2PasswordHasher, 'encode',
+                          recording_encode):
+            res = self.client.post(
+                CREATE_USER_URL, {**PAYLOAD, 'name': 'hash'}
+            )
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(threads), 2)
+        for name in threads:
+            self.assertTrue(name.startswith('password-hashing'))
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1,
+                       PASSWORD_HASHING_TIMEOUT=0.01)
+    def test_busy_pool_unavailable(self):
+        get_user_model().objects.create_user(**PAYLOAD)
+        pool = hashers.get_pool()
+
+        pool.slots.acquire()
+        try:
+            res = self.login()
+        finally:
+            pool.slots.release()
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
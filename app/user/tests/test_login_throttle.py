@@ -0,0 +1,193 @@
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user import backends
+from user.throttles import local_counts
+
+
+TOKEN_URL = reverse('user:token')
+CREATE_USER_URL = reverse('user:create')
+FILE_CACHE = 'django.core.cache.backends.filebased.FileBasedCache'
+LOCMEM_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+PAYLOAD = {'email': 'login@me.com', 'password': 'testpass'}
+
+
+@override_settings(LOGIN_THROTTLE_EMAIL_LIMIT=3, LOGIN_THROTTLE_IP_LIMIT=5,
+                   PASSWORD_PBKDF2_ITERATIONS=1000)
+class LoginThrottleTests(TestCase):
+    """test limiting token requests before passwords are checked"""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        local_counts.clear()
+        self.client = APIClient()
+        get_user_model().objects.create_user(**PAYLOAD)
+
+    def login(self, **payload):
+        return self.client.post(TOKEN_URL, {**PAYLOAD, **payload})
+
+    def test_email_limit(self):
+        for _ in range(3):
+            res = self.login(password='wrongpass')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with patch('user.serializers.authenticate') as authenticate:
+            res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+        authenticate.assert_not_called()
+
+    def test_email_limit_ignores_case(self):
+        for email in ('login@me.com', 'LOGIN@me.com', 'Login@Me.com'):
+            self.login(email=email, password='wrongpass')
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_address_limit(self):
+        for n in range(5):
+            self.login(email=f'other{n}@me.com')
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = self.client.post(
+            TOKEN_URL, PAYLOAD, REMOTE_ADDR='10.0.0.2'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_address_limit_ignores_forwarded_for(self):
+        for n in range(5):
+            self.client.post(
+                TOKEN_URL, {**PAYLOAD, 'email': f'other{n}@me.com'},
+                HTTP_X_FORWARDED_FOR=f'10.0.1.{n}'
+            )
+
+        res = self.client.post(
+            TOKEN_URL, PAYLOAD, HTTP_X_FORWARDED_FOR='10.0.1.9'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_list_body_rejected(self):
+        res = self.client.post(TOKEN_URL, [1], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_shared_counts(self):
+        for _ in range(3):
+            self.login(password='wrongpass')
+        local_counts.clear()
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_window_slides(self):
+        with patch('user.throttles.time.time', return_value=600):
+            for _ in range(3):
+                self.login(password='wrongpass')
+
+        with patch('user.throttles.time.time', return_value=660):
+            res = self.login()
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        with patch('user.throttles.time.time', return_value=690):
+            res = self.login()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+def worker_caches(location, backend=FILE_CACHE):
+    """the caches of one worker process, its unknown email cache is shared
+    with the workers of the same location"""
+    return override_settings(CACHES={
+        'default': {'BACKEND': LOCMEM_CACHE},
+        'throttle': {'BACKEND': LOCMEM_CACHE, 'LOCATION': 'throttle'},
+        'emails': {'BACKEND': backend, 'LOCATION': location},
+    })
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000,
+                   AUTH_UNKNOWN_EMAIL_CACHE='emails')
+class UnknownEmailTests(TestCase):
+    """test logins of emails without an account skip the password hash"""
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        worker = worker_caches(self.location)
+        worker.enable()
+        self.addCleanup(worker.disable)
+
+        caches['throttle'].clear()
+        local_counts.clear()
+        self.client = APIClient()
+        backends.check_time.observe(0.01)
+
+    def test_unknown_email_not_hashed(self):
+        with patch('user.backends.time.sleep') as sleep, \
+                patch('django.contrib.auth.base_user.make_password') as make:
+            res = self.client.post(TOKEN_URL, PAYLOAD)
+            with self.assertNumQueries(0):
+                self.client.post(TOKEN_URL, PAYLOAD)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        make.assert_not_called()
+        self.assertEqual(sleep.call_count, 2)
+        self.assertGreater(sleep.call_args[0][0], 0)
+
+    def test_created_user_forgotten(self):
+        with patch('user.backends.time.sleep'):
+            self.client.post(TOKEN_URL, PAYLOAD)
+        self.assertTrue(backends.is_unknown_email(PAYLOAD['email']))
+
+        get_user_model().objects.create_user(**PAYLOAD)
+        res = self.client.post(TOKEN_URL, PAYLOAD)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_signup_through_other_worker(self):
+        """test an email remembered by one worker logs in once it signed
+        up through another one"""
+        with worker_caches(self.location), patch('user.backends.time.sleep'):
+            self.client.post(TOKEN_URL, PAYLOAD)
+            self.assertTrue(backends.is_unknown_email(PAYLOAD['email']))
+
+        with worker_caches(self.location):
+            res = self.client.post(CREATE_USER_URL, {**PAYLOAD, 'name': 'n'})
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        with worker_caches(self.location):
+            res = self.client.post(TOKEN_URL, PAYLOAD)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_process_local_cache_ignored(self):
+        """test unknown emails are hashed when workers keep their own
+        caches"""
+        with worker_caches('first', LOCMEM_CACHE), \
+                patch('user.backends.time.sleep') as sleep, \
+                patch('django.contrib.auth.base_user.make_password') as make:
+            self.client.post(TOKEN_URL, PAYLOAD)
+            self.assertFalse(backends.is_unknown_email(PAYLOAD['email']))
+
+        make.assert_called_once()
+        sleep.assert_not_called()
+
+        with worker_caches('second', LOCMEM_CACHE):
+            self.client.post(CREATE_USER_URL, {**PAYLOAD, 'name': 'n'})
+
+        with worker_caches('first', LOCMEM_CACHE):
+            res = self.client.post(TOKEN_URL, PAYLOAD)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
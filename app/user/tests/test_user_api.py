@@ -1,3 +1,4 @@
+from django.core.cache import caches
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -18,6 +19,7 @@ class PublicUserAPITests(TestCase):
     """test the users API public"""
 
     def setUp(self):
+        caches['throttle'].clear()
         self.client = APIClient()
 
     def test_create_user_success(self):
@@ -121,6 +123,7 @@ class PrivateUsersAPITests(TestCase):
     """test API endpoints that require authorization"""
 
     def setUp(self):
+        caches['throttle'].clear()
         self.user = create_user(
             email='joker@me.com',
             password='hahaha',
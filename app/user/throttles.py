@@ -0,0 +1,87 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+from core.cache import LRUCache, incr_counter
+
+
+local_counts = LRUCache(maxsize=settings.LOGIN_THROTTLE_CACHE_SIZE)
+_lock = threading.Lock()
+
+
+def _shared_cache():
+    alias = settings.LOGIN_THROTTLE_CACHE
+    return caches[alias] if alias else None
+
+
+def _estimate(counts, key, index, weight):
+    """requests in the sliding window ending now, assuming the requests
+    of the previous fixed window were spread evenly"""
+    current = counts.get(f'{key}:{index}') or 0
+    previous = counts.get(f'{key}:{index - 1}') or 0
+    return current + previous * weight
+
+
+class LoginRateThrottle(BaseThrottle):
+    """sliding window limits of token requests per email and per client
+    address, checked before any password is hashed
+
+    every worker counts in process and, with LOGIN_THROTTLE_CACHE, in a
+    cache shared by the workers. the counts of a worker never exceed the
+    shared ones, so a local rejection saves the cache round trip
+    """
+
+    def get_limits(self, request):
+        """return [(counter key, limit)] of the request"""
+        limits = [(f'ip:{self.get_ident(request)}',
+                   settings.LOGIN_THROTTLE_IP_LIMIT)]
+        # other bodies are left to the serializer to reject
+        data = request.data if isinstance(request.data, dict) else {}
+        email = data.get('email')
+        if isinstance(email, str):
+            limits.append((f'email:{email.strip().lower()}',
+                           settings.LOGIN_THROTTLE_EMAIL_LIMIT))
+
+        return [
+            ('loginthrottle:' + hashlib.sha256(key.encode()).hexdigest(),
+             limit)
+            for key, limit in limits
+        ]
+
+    def allow_request(self, request, view):
+        window = settings.LOGIN_THROTTLE_WINDOW
+        index, offset = divmod(int(time.time()), window)
+        weight = 1 - offset / window
+        self.wait_seconds = window - offset
+        limits = self.get_limits(request)
+
+        with _lock:
+            for key, limit in limits:
+                if _estimate(local_counts, key, index, weight) >= limit:
+                    return False
+
+        shared = _shared_cache()
+        if shared is not None:
+            for key, limit in limits:
+                counts = shared.get_many([f'{key}:{index}',
+                                          f'{key}:{index - 1}'])
+                if _estimate(counts, key, index, weight) >= limit:
+                    return False
+
+        with _lock:
+            for key, _ in limits:
+                key = f'{key}:{index}'
+                local_counts.set(key, (local_counts.get(key) or 0) + 1,
+                                 2 * window)
+        if shared is not None:
+            for key, _ in limits:
+                incr_counter(shared, f'{key}:{index}', 2 * window)
+
+        return True
+
+    def wait(self):
+        return self.wait_seconds
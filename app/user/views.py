@@ -1,7 +1,10 @@
+from django.contrib.auth import get_user_model
 from user.serializers import UserSerializer, AuthTokenSerializer
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
+from user.authentication import CachedTokenAuthentication
+from user.throttles import LoginRateThrottle
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -13,14 +16,20 @@ class CreateTokenView(ObtainAuthToken):
     """create a new auth token for user"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = (LoginRateThrottle, )
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """manage the user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (permissions.IsAuthenticated, )
 
     def get_object(self):
-        """retrieve and return authenticated user"""
-        return self.request.user
+        """retrieve and return authenticated user, reads authenticated
+        from the token cache only have its id loaded"""
+        user = self.request.user
+        if user.get_deferred_fields():
+            user = get_user_model().objects.get(pk=user.pk)
+
+        return user